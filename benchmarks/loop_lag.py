@@ -0,0 +1,96 @@
+## benchmarks/loop_lag.py
+"""
+Задержка цикла событий (loop lag) при сохранении сценариев.
+
+Скрипт измеряет, насколько «опаздывает» таймер asyncio.sleep(0.005), пока
+идут параллельные сохранения сценариев в JSON-хранилище:
+
+- direct      — save_scenario() вызывается прямо в цикле событий (как было раньше);
+- run_blocking — через пул потоков хранилища (как в src/api/v1/routes_invest.py).
+
+Запуск из корня проекта:
+    python -m benchmarks.loop_lag [число сохранений] [число сценариев в файле]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.core.config import settings
+from src.core.threads import run_blocking, shutdown_storage_pool
+from src.models.invest import InvestInput, ScenarioDetail
+from src.services.invest_service import save_scenario
+from src.storage import JsonScenarioStorage
+from src.storage.base import scenario_to_record
+
+
+TICK = 0.005
+
+
+def _scenario(i: int) -> ScenarioDetail:
+    return ScenarioDetail(
+        id=f"bench-{i}",
+        name=f"Benchmark {i}",
+        created_at=datetime.utcnow(),
+        input=InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24),
+    )
+
+
+async def _measure(mode: str, storage: JsonScenarioStorage, saves: int) -> list:
+    loop = asyncio.get_running_loop()
+    lags: list = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            started = loop.time()
+            await asyncio.sleep(TICK)
+            lags.append((loop.time() - started - TICK) * 1000)
+
+    async def save(i: int) -> None:
+        if mode == "direct":
+            save_scenario(_scenario(i), storage)
+        else:
+            await run_blocking(save_scenario, _scenario(i), storage)
+        await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.gather(*(save(i) for i in range(saves)))
+    done.set()
+    await task
+    return lags
+
+
+def main() -> None:
+    saves = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    existing = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("direct", "run_blocking"):
+            storage = JsonScenarioStorage(Path(tmp) / f"{mode}.json")
+            storage.save_snapshot([scenario_to_record(_scenario(-i - 1)) for i in range(existing)])
+            storage.list_scenarios()  ## прогрев индекса
+
+            started = time.perf_counter()
+            lags = asyncio.run(_measure(mode, storage, saves))
+            elapsed = time.perf_counter() - started
+            storage.close()
+
+            lags.sort()
+            print(
+                f"{mode:>12}: {saves} saves in {elapsed:.2f}s; loop lag, ms: "
+                f"median={statistics.median(lags):.2f} "
+                f"p99={lags[min(len(lags) - 1, int(len(lags) * 0.99))]:.2f} max={lags[-1]:.2f} "
+                f"(ticks={len(lags)}, threads={settings.STORAGE_THREADS})"
+            )
+    shutdown_storage_pool()
+
+
+if __name__ == "__main__":
+    main()
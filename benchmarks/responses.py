@@ -0,0 +1,122 @@
+## benchmarks/responses.py
+"""
+Сериализация ответов API: стандартный путь FastAPI и быстрые ответы
+(src/core/responses.py, create_app(fast_responses=True)).
+
+Полезные нагрузки — SensitivityResult (POST /sensitivity) и List[ScenarioShort]
+(страница GET /scenarios). Для каждой измеряется:
+- serialize — только превращение значения в байты тела ответа:
+  default = валидация по response_model + model_dump(JSON) + json.dumps,
+  fast    = pydantic-core сразу в байты;
+- http — полный запрос через TestClient к приложению в обоих режимах
+  и для fast с Accept-Encoding: gzip (указан размер тела до и после сжатия).
+
+Запуск из корня проекта:
+    python -m benchmarks.responses [число сценариев в списке] [повторов]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from fastapi.utils import create_response_field
+
+from src.core.config import settings
+from src.core.responses import PydanticJSONResponse
+from src.models.invest import InvestInput, ScenarioShort, SensitivityRequest, SensitivityResult
+from src.services.invest_service import run_sensitivity
+
+
+BASE_INPUT = {"capex": 100_000, "opex": 20_000, "effects": 180_000, "period_months": 24}
+
+
+def _timed(label: str, repeat: int, func: Callable[[], Any]) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_call = (time.perf_counter() - started) / repeat * 1000
+    print(f"{label:>28}: {per_call:8.3f} мс")
+    return per_call
+
+
+def _compare_serialize(name: str, annotation: Any, value: Any, repeat: int) -> None:
+    field = create_response_field(name="Response_bench", type_=annotation)
+
+    async def default() -> bytes:
+        content = await serialize_response(field=field, response_content=value, is_coroutine=True)
+        return JSONResponse(content).body
+
+    loop = asyncio.new_event_loop()
+    assert json.loads(loop.run_until_complete(default())) == json.loads(PydanticJSONResponse(value).body)
+    slow = _timed(f"{name} serialize default", repeat, lambda: loop.run_until_complete(default()))
+    fast = _timed(f"{name} serialize fast", repeat, lambda: PydanticJSONResponse(value).body)
+    loop.close()
+    print(f"{'':>28}  ускорение ×{slow / fast:.1f}, тело {len(PydanticJSONResponse(value).body)} байт")
+
+
+def _compare_http(name: str, repeat: int, request: Callable[[TestClient, dict], Any], apps: dict) -> None:
+    for mode, (client, encoding) in apps.items():
+        headers = {"Accept-Encoding": encoding}
+        resp = request(client, headers)
+        wire = resp.num_bytes_downloaded
+        _timed(f"{name} http {mode}", repeat, lambda: request(client, headers))
+        print(f"{'':>28}  тело {len(resp.content)} байт, передано {wire} байт")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    sensitivity = SensitivityRequest(base_input=InvestInput(**BASE_INPUT))
+    sensitivity_result = run_sensitivity(sensitivity)
+    started = datetime(2025, 1, 1)
+    shorts: List[ScenarioShort] = [
+        ScenarioShort(id=f"bench-{i}", name=f"Benchmark {i}", created_at=started + timedelta(minutes=i))
+        for i in range(count)
+    ]
+
+    _compare_serialize("SensitivityResult", SensitivityResult, sensitivity_result, repeat)
+    _compare_serialize("List[ScenarioShort]", List[ScenarioShort], shorts, max(repeat // 10, 1))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATA_DIR = Path(tmp)
+        settings.SCENARIOS_FILE = Path(tmp) / "scenarios.json"
+        from src.main import create_app
+
+        default, fast = TestClient(create_app(fast_responses=False)), TestClient(create_app(fast_responses=True))
+        apps = {"default": (default, "identity"), "fast": (fast, "identity"), "fast+gzip": (fast, "gzip")}
+        scenarios = [
+            {"id": s.id, "name": s.name, "created_at": s.created_at.isoformat(), "input": BASE_INPUT}
+            for s in shorts
+        ]
+        assert fast.post("/api/v1/scenarios/import", json=scenarios).json()["imported"] == count
+
+        _compare_http(
+            "SensitivityResult",
+            repeat,
+            lambda client, headers: client.post(
+                "/api/v1/sensitivity", json=sensitivity.model_dump(mode="json"), headers=headers
+            ),
+            apps,
+        )
+        _compare_http(
+            "List[ScenarioShort]",
+            max(repeat // 10, 1),
+            lambda client, headers: client.get("/api/v1/scenarios", params={"limit": count}, headers=headers),
+            apps,
+        )
+
+
+if __name__ == "__main__":
+    main()
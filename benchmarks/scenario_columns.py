@@ -0,0 +1,73 @@
+## benchmarks/scenario_columns.py
+"""
+Загрузка входных данных всех сценариев для аналитики.
+
+Сравниваются:
+- json+pydantic — чтение scenarios.json и создание ScenarioDetail (как раньше);
+- rebuild       — построение колонок без столбцового снимка (первое обращение);
+- mmap          — колонки из столбцового снимка в новом процессе/экземпляре хранилища;
+- incremental   — колонки после сохранения нескольких сценариев.
+
+Запуск из корня проекта:
+    python -m benchmarks.scenario_columns [число сценариев]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.models.invest import InvestInput, ScenarioDetail
+from src.storage import JsonScenarioStorage
+from src.storage.base import scenario_to_record
+
+
+def _scenario(i: int) -> ScenarioDetail:
+    return ScenarioDetail(
+        id=f"bench-{i}",
+        name=f"Benchmark {i}",
+        created_at=datetime(2025, 1, 1),
+        input=InvestInput(
+            capex=100_000 + i,
+            opex=20_000,
+            effects=180_000,
+            period_months=12 + i % 48,
+            discount_rate_percent=None if i % 2 else 10.0,
+        ),
+    )
+
+
+def _timed(label: str, func) -> None:
+    started = time.perf_counter()
+    result = func()
+    print(f"{label:>14}: {(time.perf_counter() - started) * 1000:9.1f} мс ({len(result)} сценариев)")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "scenarios.json"
+        JsonScenarioStorage(path).save_snapshot([scenario_to_record(_scenario(i)) for i in range(count)])
+
+        _timed(
+            "json+pydantic",
+            lambda: [ScenarioDetail.model_validate(item) for item in json.loads(path.read_text(encoding="utf-8"))],
+        )
+
+        storage = JsonScenarioStorage(path)
+        _timed("rebuild", storage.scenario_columns)
+        _timed("mmap", JsonScenarioStorage(path).scenario_columns)
+
+        storage.save_scenarios([_scenario(i).model_copy(update={"name": "changed"}) for i in range(10)])
+        storage.save_scenario(_scenario(count))
+        _timed("incremental", storage.scenario_columns)
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+## benchmarks/scenario_writes.py
+"""
+Пропускная способность сохранения сценариев в JSON-хранилище.
+
+Несколько потоков одновременно сохраняют сценарии; сравниваются
+окна групповой фиксации settings.SCENARIOS_GROUP_COMMIT_WINDOW_MS
+(0 — каждая группа из уже накопившихся в очереди сохранений).
+
+Запуск из корня проекта:
+    python -m benchmarks.scenario_writes [потоков] [сохранений на поток]
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from src.core.config import settings
+from src.models.invest import InvestInput, ScenarioDetail
+from src.storage import JsonScenarioStorage
+
+
+def main() -> None:
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for window in (0.0, 2.0, 5.0):
+            settings.SCENARIOS_GROUP_COMMIT_WINDOW_MS = window
+            storage = JsonScenarioStorage(Path(tmp) / f"window-{window}.json")
+
+            def worker(n: int) -> None:
+                for i in range(per_thread):
+                    storage.save_scenario(
+                        ScenarioDetail(
+                            id=f"{n}-{i}",
+                            name=f"Benchmark {n}-{i}",
+                            created_at=datetime.utcnow(),
+                            input=input_data,
+                        )
+                    )
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(worker, range(threads)))
+            elapsed = time.perf_counter() - started
+            saves = threads * per_thread
+
+            print(
+                f"window={window:>4} ms: {saves} saves in {elapsed:.2f}s "
+                f"({saves / elapsed:,.0f} saves/s), fsync calls={storage.journal.commits}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,29 +3,83 @@
 Маршруты API для InvestCalc (v1).
 
 Задачи:
-- расчёт TCO, ROI и срока окупаемости;
+- расчёт TCO, ROI и срока окупаемости (по одному проекту и пакетно);
 - анализ чувствительности;
-- работа со сценариями (JSON вместо БД).
+- подбор параметра под целевой показатель (goal seek);
+- сводная аналитика по всем сохранённым сценариям;
+- профили медленных запросов (при settings.PROFILING_ENABLED) и самые долгие
+  из последних трасс запросов;
+- работа со сценариями (JSON вместо БД); GET-запросы поддерживают ETag/Last-Modified
+  и отвечают 304 Not Modified, пока хранилище не изменилось; массовый импорт
+  и пересчёт сохранённых результатов по текущей версии формул;
+  операции с хранилищем выполняются в пуле потоков, чтобы не блокировать
+  цикл событий; тяжёлые расчёты (таблица чувствительности, Monte Carlo) —
+  в отдельном пуле расчётов.
 """
 
-from typing import List
+import email.utils
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
 
+from src.core.config import settings
+from src.core.profiling import list_profiles, profile_file
+from src.core.threads import run_blocking, run_calculation
+from src.core.tracing import trace_buffer
 from src.models.invest import (
+    BatchCalcRequest,
+    BatchCalcResult,
+    CacheStats,
+    GoalSeekBatchRequest,
+    GoalSeekBatchResult,
+    GoalSeekRequest,
+    GoalSeekResult,
     InvestInput,
     InvestResult,
+    MonteCarloRequest,
+    MonteCarloResult,
+    PortfolioAnalytics,
+    PortfolioAnalyticsQuery,
+    RequestProfileInfo,
+    TraceInfo,
+    SensitivityGridRequest,
+    SensitivityGridResult,
     SensitivityRequest,
     SensitivityResult,
+    SensitivitySweepResult,
+    ScenarioImportResult,
+    ScenarioListQuery,
+    ScenarioRecomputeProgress,
     ScenarioShort,
     ScenarioDetail,
+    SCENARIOS_PAGE_DEFAULT_LIMIT,
+    SCENARIOS_PAGE_MAX_LIMIT,
 )
+from src.services.cache import result_cache
 from src.services.invest_service import (
     calculate_metrics,
+    calculate_metrics_batch,
     run_sensitivity,
-    list_scenarios,
+    run_sensitivity_grid,
+    run_monte_carlo,
+    run_goal_seek,
+    run_goal_seek_batch,
+    list_scenarios_page,
+    iter_scenarios,
+    iter_scenario_details,
     get_scenario,
     save_scenario,
+    import_scenarios,
+    iter_ndjson,
+    iter_recompute_scenarios,
+    recompute_scenarios,
+    parse_import_payload,
+    portfolio_analytics,
+    store_version,
 )
 
 router = APIRouter()
@@ -52,16 +106,42 @@ async def calculate_invest_metrics(payload: InvestInput) -> InvestResult:
         ) from exc
 
 
+@router.post(
+    "/calc/batch",
+    response_model=BatchCalcResult,
+    summary="Пакетный расчёт TCO, ROI и срока окупаемости",
+    tags=["calculations"],
+    status_code=status.HTTP_200_OK,
+)
+async def calculate_invest_metrics_batch(payload: BatchCalcRequest) -> BatchCalcResult:
+    """
+    Выполнить расчёт показателей сразу по множеству проектов (колоночный формат).
+    """
+    try:
+        result = calculate_metrics_batch(payload)
+        return result
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+
+
 @router.post(
     "/sensitivity",
-    response_model=SensitivityResult,
-    summary="Анализ чувствительности ±20%",
+    response_model=Union[SensitivityResult, SensitivitySweepResult],
+    summary="Анализ чувствительности ±20% или sweep по сетке изменений",
     tags=["calculations"],
     status_code=status.HTTP_200_OK,
 )
-async def sensitivity_analysis(payload: SensitivityRequest) -> SensitivityResult:
+async def sensitivity_analysis(
+    payload: SensitivityRequest,
+) -> Union[SensitivityResult, SensitivitySweepResult]:
     """
     Выполнить анализ чувствительности показателей к изменению входных параметров.
+
+    Если в запросе указан deltas или delta_range, возвращается колоночный
+    результат sweep (SensitivitySweepResult).
     """
     try:
         result = run_sensitivity(payload)
@@ -73,17 +153,339 @@ async def sensitivity_analysis(payload: SensitivityRequest) -> SensitivityResult
         ) from exc
 
 
+def _sensitivity_grid_json(payload: SensitivityGridRequest) -> str:
+    return run_sensitivity_grid(payload).model_dump_json()
+
+
+@router.post(
+    "/sensitivity/grid",
+    response_model=SensitivityGridResult,
+    summary="Двумерная таблица чувствительности (heatmap)",
+    tags=["calculations"],
+    status_code=status.HTTP_200_OK,
+)
+async def sensitivity_grid(payload: SensitivityGridRequest) -> Response:
+    """
+    Рассчитать показатель для всех сочетаний значений двух параметров.
+
+    Таблица может содержать до миллиона ячеек, поэтому расчёт и сериализация
+    выполняются в пуле расчётов, а модель сериализуется сразу в JSON
+    (без повторной валидации и jsonable_encoder).
+    """
+    try:
+        content = await run_calculation(_sensitivity_grid_json, payload)
+        return Response(content=content, media_type="application/json")
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+
+
+@router.post(
+    "/monte-carlo",
+    response_model=MonteCarloResult,
+    summary="Имитационное моделирование рисков (Monte Carlo)",
+    tags=["calculations"],
+    status_code=status.HTTP_200_OK,
+)
+async def monte_carlo_simulation(payload: MonteCarloRequest) -> MonteCarloResult:
+    """
+    Разыграть входные параметры по заданным распределениям и получить
+    распределения TCO, ROI и срока окупаемости.
+
+    Моделирование выполняется в пуле расчётов: цикл событий не ждёт
+    ни расчёта, ни пула процессов (MONTE_CARLO_WORKERS > 1).
+    """
+    try:
+        result = await run_calculation(run_monte_carlo, payload)
+        return result
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+
+
+@router.post(
+    "/goal-seek",
+    response_model=GoalSeekResult,
+    summary="Подбор параметра под целевое значение показателя",
+    tags=["calculations"],
+    status_code=status.HTTP_200_OK,
+)
+async def goal_seek(payload: GoalSeekRequest) -> GoalSeekResult:
+    """
+    Найти значение параметра (например, максимальный CAPEX), при котором
+    ROI, срок окупаемости или NPV равны заданной цели.
+    """
+    try:
+        result = run_goal_seek(payload)
+        return result
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+
+
+@router.post(
+    "/goal-seek/batch",
+    response_model=GoalSeekBatchResult,
+    summary="Пакетный подбор параметров",
+    tags=["calculations"],
+    status_code=status.HTTP_200_OK,
+)
+async def goal_seek_batch(payload: GoalSeekBatchRequest) -> GoalSeekBatchResult:
+    """
+    Решить набор целей (например, по всему портфелю) одним запросом.
+    """
+    try:
+        result = run_goal_seek_batch(payload)
+        return result
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+
+
+@router.get(
+    "/cache/stats",
+    response_model=CacheStats,
+    summary="Статистика кэша результатов расчётов",
+    tags=["service"],
+)
+async def get_cache_stats() -> CacheStats:
+    """
+    Получить размер кэша и счётчики попаданий, промахов и вытеснений.
+    """
+    return CacheStats(**result_cache.stats())
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def scenario_list_query(
+    limit: int = Query(
+        SCENARIOS_PAGE_DEFAULT_LIMIT,
+        ge=1,
+        le=SCENARIOS_PAGE_MAX_LIMIT,
+        description="Размер страницы (в потоковом режиме — размер порции чтения из хранилища).",
+    ),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущего ответа."),
+    name_prefix: Optional[str] = Query(None, description="Начало названия сценария."),
+    created_from: Optional[datetime] = Query(None, description="created_at не раньше."),
+    created_to: Optional[datetime] = Query(None, description="created_at не позже."),
+    updated_from: Optional[datetime] = Query(None, description="Время последнего изменения не раньше."),
+    updated_to: Optional[datetime] = Query(None, description="Время последнего изменения не позже."),
+) -> ScenarioListQuery:
+    """Параметры списка сценариев из query-строки."""
+    return ScenarioListQuery(
+        limit=limit,
+        cursor=cursor,
+        name_prefix=name_prefix,
+        created_from=created_from,
+        created_to=created_to,
+        updated_from=updated_from,
+        updated_to=updated_to,
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str, wildcard: bool = True) -> bool:
+    """
+    Сравнение ETag для If-None-Match (слабое: префикс W/ не учитывается).
+
+    wildcard — совпадает ли «*» (ресурс существует).
+    """
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return ("*" in tags and wildcard) or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def _second_completed(modified_at: datetime) -> bool:
+    """
+    Секунда времени изменения уже прошла. Last-Modified и If-Modified-Since
+    сравниваются с точностью до секунды, поэтому пока секунда не закончилась,
+    следующее изменение в ту же секунду от них неотличимо (остаётся ETag).
+    """
+    return datetime.now(timezone.utc) >= modified_at.replace(microsecond=0) + timedelta(seconds=1)
+
+
+def _not_modified_since(if_modified_since: str, modified_at: datetime) -> bool:
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    ## Last-Modified передаётся с точностью до секунды
+    return modified_at.replace(microsecond=0) <= since
+
+
+async def _conditional_get(
+    request: Request,
+    *variant: str,
+    exists: Optional[Callable[[], bool]] = None,
+) -> Tuple[Optional[Response], dict]:
+    """
+    Условный GET по версии хранилища (store_version), без чтения сценариев.
+
+    variant — всё, от чего кроме данных зависит ответ (путь, параметры, формат);
+    ETag = хэш версии хранилища и variant. exists — проверка существования
+    ресурса для If-None-Match: * (вызывается только для этого заголовка);
+    None — ресурс существует всегда.
+    Last-Modified не выдаётся (а If-Modified-Since не учитывается), пока
+    не закончилась секунда последнего изменения хранилища.
+    Возвращает (ответ 304 или None, заголовки ETag/Last-Modified для ответа 200).
+    """
+    version = await run_blocking(store_version)
+    if version is None:
+        return None, {}
+
+    digest = hashlib.blake2b("\x1f".join((version.tag,) + variant).encode("utf-8"), digest_size=12)
+    headers = {"ETag": f'W/"{digest.hexdigest()}"', "Cache-Control": "no-cache"}
+    modified_at = version.modified_at
+    if modified_at is not None and not _second_completed(modified_at):
+        modified_at = None
+    if modified_at is not None:
+        headers["Last-Modified"] = email.utils.format_datetime(modified_at, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        wildcard = exists is None or await run_blocking(exists)
+        not_modified = _etag_matches(if_none_match, headers["ETag"], wildcard)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(
+            if_modified_since
+            and modified_at is not None
+            and _not_modified_since(if_modified_since, modified_at)
+        )
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers), headers
+    return None, headers
+
+
+def _ndjson_chunks(
+    first: Optional[BaseModel],
+    items: Iterator[BaseModel],
+    chunk_items: int,
+) -> Iterator[bytes]:
+    """
+    Сериализует модели в NDJSON (одна строка JSON на модель).
+
+    Модели приходят из хранилища по одной; строки отдаются блоками
+    по chunk_items, чтобы не переключаться в пул потоков на каждую строку.
+    """
+    if first is None:
+        return
+    lines = [first.model_dump_json()]
+    for item in items:
+        lines.append(item.model_dump_json())
+        if len(lines) >= chunk_items:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def _ndjson_response(
+    items: Iterator[BaseModel],
+    headers: Optional[dict] = None,
+    chunk_items: Optional[int] = None,
+) -> StreamingResponse:
+    """
+    Потоковый NDJSON-ответ из итератора моделей.
+
+    Первый элемент читается заранее (в пуле потоков хранилища): так ошибки
+    параметров (например, некорректный курсор) превращаются в 422 до начала потока.
+    chunk_items — строк в блоке ответа (по умолчанию settings.STREAM_CHUNK_ITEMS).
+    """
+    try:
+        first = await run_blocking(next, items, None)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+    return StreamingResponse(
+        _ndjson_chunks(first, items, chunk_items or settings.STREAM_CHUNK_ITEMS),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
 @router.get(
     "/scenarios",
     response_model=List[ScenarioShort],
-    summary="Список сценариев (JSON-хранилище)",
+    summary="Список сценариев (постранично, с фильтрами)",
     tags=["scenarios"],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
 )
-async def get_scenarios() -> List[ScenarioShort]:
+async def get_scenarios(
+    request: Request,
+    response: Response,
+    query: ScenarioListQuery = Depends(scenario_list_query),
+    accept: Optional[str] = Header(None),
+):
     """
-    Получить список всех сохранённых сценариев расчётов.
+    Получить страницу сохранённых сценариев — от последних изменённых к давним.
+
+    Если есть следующая страница, её курсор возвращается в заголовке X-Next-Cursor.
+
+    С заголовком Accept: application/x-ndjson возвращаются все подходящие сценарии
+    потоком (по строке JSON на сценарий), без сборки списка в памяти.
+
+    Ответ содержит ETag и Last-Modified; с совпадающим If-None-Match
+    (или If-Modified-Since) возвращается 304 без чтения сценариев.
     """
-    return list_scenarios()
+    stream = bool(accept and NDJSON_MEDIA_TYPE in accept)
+    not_modified, headers = await _conditional_get(
+        request, "list", str(request.query_params), "ndjson" if stream else "json"
+    )
+    if not_modified is not None:
+        return not_modified
+    if stream:
+        return await _ndjson_response(iter_scenarios(query), headers=headers)
+
+    try:
+        page = await run_blocking(list_scenarios_page, query)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+    response.headers.update(headers)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
+
+@router.get(
+    "/scenarios/export",
+    summary="Выгрузка полных сценариев (NDJSON-поток)",
+    tags=["scenarios"],
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_scenarios(
+    request: Request,
+    query: ScenarioListQuery = Depends(scenario_list_query),
+) -> Response:
+    """
+    Выгрузить сценарии со всеми данными (ScenarioDetail) — по строке JSON на сценарий.
+
+    Фильтры те же, что у списка; сценарии читаются из хранилища порциями
+    и сразу отдаются клиенту, поэтому память не растёт с числом сценариев.
+    Поддерживается условный GET (ETag/Last-Modified, 304).
+    """
+    not_modified, headers = await _conditional_get(request, "export", str(request.query_params))
+    if not_modified is not None:
+        return not_modified
+    return await _ndjson_response(
+        iter_scenario_details(query),
+        headers={**headers, "Content-Disposition": 'attachment; filename="scenarios.ndjson"'},
+    )
 
 
 @router.get(
@@ -92,16 +494,24 @@ async def get_scenarios() -> List[ScenarioShort]:
     summary="Получить сценарий по идентификатору",
     tags=["scenarios"],
 )
-async def get_scenario_by_id(scenario_id: str) -> ScenarioDetail:
+async def get_scenario_by_id(scenario_id: str, request: Request, response: Response):
     """
     Получить детальную информацию о сценарии по его ID.
+
+    Поддерживается условный GET (ETag/Last-Modified, 304 без чтения сценария).
     """
-    scenario = get_scenario(scenario_id)
+    not_modified, headers = await _conditional_get(
+        request, "scenario", scenario_id, exists=lambda: get_scenario(scenario_id) is not None
+    )
+    if not_modified is not None:
+        return not_modified
+    scenario = await run_blocking(get_scenario, scenario_id)
     if scenario is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Scenario with id={scenario_id} not found",
         )
+    response.headers.update(headers)
     return scenario
 
 
@@ -117,10 +527,217 @@ async def create_or_update_scenario(scenario: ScenarioDetail) -> ScenarioDetail:
     Создать новый или обновить существующий сценарий.
     """
     try:
-        saved = save_scenario(scenario)
+        saved = await run_blocking(save_scenario, scenario)
         return saved
     except OSError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save scenario: {exc}",
         ) from exc
+
+
+def _import_body(body: bytes, ndjson: bool) -> ScenarioImportResult:
+    """Разбор тела запроса и импорт (выполняется в пуле потоков хранилища)."""
+    records = iter_ndjson(body.splitlines()) if ndjson else parse_import_payload(body)
+    return import_scenarios(records)
+
+
+@router.post(
+    "/scenarios/import",
+    response_model=ScenarioImportResult,
+    summary="Массовый импорт сценариев (JSON-массив или NDJSON)",
+    tags=["scenarios"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/ScenarioDetail"}}},
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def import_scenarios_bulk(
+    request: Request,
+    content_type: Optional[str] = Header(None),
+) -> ScenarioImportResult:
+    """
+    Импортировать сценарии одним запросом.
+
+    Тело — JSON-массив сценариев или (Content-Type: application/x-ndjson)
+    по одному сценарию на строку. id и даты необязательны; голые входные
+    данные (как data/input-*.json) оборачиваются в сценарий.
+
+    Ошибочные записи не прерывают импорт и перечисляются в errors,
+    все корректные записи сохраняются одной фиксацией.
+    """
+    body = await request.body()
+    ndjson = bool(content_type and NDJSON_MEDIA_TYPE in content_type)
+    try:
+        return await run_blocking(_import_body, body, ndjson)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+    except OSError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import scenarios: {exc}",
+        ) from exc
+
+
+@router.post(
+    "/scenarios/recompute",
+    response_model=ScenarioRecomputeProgress,
+    summary="Пересчёт сохранённых результатов (last_result) по текущим формулам",
+    tags=["scenarios"],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def recompute_stored_results(
+    force: bool = Query(False, description="Пересчитать все сценарии, а не только устаревшие."),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Пересчитать last_result сохранённых сценариев.
+
+    По умолчанию пересчитываются только сценарии, результат которых отсутствует
+    или получен другой версией формул (formula_version). Возвращается итог
+    с пропускной способностью; с заголовком Accept: application/x-ndjson ход
+    пересчёта отдаётся потоком — строка после каждой порции, последняя с done=true.
+    """
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return await _ndjson_response(iter_recompute_scenarios(force=force), chunk_items=1)
+
+    try:
+        return await run_blocking(recompute_scenarios, None, force)
+    except OSError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to recompute scenarios: {exc}",
+        ) from exc
+
+
+def portfolio_analytics_query(
+    percentiles: List[float] = Query(
+        [5.0, 25.0, 50.0, 75.0, 95.0],
+        description="Уровни перцентилей (в процентах); параметр можно повторять.",
+    ),
+    histogram_bins: int = Query(20, description="Количество интервалов гистограммы срока окупаемости."),
+) -> PortfolioAnalyticsQuery:
+    """Параметры аналитики из query-строки (ошибки валидации — 422)."""
+    try:
+        return PortfolioAnalyticsQuery(percentiles=percentiles, histogram_bins=histogram_bins)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        ) from exc
+
+
+@router.get(
+    "/analytics/scenarios",
+    response_model=PortfolioAnalytics,
+    summary="Сводная аналитика по всем сохранённым сценариям",
+    tags=["analytics"],
+)
+async def scenarios_analytics(
+    request: Request,
+    response: Response,
+    query: PortfolioAnalyticsQuery = Depends(portfolio_analytics_query),
+):
+    """
+    Портфельные показатели по всем сценариям хранилища: суммарные CAPEX/OPEX/эффекты,
+    число неокупающихся проектов, перцентили ROI, распределение срока окупаемости и NPV.
+
+    Таблица сценариев кэшируется и пересобирается только после изменения хранилища,
+    поэтому повторные запросы выполняются за миллисекунды, а с If-None-Match —
+    отвечают 304 без расчёта.
+    """
+    not_modified, headers = await _conditional_get(request, "analytics", str(request.query_params))
+    if not_modified is not None:
+        return not_modified
+    result = await run_blocking(portfolio_analytics, query)
+    response.headers.update(headers)
+    return result
+
+
+## === ДИАГНОСТИКА: ПРОФИЛИ ЗАПРОСОВ ===
+
+
+def _require_profiling() -> None:
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is disabled (settings.PROFILING_ENABLED)",
+        )
+
+
+@router.get(
+    "/debug/profiles",
+    response_model=List[RequestProfileInfo],
+    summary="Список сохранённых профилей запросов",
+    tags=["debug"],
+)
+async def get_request_profiles() -> List[RequestProfileInfo]:
+    """
+    Профили запросов, выполненных с заголовком X-Profile (от новых к старым).
+
+    Доступно, только если включён settings.PROFILING_ENABLED.
+    """
+    _require_profiling()
+    return [RequestProfileInfo.model_validate(item) for item in await run_blocking(list_profiles)]
+
+
+@router.get(
+    "/debug/profiles/{profile_id}/{kind}",
+    summary="Скачать профиль запроса (pstats или collapsed stacks)",
+    tags=["debug"],
+)
+async def download_request_profile(profile_id: str, kind: str) -> FileResponse:
+    """
+    Файл профиля:
+    - pstats — статистика cProfile (python -m pstats, snakeviz);
+    - collapsed — свёрнутые стеки для flamegraph (flamegraph.pl, speedscope).
+    """
+    _require_profiling()
+    path = profile_file(profile_id, kind) if kind in ("pstats", "collapsed") else None
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id}/{kind} not found",
+        )
+    media_type = "application/octet-stream" if kind == "pstats" else "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
+## === ДИАГНОСТИКА: ТРАССЫ ЗАПРОСОВ ===
+
+
+def _require_traces_endpoint() -> None:
+    if not settings.TRACING_DEBUG_ENDPOINT_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Traces endpoint is disabled (settings.TRACING_DEBUG_ENDPOINT_ENABLED)",
+        )
+
+
+@router.get(
+    "/debug/traces/slowest",
+    response_model=List[TraceInfo],
+    summary="Самые долгие из последних трасс запросов",
+    tags=["debug"],
+)
+async def get_slowest_traces(
+    limit: int = Query(10, ge=1, le=100, description="Число трасс."),
+) -> List[TraceInfo]:
+    """
+    Самые долгие запросы из последних settings.TRACING_BUFFER_SIZE со спанами
+    по слоям: api.validate / api.handler / api.serialize / api.send,
+    service.* (расчёты, операции со сценариями) и storage.* (чтение файлов,
+    разбор записей, запись журнала, запросы SQLite).
+
+    Доступно только при settings.TRACING_DEBUG_ENDPOINT_ENABLED (иначе 404).
+    """
+    _require_traces_endpoint()
+    return [TraceInfo.model_validate(trace.summary()) for trace in trace_buffer.slowest(limit)]
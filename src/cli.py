@@ -0,0 +1,131 @@
+## src/cli.py
+"""
+Командная строка InvestCalc (служебные операции без запуска API).
+
+Запуск из корня проекта:
+    python -m src.cli import data/input-*.json data/samples/*.json
+    python -m src.cli import export.ndjson --backend sqlite
+    python -m src.cli recompute [--force]
+
+Команды:
+- import — массовый импорт сценариев из файлов: JSON-массив, один сценарий
+  (объект) или NDJSON (*.ndjson, *.jsonl, либо «-» — NDJSON из stdin).
+  Записи из всех файлов проверяются пачками и сохраняются одной фиксацией,
+  ошибочные записи выводятся в отчёте и не прерывают импорт.
+- recompute — пересчёт last_result сохранённых сценариев по текущей версии
+  формул (только устаревшие, с --force — все); ход пересчёта выводится в stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+from src.core.config import settings
+from src.models.invest import ScenarioRecomputeProgress
+from src.services.invest_service import (
+    import_scenarios,
+    iter_ndjson,
+    parse_import_payload,
+    recompute_scenarios,
+)
+from src.storage import STORAGE_BACKENDS, ScenarioStorage, get_storage
+
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+
+
+def _file_records(name: str) -> Iterator[Any]:
+    """Записи одного файла; ошибка чтения или разбора файла — одна ошибочная запись."""
+    if name == "-":
+        yield from iter_ndjson(sys.stdin)
+        return
+    path = Path(name)
+    try:
+        if path.suffix.lower() in NDJSON_SUFFIXES:
+            with path.open("r", encoding="utf-8") as f:
+                yield from iter_ndjson(f)
+        else:
+            yield from parse_import_payload(path.read_bytes())
+    except (OSError, ValueError) as exc:
+        yield ValueError(f"{name}: {exc}")
+
+
+def _storage(args: argparse.Namespace) -> ScenarioStorage:
+    if args.backend:
+        settings.STORAGE_BACKEND = args.backend
+    return get_storage()
+
+
+def _cmd_import(args: argparse.Namespace) -> int:
+    storage = _storage(args)
+    try:
+        records = itertools.chain.from_iterable(_file_records(name) for name in args.files)
+        result = import_scenarios(records, storage)
+    finally:
+        storage.close()
+
+    print(json.dumps(result.model_dump(mode="json"), ensure_ascii=False, indent=2))
+    return 1 if result.failed and args.strict else 0
+
+
+def _print_progress(progress: ScenarioRecomputeProgress) -> None:
+    print(
+        f"просмотрено {progress.scanned}, пересчитано {progress.recomputed}, "
+        f"пропущено {progress.skipped}, ошибок {progress.failed} — "
+        f"{progress.scenarios_per_second:.0f} сценариев/с",
+        file=sys.stderr,
+    )
+
+
+def _cmd_recompute(args: argparse.Namespace) -> int:
+    storage = _storage(args)
+    try:
+        report = recompute_scenarios(storage, force=args.force, on_progress=_print_progress)
+    finally:
+        storage.close()
+
+    print(json.dumps(report.model_dump(mode="json"), ensure_ascii=False, indent=2))
+    return 1 if report.failed else 0
+
+
+def _add_backend_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--backend",
+        choices=sorted(STORAGE_BACKENDS),
+        help="Хранилище сценариев (по умолчанию settings.STORAGE_BACKEND).",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Служебные команды InvestCalc.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Массовый импорт сценариев из файлов.")
+    import_parser.add_argument("files", nargs="+", help="JSON/NDJSON-файлы; «-» — NDJSON из stdin.")
+    _add_backend_argument(import_parser)
+    import_parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Код возврата 1, если хотя бы одна запись отклонена.",
+    )
+    import_parser.set_defaults(handler=_cmd_import)
+
+    recompute_parser = commands.add_parser("recompute", help="Пересчёт last_result сохранённых сценариев.")
+    recompute_parser.add_argument("--force", action="store_true", help="Пересчитать все сценарии, а не только устаревшие.")
+    _add_backend_argument(recompute_parser)
+    recompute_parser.set_defaults(handler=_cmd_recompute)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,8 @@
 Здесь централизовано определяются:
 - корневая папка проекта;
 - каталог для JSON-данных;
-- путь к файлу сценариев.
+- путь к файлу сценариев (снимок) и порог уплотнения журнала сохранений;
+- выбор хранилища сценариев (JSON или SQLite).
 
 При необходимости сюда можно добавить:
 - чтение переменных окружения;
@@ -15,6 +16,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional
 
 
 class Settings:
@@ -31,6 +33,67 @@ class Settings:
         ## Файл, в котором будут храниться сценарии расчётов
         self.SCENARIOS_FILE: Path = self.DATA_DIR / "scenarios.json"
 
+        ## Хранилище сценариев: "json" (scenarios.json + журнал) или "sqlite" (SCENARIOS_DB_FILE)
+        self.STORAGE_BACKEND: str = "json"
+        self.SCENARIOS_DB_FILE: Path = self.DATA_DIR / "scenarios.sqlite3"
+
+        ## Операции с хранилищем выполняются вне цикла событий в пуле из STORAGE_THREADS потоков
+        ## (см. src/core/threads.py)
+        self.STORAGE_THREADS: int = 8
+        ## Тяжёлые расчёты (таблица чувствительности, Monte Carlo) — в отдельном пуле
+        ## из CALC_THREADS потоков; при MONTE_CARLO_WORKERS > 1 поток расчёта лишь ждёт пул процессов
+        self.CALC_THREADS: int = 4
+
+        ## Потоковая выдача сценариев (NDJSON): строк в одном блоке ответа
+        self.STREAM_CHUNK_ITEMS: int = 64
+
+        ## Сохранения сценариев дописываются в журнал scenarios.journal.jsonl;
+        ## когда журнал превышает этот размер, он сворачивается в scenarios.json в фоне.
+        self.SCENARIOS_JOURNAL_COMPACT_BYTES: int = 4 * 1024 * 1024
+
+        ## Групповая фиксация: сохранения, пришедшие в течение окна, пишутся в журнал
+        ## одной дозаписью с одним fsync (не более MAX_BATCH сохранений за раз)
+        self.SCENARIOS_GROUP_COMMIT_WINDOW_MS: float = 2.0
+        self.SCENARIOS_GROUP_COMMIT_MAX_BATCH: int = 512
+
+        ## Массовый импорт сценариев: записей в одной пачке валидации
+        self.SCENARIOS_IMPORT_BATCH: int = 500
+
+        ## Пересчёт last_result сохранённых сценариев: сценариев в одной порции
+        ## (векторный расчёт + одна фиксация сохранения на порцию)
+        self.SCENARIOS_RECOMPUTE_CHUNK: int = 500
+
+        ## Быстрые ответы API (см. src/core/responses.py, включаются в create_app):
+        ## модели сериализуются pydantic-core сразу в байты (без повторной валидации
+        ## и jsonable_encoder), ответы больше GZIP_MINIMUM_SIZE байт сжимаются gzip
+        self.FAST_RESPONSES: bool = False
+        self.GZIP_MINIMUM_SIZE: int = 1024
+        self.GZIP_COMPRESS_LEVEL: int = 5
+
+        ## Метрики в формате Prometheus (GET /metrics, см. src/core/metrics.py):
+        ## длительность запросов по маршрутам, расчётов и операций с хранилищем
+        self.METRICS_ENABLED: bool = True
+
+        ## Профилирование запросов по требованию (см. src/core/profiling.py):
+        ## при PROFILING_ENABLED запрос с заголовком PROFILING_HEADER (например, «X-Profile: 1»)
+        ## выполняется под cProfile и выборочным профилировщиком; профили (pstats + collapsed
+        ## stacks для flamegraph) пишутся в DATA_DIR/profiles, хранятся последние PROFILING_MAX_PROFILES
+        self.PROFILING_ENABLED: bool = False
+        self.PROFILING_HEADER: str = "X-Profile"
+        self.PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+        self.PROFILING_MAX_PROFILES: int = 50
+
+        ## Трассировка запросов (см. src/core/tracing.py): спаны API → сервис → хранилище;
+        ## последние TRACING_BUFFER_SIZE трасс — в памяти, при заданном TRACING_EXPORT_FILE
+        ## спаны дописываются в JSONL-файл. GET /api/v1/debug/traces/slowest отдаёт пути
+        ## запросов и атрибуты спанов (в том числе пути файлов), поэтому по умолчанию
+        ## выключен (404): включается TRACING_DEBUG_ENDPOINT_ENABLED
+        self.TRACING_ENABLED: bool = True
+        self.TRACING_DEBUG_ENDPOINT_ENABLED: bool = False
+        self.TRACING_BUFFER_SIZE: int = 256
+        self.TRACING_MAX_SPANS: int = 256
+        self.TRACING_EXPORT_FILE: Optional[Path] = None
+
         ## Метаданные приложения (для Swagger)
         self.APP_NAME: str = "InvestCalc API"
         self.APP_DESCRIPTION: str = (
@@ -43,5 +106,17 @@ class Settings:
         )
         self.APP_VERSION: str = "0.1.0"
 
+        ## Имитационное моделирование (Monte Carlo):
+        ## выборка делится на блоки по MONTE_CARLO_CHUNK_SIZE испытаний;
+        ## при MONTE_CARLO_WORKERS > 1 блоки считаются в пуле процессов.
+        self.MONTE_CARLO_WORKERS: int = 1
+        self.MONTE_CARLO_CHUNK_SIZE: int = 250_000
+
+        ## Кэш результатов calculate_metrics() / run_sensitivity() (см. src/services/cache.py):
+        ## LRU на RESULT_CACHE_MAX_SIZE записей, запись живёт RESULT_CACHE_TTL_SECONDS секунд.
+        self.RESULT_CACHE_ENABLED: bool = True
+        self.RESULT_CACHE_MAX_SIZE: int = 1024
+        self.RESULT_CACHE_TTL_SECONDS: float = 600.0
+
 
 settings = Settings()
@@ -0,0 +1,297 @@
+## src/core/profiling.py
+"""
+Профилирование отдельных запросов по требованию.
+
+Если settings.PROFILING_ENABLED включён, запрос с заголовком
+settings.PROFILING_HEADER (по умолчанию «X-Profile: 1») выполняется под профилировщиком:
+
+- cProfile — в потоке цикла событий и в потоках пула хранилища, где
+  запрос выполняет run_blocking() (профили потоков объединяются в один pstats);
+  с Python 3.12 cProfile работает через sys.monitoring и охватывает все потоки
+  интерпретатора, поэтому там достаточно одного профилировщика сессии;
+- выборочный (sampling) профилировщик — фоновый поток раз в
+  settings.PROFILING_SAMPLE_INTERVAL_MS снимает стеки этих потоков
+  (sys._current_frames) и считает свёрнутые стеки (collapsed stacks),
+  из которых строится flamegraph (flamegraph.pl, speedscope, inferno).
+
+Результат пишется в settings.DATA_DIR / "profiles":
+<id>.pstats, <id>.collapsed и <id>.json (описание запроса); id возвращается
+в заголовке ответа X-Profile-Id. Хранится не больше settings.PROFILING_MAX_PROFILES
+профилей (самые старые удаляются). Одновременно профилируется один запрос:
+cProfile не допускает двух профилировщиков в одном потоке, а остальные
+запросы цикла событий всё равно попадают в профиль потока цикла.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import contextvars
+import json
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+
+T = TypeVar("T")
+
+PROFILES_DIRNAME = "profiles"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[a-z0-9-]+$")
+## Файлы профиля: вид → расширение
+PROFILE_FILES = {"pstats": ".pstats", "collapsed": ".collapsed", "meta": ".json"}
+
+_current: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "investcalc_profile_session", default=None
+)
+## Одновременно профилируется не больше одного запроса
+_active_lock = threading.Lock()
+## Python 3.12+: cProfile общий на интерпретатор (второй включённый Profile — ValueError)
+_PROFILE_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def profiles_dir() -> Path:
+    """Каталог профилей (внутри settings.DATA_DIR)."""
+    return settings.DATA_DIR / PROFILES_DIRNAME
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = f"{getattr(code, 'co_qualname', code.co_name)} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+    return name.replace(";", ":")
+
+
+def _collapsed_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """
+    Профилирование одного запроса: cProfile потоков запроса и выборочный
+    профилировщик по тем же потокам.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._profiles: List[cProfile.Profile] = []
+        self._threads: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._main = cProfile.Profile()
+
+    def start(self) -> None:
+        self._enter_thread()
+        self._sampler.start()
+        self._main.enable()
+
+    def stop(self) -> None:
+        self._main.disable()
+        self._stop.set()
+        self._sampler.join()
+        self._leave_thread()
+        self._profiles.append(self._main)
+
+    def _enter_thread(self) -> None:
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def _leave_thread(self) -> None:
+        with self._lock:
+            ident = threading.get_ident()
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Выполняет func в текущем (рабочем) потоке: под отдельным cProfile, а с Python 3.12 —
+        под общим профилировщиком сессии (он уже видит все потоки). Поток в любом
+        случае попадает в выборочный профилировщик.
+        """
+        self._enter_thread()
+        try:
+            if _PROFILE_SEES_ALL_THREADS:
+                return func(*args, **kwargs)
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._profiles.append(profile)
+        finally:
+            self._leave_thread()
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = [ident for ident in self._threads if ident != own]
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_collapsed_stack(frame)] += 1
+
+    def stats(self) -> pstats.Stats:
+        """Объединённая статистика cProfile всех потоков запроса."""
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+def profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Для run_blocking(): если текущий запрос профилируется, func выполнится
+    в рабочем потоке под cProfile сессии; иначе возвращается func без изменений.
+    """
+    session = _current.get()
+    if session is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        return session.run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def _profile_id(method: str, path: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", path.lower()).strip("-")[:48] or "root"
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}-{method.lower()}-{slug}-{secrets.token_hex(3)}"
+
+
+def save_profile(session: ProfileSession, profile_id: str, meta: Dict[str, Any]) -> Path:
+    """Записывает pstats, свёрнутые стеки и описание профиля; удаляет лишние старые профили."""
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    session.stats().dump_stats(str(directory / (profile_id + PROFILE_FILES["pstats"])))
+    collapsed = "".join(f"{stack} {count}\n" for stack, count in session.samples.most_common())
+    (directory / (profile_id + PROFILE_FILES["collapsed"])).write_text(collapsed, encoding="utf-8")
+    meta = {**meta, "id": profile_id, "samples": sum(session.samples.values())}
+    (directory / (profile_id + PROFILE_FILES["meta"])).write_text(
+        json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+    )
+    _prune(directory, settings.PROFILING_MAX_PROFILES)
+    return directory / (profile_id + PROFILE_FILES["meta"])
+
+
+def _prune(directory: Path, keep: int) -> None:
+    ids = sorted(path.stem for path in directory.glob("*" + PROFILE_FILES["meta"]))
+    for profile_id in ids[: max(len(ids) - keep, 0)]:
+        for suffix in PROFILE_FILES.values():
+            (directory / (profile_id + suffix)).unlink(missing_ok=True)
+
+
+def list_profiles() -> List[dict]:
+    """Описания сохранённых профилей, от новых к старым."""
+    directory = profiles_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob("*" + PROFILE_FILES["meta"]), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_file(profile_id: str, kind: str) -> Optional[Path]:
+    """Путь к файлу профиля вида kind (pstats | collapsed | meta) или None."""
+    if kind not in PROFILE_FILES or not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = profiles_dir() / (profile_id + PROFILE_FILES[kind])
+    return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: профилирует запрос с заголовком settings.PROFILING_HEADER,
+    пока settings.PROFILING_ENABLED включён. Профиль охватывает запрос
+    целиком — до отправки последнего блока тела ответа.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _active_lock.acquire(blocking=False):
+            ## Уже профилируется другой запрос — этот выполняется как обычно
+            await self.app(scope, receive, self._with_headers(send, {b"x-profile-status": b"busy"}))
+            return
+
+        profile_id = _profile_id(scope["method"], scope["path"])
+        session = ProfileSession(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+        status_code = 500
+        headers = {b"x-profile-id": profile_id.encode("ascii")}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await self._with_headers(send, headers)(message)
+
+        token = _current.set(session)
+        started = time.perf_counter()
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            try:
+                await asyncio.to_thread(
+                    save_profile,
+                    session,
+                    profile_id,
+                    {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "query": scope.get("query_string", b"").decode("latin-1"),
+                        "status": status_code,
+                        "duration_ms": round(duration * 1000, 3),
+                        "created_at": datetime.now(timezone.utc).isoformat(),
+                    },
+                )
+            finally:
+                _active_lock.release()
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        header = settings.PROFILING_HEADER.lower().encode("latin-1")
+        for name, value in scope.get("headers", []):
+            if name == header:
+                return value.strip().lower() not in (b"", b"0", b"false", b"no")
+        return False
+
+    @staticmethod
+    def _with_headers(send: Send, headers: Dict[bytes, bytes]) -> Send:
+        async def wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + list(headers.items())}
+            await send(message)
+
+        return wrapper
@@ -0,0 +1,126 @@
+## src/core/responses.py
+"""
+Быстрые JSON-ответы и сжатие ответов API (включаются в create_app).
+
+По умолчанию FastAPI для каждого ответа повторно валидирует возвращённое
+значение по response_model, преобразует его в dict/list (model_dump в режиме
+JSON), а затем Starlette сериализует результат через json.dumps. Для больших
+ответов (анализ чувствительности, списки сценариев) это занимает больше
+времени, чем сам расчёт.
+
+enable_fast_json(app) подменяет вызов обработчиков маршрутов: значение,
+которое вернул обработчик, сразу сериализуется pydantic-core в байты
+(PydanticJSONResponse), без повторной валидации и промежуточных dict.
+Схема OpenAPI (response_model) при этом не меняется. Обработчики, которые
+сами возвращают Response (NDJSON, 304, таблица чувствительности), не затрагиваются.
+
+GZipResponseMiddleware сжимает ответы больше порога, если клиент прислал
+Accept-Encoding: gzip; потоковые ответы (NDJSON) сжимаются по блокам
+и отправляются клиенту сразу, без накопления в буфере gzip.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import gzip
+import io
+import zlib
+from typing import Any, Callable, Optional
+
+import pydantic_core
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.responses import Response
+from starlette.routing import request_response
+from starlette.types import Receive, Scope, Send
+
+
+class PydanticJSONResponse(Response):
+    """
+    JSON-ответ, сериализуемый pydantic-core напрямую в байты.
+
+    Принимает модели pydantic, списки/словари моделей и обычные JSON-значения;
+    datetime, Enum и т.п. сериализуются так же, как в model_dump_json().
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
+
+
+def _fast_json_call(endpoint: Callable[..., Any], route: APIRoute) -> Callable[..., Any]:
+    """Обёртка обработчика маршрута: результат сразу превращается в PydanticJSONResponse."""
+    response_param = route.dependant.response_param_name
+
+    @functools.wraps(endpoint)
+    async def call(**values: Any) -> Any:
+        result = await endpoint(**values)
+        if isinstance(result, Response):
+            return result
+        response = PydanticJSONResponse(result, status_code=route.status_code or 200)
+        ## Заголовки и код, выставленные обработчиком через параметр response: Response
+        sub_response: Optional[Response] = values.get(response_param) if response_param else None
+        if sub_response is not None:
+            if sub_response.status_code:
+                response.status_code = sub_response.status_code
+            for name, value in sub_response.raw_headers:
+                if name != b"content-length":
+                    response.raw_headers.append((name, value))
+        return response
+
+    return call
+
+
+def enable_fast_json(app: FastAPI) -> int:
+    """
+    Включает быструю сериализацию для всех асинхронных маршрутов API приложения;
+    возвращает число подключённых маршрутов. Вызывается после include_router().
+    """
+    enabled = 0
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or getattr(route, "fast_json", False):
+            continue
+        if not asyncio.iscoroutinefunction(route.dependant.call):
+            continue
+        route.dependant.call = _fast_json_call(route.dependant.call, route)
+        route.app = request_response(route.get_route_handler())
+        route.fast_json = True
+        enabled += 1
+    return enabled
+
+
+class _FlushingGzipFile(gzip.GzipFile):
+    """GzipFile, который после каждой записи сбрасывает сжатые данные в буфер (Z_SYNC_FLUSH)."""
+
+    def write(self, data: Any) -> int:
+        written = super().write(data)
+        if written:
+            self.flush(zlib.Z_SYNC_FLUSH)
+        return written
+
+
+class _StreamingGZipResponder(GZipResponder):
+    def __init__(self, app: Any, minimum_size: int, compresslevel: int = 9) -> None:
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        ## Новый буфер: GzipFile базового класса уже записал заголовок gzip в прежний
+        self.gzip_buffer = io.BytesIO()
+        self.gzip_file = _FlushingGzipFile(mode="wb", fileobj=self.gzip_buffer, compresslevel=compresslevel)
+
+
+class GZipResponseMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware Starlette, в котором каждый блок потокового ответа
+    отправляется клиенту сразу (иначе строки NDJSON, например ход пересчёта,
+    копились бы в буфере gzip до конца ответа).
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _StreamingGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,96 @@
+## src/core/threads.py
+"""
+Выполнение блокирующих операций вне цикла событий.
+
+Обработчики FastAPI объявлены как async def и выполняются в цикле событий.
+Операции с хранилищем сценариев (чтение/запись файлов, SQLite) блокирующие:
+вызванные напрямую, они останавливают все остальные запросы воркера.
+
+run_blocking() переносит такую операцию в ограниченный пул потоков
+(settings.STORAGE_THREADS), а цикл событий тем временем обслуживает другие запросы.
+Тяжёлые расчёты (таблица чувствительности, Monte Carlo) так же переносит
+run_calculation() — в отдельный пул (settings.CALC_THREADS), чтобы они не занимали
+потоки хранилища.
+Контекст (contextvars) вызывающей корутины передаётся в поток; если запрос
+профилируется (src/core/profiling.py), операция выполняется под его профилировщиком.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from src.core.config import settings
+from src.core.profiling import profiled
+
+
+T = TypeVar("T")
+
+_pool: Optional[ThreadPoolExecutor] = None
+_calc_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_storage_pool() -> ThreadPoolExecutor:
+    """Пул потоков для операций с хранилищем (создаётся при первом обращении)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.STORAGE_THREADS),
+                thread_name_prefix="storage",
+            )
+        return _pool
+
+
+def shutdown_storage_pool() -> None:
+    """Останавливает пул (при завершении приложения), дожидаясь начатых операций."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def get_calc_pool() -> ThreadPoolExecutor:
+    """Пул потоков для тяжёлых расчётов (создаётся при первом обращении)."""
+    global _calc_pool
+    with _pool_lock:
+        if _calc_pool is None:
+            _calc_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.CALC_THREADS),
+                thread_name_prefix="calc",
+            )
+        return _calc_pool
+
+
+def shutdown_calc_pool() -> None:
+    """Останавливает пул расчётов (при завершении приложения), дожидаясь начатых расчётов."""
+    global _calc_pool
+    with _pool_lock:
+        pool, _calc_pool = _calc_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def _run_in_pool(pool: ThreadPoolExecutor, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        pool,
+        partial(context.run, profiled(func), *args, **kwargs),
+    )
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Выполняет func(*args, **kwargs) в пуле хранилища и ожидает результат, не блокируя цикл событий."""
+    return await _run_in_pool(get_storage_pool(), func, *args, **kwargs)
+
+
+async def run_calculation(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Выполняет расчёт func(*args, **kwargs) в пуле расчётов, не блокируя цикл событий."""
+    return await _run_in_pool(get_calc_pool(), func, *args, **kwargs)
@@ -0,0 +1,388 @@
+## src/core/tracing.py
+"""
+Трассировка запросов: спаны по слоям API → сервис → хранилище.
+
+Лёгкая реализация без внешнего коллектора, по форме совместимая с
+OpenTelemetry: trace_id (16 байт) и span_id (8 байт) в hex, родительский
+спан, время начала/конца в наносекундах Unix, атрибуты и статус.
+
+- TracingMiddleware (ASGI) открывает корневой спан запроса и добавляет
+  спаны слоя API: api.validate (разбор и валидация запроса до вызова
+  обработчика), api.handler (обработчик маршрута), api.serialize (от конца
+  обработчика до начала ответа) и api.send (отправка тела, в том числе потоковая).
+- span("service.calculate_metrics", ...) / @traced(...) — спаны внутри запроса;
+  вне трассируемого запроса (CLI, тесты сервиса) это пустая операция.
+  Текущий спан хранится в contextvars, поэтому спаны из run_blocking()
+  (пул потоков хранилища) попадают в трассу запроса.
+- Завершённые трассы хранятся в кольцевом буфере (settings.TRACING_BUFFER_SIZE)
+  для GET /api/v1/debug/traces/slowest и, если задан settings.TRACING_EXPORT_FILE,
+  дописываются в JSONL-файл (по строке на спан) фоновым потоком.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.routing import request_response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+
+class Span:
+    """Спан: операция внутри трассы (поля — как у OpenTelemetry)."""
+
+    __slots__ = ("trace", "span_id", "parent_span_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent_span_id: Optional[str],
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None,
+    ) -> None:
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_OK
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        self.end_ns = time.time_ns() if end_ns is None else end_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Спан в JSON-представлении OTLP (traceId, spanId, ...Nano)."""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+        }
+
+
+class Trace:
+    """Трасса одного запроса: корневой спан и все дочерние (не больше max_spans)."""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None, max_spans: int = 256) -> None:
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+        self.root = Span(self, name, None, attributes)
+        self.spans.append(self.root)
+
+    def add(self, span: Span) -> bool:
+        """Добавляет спан; False — лимит спанов трассы исчерпан (спан не записывается)."""
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped_spans += 1
+                return False
+            self.spans.append(span)
+            return True
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms
+
+    def summary(self) -> Dict[str, Any]:
+        """Трасса для отладочного эндпоинта: спаны по времени начала, смещения от начала трассы."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start_ns)
+        start = self.root.start_ns
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": datetime.fromtimestamp(start / 1e9, tz=timezone.utc),
+            "duration_ms": round(self.duration_ms, 3),
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "span_id": item.span_id,
+                    "parent_span_id": item.parent_span_id,
+                    "name": item.name,
+                    "start_offset_ms": round((item.start_ns - start) / 1e6, 3),
+                    "duration_ms": round(item.duration_ms, 3),
+                    "status": item.status,
+                    "attributes": item.attributes,
+                }
+                for item in spans
+            ],
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("investcalc_span", default=None)
+
+
+## Пустой спан вне трассы (nullcontext можно использовать повторно)
+_NOOP = nullcontext()
+
+
+@contextmanager
+def _active(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.status = STATUS_ERROR
+        span.attributes.setdefault("exception.type", type(exc).__name__)
+        raise
+    finally:
+        span.end()
+        _current_span.reset(token)
+
+
+def span(name: str, **attributes: Any):
+    """
+    Контекстный менеджер дочернего спана текущей трассы.
+
+    Вне трассируемого запроса ничего не записывает (возвращает None в as).
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    if not parent.trace.add(child):
+        return _NOOP
+    return _active(child)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: str) -> Callable:
+    """Декоратор: каждый вызов функции внутри трассы — спан name."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+## === ХРАНЕНИЕ И ЭКСПОРТ ЗАВЕРШЁННЫХ ТРАСС ===
+
+
+class TraceBuffer:
+    """Кольцевой буфер последних завершённых трасс."""
+
+    def __init__(self, size: int) -> None:
+        self._traces: Deque[Trace] = deque(maxlen=max(size, 1))
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def slowest(self, limit: int) -> List[Trace]:
+        """Самые долгие из буферизованных трасс (по длительности корневого спана)."""
+        with self._lock:
+            traces = list(self._traces)
+        return sorted(traces, key=lambda trace: trace.duration_ms, reverse=True)[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+class JsonlExporter:
+    """Запись спанов в JSONL-файл фоновым потоком (цикл событий не ждёт диск)."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace, path: Path) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        self._queue.put((path, [span.to_dict() for span in trace.spans]))
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Ждёт записи всех поставленных в очередь трасс."""
+        done = threading.Event()
+        self._queue.put((None, done))
+        if self._thread is not None and self._thread.is_alive():
+            done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            path, payload = self._queue.get()
+            if path is None:
+                payload.set()
+                continue
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(item, ensure_ascii=False, default=str) + "\n" for item in payload))
+            except OSError:
+                logger.exception("Не удалось записать трассу в %s", path)
+
+
+trace_buffer = TraceBuffer(settings.TRACING_BUFFER_SIZE)
+jsonl_exporter = JsonlExporter()
+
+
+def finish_trace(trace: Trace) -> None:
+    """Помещает завершённую трассу в буфер и, если настроено, в JSONL-файл."""
+    trace_buffer.add(trace)
+    if settings.TRACING_EXPORT_FILE is not None:
+        jsonl_exporter.export(trace, Path(settings.TRACING_EXPORT_FILE))
+
+
+## === СЛОЙ API ===
+
+
+class _RequestTiming:
+    """Отметки времени обработчика маршрута (для спанов api.validate / api.serialize)."""
+
+    __slots__ = ("handler_start_ns", "handler_end_ns")
+
+    def __init__(self) -> None:
+        self.handler_start_ns: Optional[int] = None
+        self.handler_end_ns: Optional[int] = None
+
+
+_request_timing: contextvars.ContextVar[Optional[_RequestTiming]] = contextvars.ContextVar(
+    "investcalc_request_timing", default=None
+)
+
+
+def _traced_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(endpoint)
+    async def call(**values: Any) -> Any:
+        timing = _request_timing.get()
+        if timing is None:
+            return await endpoint(**values)
+        timing.handler_start_ns = time.time_ns()
+        try:
+            with span("api.handler", **{"code.function": endpoint.__name__}):
+                return await endpoint(**values)
+        finally:
+            timing.handler_end_ns = time.time_ns()
+
+    return call
+
+
+def instrument_routes(app: FastAPI) -> int:
+    """
+    Оборачивает асинхронные обработчики маршрутов спаном api.handler;
+    вызывается после include_router() и до enable_fast_json().
+    """
+    instrumented = 0
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or getattr(route, "traced", False):
+            continue
+        if not asyncio.iscoroutinefunction(route.dependant.call):
+            continue
+        route.dependant.call = _traced_endpoint(route.dependant.call)
+        route.app = request_response(route.get_route_handler())
+        route.traced = True
+        instrumented += 1
+    return instrumented
+
+
+class TracingMiddleware:
+    """ASGI-middleware: трасса на каждый HTTP-запрос (при settings.TRACING_ENABLED)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        trace = Trace(
+            f"{method} {scope['path']}",
+            {"http.method": method, "http.target": scope["path"]},
+            max_spans=settings.TRACING_MAX_SPANS,
+        )
+        root = trace.root
+        timing = _RequestTiming()
+        response_start_ns: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_start_ns
+            if message["type"] == "http.response.start":
+                response_start_ns = time.time_ns()
+                root.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+            await send(message)
+
+        span_token = _current_span.set(root)
+        timing_token = _request_timing.set(timing)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            root.status = STATUS_ERROR
+            raise
+        finally:
+            root.end()
+            _current_span.reset(span_token)
+            _request_timing.reset(timing_token)
+            self._finish(trace, scope, timing, response_start_ns)
+
+    @staticmethod
+    def _finish(trace: Trace, scope: Scope, timing: _RequestTiming, response_start_ns: Optional[int]) -> None:
+        root = trace.root
+        route = getattr(scope.get("route"), "path", None)
+        if route:
+            root.name = f"{scope['method']} {route}"
+            root.attributes["http.route"] = route
+
+        def phase(name: str, start: Optional[int], end: Optional[int]) -> None:
+            if start is not None and end is not None and end >= start:
+                phase_span = Span(trace, name, root.span_id, start_ns=start)
+                phase_span.end(end)
+                trace.add(phase_span)
+
+        phase("api.validate", root.start_ns, timing.handler_start_ns)
+        phase("api.serialize", timing.handler_end_ns, response_start_ns)
+        phase("api.send", response_start_ns, root.end_ns)
+        finish_trace(trace)
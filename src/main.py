@@ -6,21 +6,39 @@
 - создать объект FastAPI с метаданными (Swagger / OpenAPI);
 - настроить CORS;
 - подключить роуты API (v1);
+- метрики Prometheus (/metrics) при settings.METRICS_ENABLED;
+- профилирование запросов по заголовку X-Profile при settings.PROFILING_ENABLED;
+- трассировку запросов по слоям API → сервис → хранилище (src/core/tracing.py);
+- при settings.FAST_RESPONSES — быструю сериализацию JSON и gzip (src/core/responses.py);
 - определить базовые служебные эндпоинты (/, /health, /redoc).
 """
 
-from fastapi import FastAPI
+from typing import Optional
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.openapi.docs import get_redoc_html
 
 from src.api.v1.routes_invest import router as invest_router
 from src.core.config import settings
+from src.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from src.core.profiling import ProfilingMiddleware
+from src.core.responses import GZipResponseMiddleware, enable_fast_json
+from src.core.threads import run_blocking, shutdown_calc_pool, shutdown_storage_pool
+from src.core.tracing import TracingMiddleware, instrument_routes
+from src.services.invest_service import shutdown_monte_carlo_pool
 from src.ui.routes_web import router as web_router
 
 
-def create_app() -> FastAPI:
-    """Фабрика приложения — удобно для тестирования и расширения."""
+def create_app(fast_responses: Optional[bool] = None) -> FastAPI:
+    """
+    Фабрика приложения — удобно для тестирования и расширения.
+
+    fast_responses — быстрые JSON-ответы и gzip (по умолчанию settings.FAST_RESPONSES).
+    """
+    if fast_responses is None:
+        fast_responses = settings.FAST_RESPONSES
     app = FastAPI(
         title=settings.APP_NAME,
         description=settings.APP_DESCRIPTION,
@@ -49,6 +67,33 @@ def create_app() -> FastAPI:
         web_router,
         prefix="",   ## путь будет просто /ui
     )
+    ## ---------- Трассировка: спан api.handler вокруг обработчиков (до enable_fast_json) ----------
+    instrument_routes(app)
+
+    ## ---------- Быстрые ответы: сериализация в байты + gzip ----------
+    if fast_responses:
+        enable_fast_json(app)
+        app.add_middleware(
+            GZipResponseMiddleware,
+            minimum_size=settings.GZIP_MINIMUM_SIZE,
+            compresslevel=settings.GZIP_COMPRESS_LEVEL,
+        )
+
+    ## ---------- Профилирование запросов по заголовку (при settings.PROFILING_ENABLED) ----------
+    app.add_middleware(ProfilingMiddleware)
+
+    ## ---------- Трасса на каждый запрос (при settings.TRACING_ENABLED) ----------
+    app.add_middleware(TracingMiddleware)
+
+    ## ---------- Метрики: длительность запросов (добавляется последней — внешний слой) ----------
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    ## ---------- Завершение: дождаться операций с хранилищем, остановить пул Monte Carlo ----------
+    app.add_event_handler("shutdown", shutdown_storage_pool)
+    app.add_event_handler("shutdown", shutdown_calc_pool)
+    app.add_event_handler("shutdown", shutdown_monte_carlo_pool)
+
     ## ---------- Root ----------
     @app.get("/", summary="Root endpoint", tags=["service"])
     async def root() -> dict:
@@ -65,6 +110,15 @@ def create_app() -> FastAPI:
     async def health() -> dict:
         return {"status": "ok"}
 
+    ## ---------- Metrics ----------
+    if settings.METRICS_ENABLED:
+
+        @app.get("/metrics", summary="Метрики в формате Prometheus", tags=["service"])
+        async def metrics() -> Response:
+            ## Сборщики обращаются к хранилищу — вне цикла событий
+            body = await run_blocking(metrics_registry.render)
+            return Response(content=body, media_type=METRICS_CONTENT_TYPE)
+
     ## ---------- Явное формирование OpenAPI-схемы ----------
     def custom_openapi():
         if app.openapi_schema:
@@ -5,27 +5,75 @@ Pydantic-схемы (модели данных) для InvestCalc.
 Задачи модуля:
 - Описать входные данные для расчётов (InvestInput).
 - Описать результат расчётов (InvestResult).
+- Описать пакетный (колоночный) расчёт (BatchCalc*).
 - Описать структуры для анализа чувствительности (Sensitivity*).
+- Описать запрос и результат имитационного моделирования (MonteCarlo*).
+- Описать подбор параметра под целевое значение показателя (GoalSeek*).
 - Описать модели сценариев, которые будут храниться в JSON-файлах (Scenario*).
 """
 
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List, Literal, Optional
+import base64
+import zlib
+from datetime import datetime, timezone
+from typing import Annotated, Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 ## === ВХОДНЫЕ ДАННЫЕ И РЕЗУЛЬТАТ РАСЧЁТОВ ============================================
 
 
+## Максимальный период анализа (и длина помесячного графика)
+MAX_PERIOD_MONTHS = 600
+
+SCHEDULE_FIELDS = ("capex_schedule", "opex_schedule", "effects_schedule")
+
+
+def pack_schedule(values: List[float]) -> str:
+    """
+    Упаковывает помесячный график в компактную строку для хранения в JSON:
+    float64 little-endian → zlib → base64.
+    """
+    raw = np.asarray(values, dtype="<f8").tobytes()
+    return base64.b64encode(zlib.compress(raw)).decode("ascii")
+
+
+## Предельный размер упакованного графика: MAX_PERIOD_MONTHS значений float64
+## после zlib (несжимаемые данные + служебные байты) и base64
+_MAX_SCHEDULE_BYTES = MAX_PERIOD_MONTHS * 8
+_MAX_PACKED_SCHEDULE_LENGTH = 4 * ((_MAX_SCHEDULE_BYTES + _MAX_SCHEDULE_BYTES // 1000 + 64) // 3 + 1)
+
+
+def unpack_schedule(packed: str) -> List[float]:
+    """
+    Обратное преобразование к pack_schedule().
+
+    Распаковывается не больше MAX_PERIOD_MONTHS значений: строка, которая
+    распаковывается в больший объём (zip-бомба), отклоняется до распаковки
+    целиком (ValueError).
+    """
+    if len(packed) > _MAX_PACKED_SCHEDULE_LENGTH:
+        raise ValueError("Упакованный график длиннее допустимого.")
+    decompressor = zlib.decompressobj()
+    raw = decompressor.decompress(base64.b64decode(packed), _MAX_SCHEDULE_BYTES + 1)
+    if len(raw) > _MAX_SCHEDULE_BYTES or decompressor.unconsumed_tail or not decompressor.eof:
+        raise ValueError("Упакованный график длиннее допустимого или повреждён.")
+    if decompressor.unused_data or len(raw) % 8:
+        raise ValueError("Упакованный график повреждён.")
+    return np.frombuffer(raw, dtype="<f8").tolist()
+
+
 class InvestInput(BaseModel):
     """
     Входные данные для расчёта экономической эффективности проекта.
 
     Допущение (учебный вариант):
-    - CAPEX, OPEX и эффекты задаются суммарно за период анализа.
+    - CAPEX, OPEX и эффекты задаются суммарно за период анализа;
+    - при необходимости их можно распределить по месяцам графиками *_schedule
+      (длина графика = period_months, сумма графика = соответствующему итогу).
     """
 
     project_name: Optional[str] = Field(
@@ -57,7 +105,7 @@ class InvestInput(BaseModel):
     period_months: int = Field(
         ...,
         gt=0,
-        le=600,
+        le=MAX_PERIOD_MONTHS,
         description="Период анализа в месяцах (например, 36 месяцев = 3 года).",
         examples=[36],
     )
@@ -66,11 +114,60 @@ class InvestInput(BaseModel):
         ge=0,
         le=100,
         description=(
-            "Ставка дисконтирования в процентах (если применяется). "
-            "В учебной модели может не использоваться."
+            "Годовая ставка дисконтирования в процентах. "
+            "Если задана, дополнительно рассчитываются NPV, IRR и дисконтированный срок окупаемости."
         ),
         examples=[10.0],
     )
+    capex_schedule: Optional[List[float]] = Field(
+        default=None,
+        max_length=MAX_PERIOD_MONTHS,
+        description=(
+            "Помесячный график CAPEX (элемент i — месяц i + 1). "
+            "Если не задан, CAPEX тратится целиком в начале проекта."
+        ),
+    )
+    opex_schedule: Optional[List[float]] = Field(
+        default=None,
+        max_length=MAX_PERIOD_MONTHS,
+        description="Помесячный график OPEX. Если не задан, OPEX распределяется равномерно.",
+    )
+    effects_schedule: Optional[List[float]] = Field(
+        default=None,
+        max_length=MAX_PERIOD_MONTHS,
+        description="Помесячный график эффектов. Если не задан, эффекты распределяются равномерно.",
+    )
+
+    @field_validator(*SCHEDULE_FIELDS, mode="before")
+    @classmethod
+    def _unpack_schedule(cls, value):
+        ## В хранилище графики лежат упакованными строками (см. pack_schedule)
+        if isinstance(value, str):
+            try:
+                return unpack_schedule(value)
+            except (ValueError, zlib.error) as exc:
+                raise ValueError("Некорректный упакованный помесячный график.") from exc
+        return value
+
+    @model_validator(mode="after")
+    def _check_schedules(self) -> "InvestInput":
+        for name in SCHEDULE_FIELDS:
+            schedule = getattr(self, name)
+            if schedule is None:
+                continue
+            if len(schedule) != self.period_months:
+                raise ValueError(f"Длина {name} должна совпадать с period_months ({self.period_months}).")
+            if not all(value >= 0 for value in schedule):
+                raise ValueError(f"Значения {name} не могут быть отрицательными.")
+            total = getattr(self, name.removesuffix("_schedule"))
+            if abs(sum(schedule) - total) > max(0.01, abs(total) * 1e-9):
+                raise ValueError(f"Сумма {name} должна совпадать с итоговым значением ({total}).")
+        return self
+
+    @property
+    def has_schedules(self) -> bool:
+        """Задан ли хотя бы один помесячный график."""
+        return any(getattr(self, name) is not None for name in SCHEDULE_FIELDS)
 
 
 class InvestResult(BaseModel):
@@ -104,11 +201,134 @@ class InvestResult(BaseModel):
         description="Срок окупаемости в годах.",
         examples=[1.5],
     )
+    npv: Optional[float] = Field(
+        default=None,
+        description="NPV — чистая приведённая стоимость (только при заданной ставке дисконтирования).",
+        examples=[45210.5],
+    )
+    irr_percent: Optional[float] = Field(
+        default=None,
+        description="IRR — внутренняя норма доходности, % годовых (None, если не существует).",
+        examples=[71.3],
+    )
+    discounted_payback_months: Optional[float] = Field(
+        default=None,
+        description="Дисконтированный срок окупаемости в месяцах (None, если не окупается за период).",
+        examples=[19.4],
+    )
     note: Optional[str] = Field(
         default=None,
         description="Дополнительный комментарий (например, пояснение по окупаемости).",
         examples=["Проект окупается в пределах периода анализа."],
     )
+    formula_version: Optional[int] = Field(
+        default=None,
+        description=(
+            "Версия формул, по которым получен результат (см. FORMULA_VERSION в invest_service); "
+            "None — результат сохранён клиентом или до введения версий."
+        ),
+        examples=[1],
+    )
+
+
+## === ПАКЕТНЫЙ РАСЧЁТ ================================================================
+
+
+BATCH_MAX_SIZE = 100_000
+
+
+class BatchCalcRequest(BaseModel):
+    """
+    Пакетный запрос на расчёт показателей по множеству проектов.
+
+    Данные передаются колонками: i-й проект описывается значениями
+    capex[i], opex[i], effects[i] и period_months[i].
+    Ограничения на значения те же, что и у InvestInput.
+    """
+
+    project_names: Optional[List[Optional[str]]] = Field(
+        default=None,
+        description="Названия проектов (необязательно, та же длина, что и у остальных колонок).",
+    )
+    capex: List[float] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_SIZE,
+        description="Колонка CAPEX по проектам.",
+        examples=[[100000.0, 50000.0]],
+    )
+    opex: List[float] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_SIZE,
+        description="Колонка OPEX за весь период анализа.",
+        examples=[[20000.0, 10000.0]],
+    )
+    effects: List[float] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_SIZE,
+        description="Колонка суммарных эффектов за период.",
+        examples=[[180000.0, 90000.0]],
+    )
+    period_months: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_SIZE,
+        description="Колонка периодов анализа в месяцах.",
+        examples=[[24, 12]],
+    )
+    discount_rate_percent: Optional[List[Optional[float]]] = Field(
+        default=None,
+        description="Колонка годовых ставок дисконтирования, % (необязательно; None — без DCF для строки).",
+        examples=[[10.0, None]],
+    )
+
+    @model_validator(mode="after")
+    def _check_lengths(self) -> "BatchCalcRequest":
+        size = len(self.capex)
+        columns = [self.opex, self.effects, self.period_months]
+        for optional in (self.project_names, self.discount_rate_percent):
+            if optional is not None:
+                columns.append(optional)
+        if any(len(column) != size for column in columns):
+            raise ValueError("Все колонки пакетного запроса должны иметь одинаковую длину.")
+        return self
+
+
+class BatchCalcResult(BaseModel):
+    """
+    Результат пакетного расчёта в колоночном виде.
+
+    i-е элементы колонок совпадают с полями InvestResult,
+    который вернул бы calculate_metrics() для i-го проекта.
+    """
+
+    count: int = Field(..., description="Количество рассчитанных проектов.")
+    project_names: Optional[List[Optional[str]]] = Field(
+        default=None,
+        description="Названия проектов (если были переданы).",
+    )
+    tco: List[float] = Field(..., description="TCO по проектам.")
+    roi_percent: List[float] = Field(..., description="ROI в процентах по проектам.")
+    payback_months: List[Optional[float]] = Field(
+        ...,
+        description="Срок окупаемости в месяцах (None, если проект не окупается).",
+    )
+    payback_years: List[Optional[float]] = Field(..., description="Срок окупаемости в годах.")
+    npv: Optional[List[Optional[float]]] = Field(
+        default=None,
+        description="NPV по проектам (если передана колонка ставок).",
+    )
+    irr_percent: Optional[List[Optional[float]]] = Field(
+        default=None,
+        description="IRR, % годовых (если передана колонка ставок).",
+    )
+    discounted_payback_months: Optional[List[Optional[float]]] = Field(
+        default=None,
+        description="Дисконтированный срок окупаемости в месяцах (если передана колонка ставок).",
+    )
+    note: List[str] = Field(..., description="Комментарии по окупаемости.")
 
 
 ## === АНАЛИЗ ЧУВСТВИТЕЛЬНОСТИ =========================================================
@@ -116,6 +336,31 @@ class InvestResult(BaseModel):
 
 SensitivityParameterName = Literal["capex", "opex", "effects"]
 
+## Максимальное число шагов sweep по одному параметру
+SWEEP_MAX_POINTS = 10_001
+
+SweepDelta = Annotated[float, Field(ge=-100, le=100)]
+
+
+class SensitivityDeltaRange(BaseModel):
+    """
+    Диапазон изменений параметра для режима sweep: от start до stop с шагом step (в процентах).
+
+    Пример: start=-50, stop=50, step=1 → -50%, -49%, ..., +50% (101 точка).
+    """
+
+    start: float = Field(default=-50.0, ge=-100, le=100, description="Начало диапазона, %.")
+    stop: float = Field(default=50.0, ge=-100, le=100, description="Конец диапазона (включительно), %.")
+    step: float = Field(default=1.0, gt=0, description="Шаг, %.")
+
+    @model_validator(mode="after")
+    def _check_range(self) -> "SensitivityDeltaRange":
+        if self.stop < self.start:
+            raise ValueError("delta_range: stop должен быть не меньше start.")
+        if (self.stop - self.start) / self.step + 1 > SWEEP_MAX_POINTS:
+            raise ValueError(f"delta_range: не более {SWEEP_MAX_POINTS} точек.")
+        return self
+
 
 class SensitivityRequest(BaseModel):
     """
@@ -145,6 +390,30 @@ class SensitivityRequest(BaseModel):
         description="Величина изменения параметра в процентах для анализа чувствительности (обычно 20%).",
         examples=[20.0],
     )
+    deltas: Optional[List[SweepDelta]] = Field(
+        default=None,
+        min_length=1,
+        max_length=SWEEP_MAX_POINTS,
+        description=(
+            "Режим sweep: список изменений параметров в процентах со знаком (например, [-20, -10, 10, 20]). "
+            "Если задан, delta_percent игнорируется."
+        ),
+    )
+    delta_range: Optional[SensitivityDeltaRange] = Field(
+        default=None,
+        description="Режим sweep: диапазон изменений (альтернатива списку deltas).",
+    )
+
+    @model_validator(mode="after")
+    def _check_sweep(self) -> "SensitivityRequest":
+        if self.deltas is not None and self.delta_range is not None:
+            raise ValueError("Укажите либо deltas, либо delta_range, но не оба сразу.")
+        return self
+
+    @property
+    def is_sweep(self) -> bool:
+        """Запрошен ли режим sweep (сетка изменений вместо симметричного ±delta)."""
+        return self.deltas is not None or self.delta_range is not None
 
 
 class SensitivityItem(BaseModel):
@@ -185,6 +454,332 @@ class SensitivityResult(BaseModel):
     )
 
 
+class SensitivitySweepSeries(BaseModel):
+    """
+    Результаты sweep по одному параметру в колоночном виде.
+
+    i-й элемент каждой колонки соответствует deltas[i] из SensitivitySweepResult.
+    """
+
+    parameter: SensitivityParameterName = Field(..., description="Имя изменяемого параметра.")
+    values: List[float] = Field(..., description="Значения параметра после изменения.")
+    tco: List[float] = Field(..., description="TCO в каждой точке.")
+    roi_percent: List[float] = Field(..., description="ROI (%) в каждой точке.")
+    payback_months: List[Optional[float]] = Field(
+        ...,
+        description="Срок окупаемости в месяцах (None — проект не окупается).",
+    )
+    payback_years: List[Optional[float]] = Field(..., description="Срок окупаемости в годах.")
+    npv: Optional[List[Optional[float]]] = Field(
+        default=None,
+        description="NPV в каждой точке (если в base_input задана ставка дисконтирования).",
+    )
+
+
+class SensitivitySweepResult(BaseModel):
+    """
+    Ответ анализа чувствительности в режиме sweep (для tornado/spider-диаграмм).
+    """
+
+    base_result: InvestResult = Field(
+        ...,
+        description="Результат расчёта по базовым входным данным.",
+    )
+    deltas: List[float] = Field(..., description="Изменения параметров в процентах (ось X).")
+    series: List[SensitivitySweepSeries] = Field(
+        default_factory=list,
+        description="Колоночные результаты по каждому параметру.",
+    )
+
+
+## === ДВУМЕРНАЯ ТАБЛИЦА ЧУВСТВИТЕЛЬНОСТИ (HEATMAP) ===================================
+
+
+GridParameterName = Literal["capex", "opex", "effects", "period_months"]
+GridMetricName = Literal["tco", "roi_percent", "payback_months", "payback_years"]
+
+## Максимальная длина одной оси таблицы (1000 × 1000 = 1 млн ячеек)
+GRID_MAX_AXIS = 1000
+
+
+class GridAxis(BaseModel):
+    """Ось таблицы данных: какой параметр меняется и какие значения он принимает."""
+
+    parameter: GridParameterName = Field(..., description="Имя параметра InvestInput.")
+    values: List[float] = Field(
+        ...,
+        min_length=1,
+        max_length=GRID_MAX_AXIS,
+        description="Значения параметра вдоль оси (для period_months — целые числа 1..600).",
+        examples=[[50000.0, 100000.0, 150000.0]],
+    )
+
+
+class SensitivityGridRequest(BaseModel):
+    """
+    Запрос на двумерную таблицу данных (аналог «Таблицы данных» Excel).
+
+    Остальные параметры берутся из base_input; считается одна метрика
+    для каждой пары (rows.values[i], columns.values[j]).
+    """
+
+    base_input: InvestInput = Field(..., description="Базовый сценарий.")
+    rows: GridAxis = Field(..., description="Параметр, меняющийся по строкам.")
+    columns: GridAxis = Field(..., description="Параметр, меняющийся по столбцам.")
+    metric: GridMetricName = Field(
+        default="roi_percent",
+        description="Рассчитываемый показатель в ячейках таблицы.",
+    )
+
+    @model_validator(mode="after")
+    def _check_axes(self) -> "SensitivityGridRequest":
+        if self.rows.parameter == self.columns.parameter:
+            raise ValueError("Параметры строк и столбцов таблицы должны различаться.")
+        return self
+
+
+class SensitivityGridResult(BaseModel):
+    """
+    Двумерная таблица значений показателя.
+
+    Матрица передаётся плоским списком values в порядке row-major:
+    ячейка (i, j) находится по индексу i * shape[1] + j.
+    """
+
+    metric: GridMetricName = Field(..., description="Рассчитанный показатель.")
+    row_parameter: GridParameterName = Field(..., description="Параметр по строкам.")
+    column_parameter: GridParameterName = Field(..., description="Параметр по столбцам.")
+    row_values: List[float] = Field(..., description="Значения параметра по строкам.")
+    column_values: List[float] = Field(..., description="Значения параметра по столбцам.")
+    shape: List[int] = Field(..., description="Размер матрицы [строки, столбцы].")
+    values: List[Optional[float]] = Field(
+        ...,
+        description="Значения показателя row-major (None — проект не окупается).",
+    )
+
+
+## === ИМИТАЦИОННОЕ МОДЕЛИРОВАНИЕ (MONTE CARLO) ======================================
+
+
+DistributionKind = Literal["normal", "triangular", "uniform", "lognormal"]
+MonteCarloParameterName = Literal["capex", "opex", "effects", "period_months"]
+
+MONTE_CARLO_MAX_SAMPLES = 1_000_000
+
+
+class Distribution(BaseModel):
+    """
+    Распределение входного параметра.
+
+    Обязательные поля зависят от вида распределения:
+    - normal — mean, std;
+    - lognormal — mean, std (среднее и стандартное отклонение самой величины, mean > 0);
+    - uniform — low, high;
+    - triangular — low, mode, high.
+
+    Отрицательные значения выборки обрезаются до 0, period_months округляется
+    до целого и ограничивается диапазоном 1..600.
+    """
+
+    kind: DistributionKind = Field(..., description="Вид распределения.")
+    mean: Optional[float] = Field(default=None, description="Среднее (normal, lognormal).")
+    std: Optional[float] = Field(default=None, ge=0, description="Стандартное отклонение (normal, lognormal).")
+    low: Optional[float] = Field(default=None, description="Нижняя граница (uniform, triangular).")
+    mode: Optional[float] = Field(default=None, description="Мода (triangular).")
+    high: Optional[float] = Field(default=None, description="Верхняя граница (uniform, triangular).")
+
+    @model_validator(mode="after")
+    def _check_params(self) -> "Distribution":
+        required = {
+            "normal": ("mean", "std"),
+            "lognormal": ("mean", "std"),
+            "uniform": ("low", "high"),
+            "triangular": ("low", "mode", "high"),
+        }[self.kind]
+        missing = [name for name in required if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"Для распределения {self.kind} нужно указать: {', '.join(missing)}.")
+
+        if self.kind == "lognormal" and self.mean <= 0:
+            raise ValueError("Для lognormal среднее (mean) должно быть больше 0.")
+        if self.kind == "uniform" and self.low > self.high:
+            raise ValueError("Для uniform нужно low <= high.")
+        if self.kind == "triangular" and not (self.low <= self.mode <= self.high and self.low < self.high):
+            raise ValueError("Для triangular нужно low <= mode <= high и low < high.")
+        return self
+
+
+class MonteCarloRequest(BaseModel):
+    """
+    Запрос на имитационное моделирование (Monte Carlo).
+
+    Параметры, для которых задано распределение, разыгрываются случайно;
+    остальные берутся из base_input как точечные оценки.
+    """
+
+    base_input: InvestInput = Field(..., description="Базовый сценарий (точечные оценки).")
+    distributions: Dict[MonteCarloParameterName, Distribution] = Field(
+        ...,
+        min_length=1,
+        description="Распределения параметров.",
+        examples=[{"effects": {"kind": "triangular", "low": 120000, "mode": 180000, "high": 220000}}],
+    )
+    n_samples: int = Field(
+        default=100_000,
+        ge=100,
+        le=MONTE_CARLO_MAX_SAMPLES,
+        description="Количество испытаний.",
+    )
+    seed: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Зерно генератора (для воспроизводимости). Если не задано — выбирается случайно.",
+    )
+    percentiles: List[Annotated[float, Field(ge=0, le=100)]] = Field(
+        default_factory=lambda: [5.0, 10.0, 25.0, 50.0, 75.0, 90.0, 95.0],
+        min_length=1,
+        description="Уровни перцентилей (в процентах).",
+    )
+    histogram_bins: int = Field(
+        default=50,
+        ge=1,
+        le=1000,
+        description="Количество интервалов гистограммы ROI.",
+    )
+
+
+class MetricStats(BaseModel):
+    """Статистики распределения одного показателя."""
+
+    mean: float = Field(..., description="Среднее значение.")
+    std: float = Field(..., description="Стандартное отклонение.")
+    min: float = Field(..., description="Минимум.")
+    max: float = Field(..., description="Максимум.")
+    percentiles: List[float] = Field(
+        ...,
+        description="Значения перцентилей в порядке MonteCarloResult.percentiles.",
+    )
+
+
+class Histogram(BaseModel):
+    """Гистограмма: counts[i] — число значений в [bin_edges[i], bin_edges[i + 1])."""
+
+    bin_edges: List[float] = Field(..., description="Границы интервалов.")
+    counts: List[int] = Field(..., description="Количество значений в интервалах.")
+
+
+class MonteCarloResult(BaseModel):
+    """
+    Результат имитационного моделирования.
+    """
+
+    n_samples: int = Field(..., description="Количество испытаний.")
+    seed: int = Field(..., description="Использованное зерно генератора.")
+    percentiles: List[float] = Field(..., description="Уровни перцентилей (в процентах).")
+    tco: MetricStats = Field(..., description="Распределение TCO.")
+    roi_percent: MetricStats = Field(..., description="Распределение ROI (%).")
+    payback_months: Optional[MetricStats] = Field(
+        default=None,
+        description="Распределение срока окупаемости по окупившимся испытаниям (None, если таких нет).",
+    )
+    probability_payback_within_period: float = Field(
+        ...,
+        description="Доля испытаний, в которых проект окупается в пределах периода анализа.",
+    )
+    roi_histogram: Histogram = Field(..., description="Гистограмма ROI (%).")
+
+
+## === ПОДБОР ПАРАМЕТРА (GOAL SEEK) ==================================================
+
+
+GoalSeekVariable = Literal["capex", "opex", "effects", "period_months"]
+GoalSeekMetric = Literal["roi_percent", "payback_months", "npv"]
+GoalSeekStatus = Literal["solved", "infeasible"]
+GoalSeekMethod = Literal["closed_form", "bisection"]
+
+GOAL_SEEK_MAX_GOALS = 10_000
+
+
+class GoalSeekRequest(BaseModel):
+    """
+    Подбор значения одного параметра InvestInput, при котором показатель равен цели.
+
+    Примеры:
+    - «максимальный CAPEX для окупаемости за 24 месяца»:
+      solve_for="capex", metric="payback_months", target=24;
+    - «какие нужны эффекты для ROI = 30%»:
+      solve_for="effects", metric="roi_percent", target=30.
+
+    Для metric="npv" в base_input должна быть задана ставка дисконтирования.
+    """
+
+    base_input: InvestInput = Field(..., description="Базовый сценарий (остальные параметры).")
+    solve_for: GoalSeekVariable = Field(..., description="Подбираемый параметр.")
+    metric: GoalSeekMetric = Field(..., description="Целевой показатель.")
+    target: float = Field(..., description="Целевое значение показателя.", examples=[24.0])
+
+
+class GoalSeekResult(BaseModel):
+    """Результат подбора параметра."""
+
+    solve_for: GoalSeekVariable = Field(..., description="Подбираемый параметр.")
+    metric: GoalSeekMetric = Field(..., description="Целевой показатель.")
+    target: float = Field(..., description="Целевое значение показателя.")
+    status: GoalSeekStatus = Field(..., description="solved — решение найдено, infeasible — цель недостижима.")
+    method: GoalSeekMethod = Field(..., description="Способ решения: аналитически или бисекцией.")
+    value: Optional[float] = Field(default=None, description="Найденное значение параметра.")
+    achieved: Optional[float] = Field(
+        default=None,
+        description="Значение показателя при найденном параметре (с учётом округления).",
+    )
+    message: Optional[str] = Field(default=None, description="Пояснение, если цель недостижима.")
+    result: Optional[InvestResult] = Field(
+        default=None,
+        description="Полный результат расчёта при найденном значении параметра.",
+    )
+
+
+class GoalSeekBatchRequest(BaseModel):
+    """Пакет целей (например, по всему портфелю проектов)."""
+
+    goals: List[GoalSeekRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=GOAL_SEEK_MAX_GOALS,
+        description="Список целей.",
+    )
+
+
+class GoalSeekBatchResult(BaseModel):
+    """
+    Результаты пакетного подбора в колоночном виде (i-й элемент — i-я цель).
+    """
+
+    count: int = Field(..., description="Количество целей.")
+    status: List[GoalSeekStatus] = Field(..., description="Статусы решения.")
+    method: List[GoalSeekMethod] = Field(..., description="Способы решения.")
+    value: List[Optional[float]] = Field(..., description="Найденные значения параметров.")
+    achieved: List[Optional[float]] = Field(..., description="Достигнутые значения показателей.")
+    message: List[Optional[str]] = Field(..., description="Пояснения для недостижимых целей.")
+
+
+## === КЭШ РЕЗУЛЬТАТОВ ===============================================================
+
+
+class CacheStats(BaseModel):
+    """Состояние кэша результатов расчётов."""
+
+    enabled: bool = Field(..., description="Включён ли кэш (settings.RESULT_CACHE_ENABLED).")
+    size: int = Field(..., description="Текущее количество записей.")
+    max_size: int = Field(..., description="Максимальное количество записей (LRU).")
+    ttl_seconds: Optional[float] = Field(default=None, description="Время жизни записи, сек.")
+    hits: int = Field(..., description="Попадания.")
+    misses: int = Field(..., description="Промахи.")
+    evictions: int = Field(..., description="Вытеснения по размеру (LRU).")
+    expirations: int = Field(..., description="Вытеснения по времени жизни (TTL).")
+    hit_rate: float = Field(..., description="Доля попаданий (0..1).")
+
+
 ## === СЦЕНАРИИ (JSON-ХРАНИЛИЩЕ ВМЕСТО БД) ===========================================
 
 
@@ -237,3 +832,196 @@ class ScenarioDetail(ScenarioShort):
         default=None,
         description="Последний сохранённый результат расчётов по сценарию (может быть None).",
     )
+
+
+## Размер страницы списка сценариев
+SCENARIOS_PAGE_DEFAULT_LIMIT = 100
+SCENARIOS_PAGE_MAX_LIMIT = 1000
+
+
+class ScenarioListQuery(BaseModel):
+    """
+    Параметры постраничного списка сценариев (GET /scenarios).
+
+    Порядок — от последних изменённых к давним по ключу
+    (updated_at или created_at, id); страницы листаются курсором.
+    Границы диапазонов дат включаются.
+    """
+
+    limit: int = Field(
+        default=SCENARIOS_PAGE_DEFAULT_LIMIT,
+        ge=1,
+        le=SCENARIOS_PAGE_MAX_LIMIT,
+        description="Размер страницы.",
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Курсор следующей страницы из предыдущего ответа (next_cursor).",
+    )
+    name_prefix: Optional[str] = Field(
+        default=None,
+        description="Только сценарии, название которых начинается с этой строки (с учётом регистра).",
+    )
+    created_from: Optional[datetime] = Field(default=None, description="created_at не раньше.")
+    created_to: Optional[datetime] = Field(default=None, description="created_at не позже.")
+    updated_from: Optional[datetime] = Field(
+        default=None,
+        description="Время последнего изменения (updated_at, а если его нет — created_at) не раньше.",
+    )
+    updated_to: Optional[datetime] = Field(
+        default=None,
+        description="Время последнего изменения не позже.",
+    )
+
+    @field_validator("created_from", "created_to", "updated_from", "updated_to")
+    @classmethod
+    def _to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Даты сценариев хранятся в UTC без таймзоны — приводим фильтры к тому же виду."""
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class ScenarioPage(BaseModel):
+    """Страница списка сценариев."""
+
+    items: List[ScenarioShort] = Field(..., description="Сценарии страницы.")
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Курсор следующей страницы (None — страница последняя).",
+    )
+
+
+class ScenarioImportError(BaseModel):
+    """Ошибка одной записи массового импорта (запись пропускается, импорт продолжается)."""
+
+    index: int = Field(..., ge=0, description="Порядковый номер записи во входных данных (с 0).")
+    id: Optional[str] = Field(default=None, description="id записи, если он был указан.")
+    name: Optional[str] = Field(default=None, description="Название сценария, если оно было указано.")
+    errors: List[str] = Field(..., description="Описание ошибок вида «поле: сообщение».")
+
+
+class ScenarioImportResult(BaseModel):
+    """Итог массового импорта сценариев."""
+
+    imported: int = Field(..., ge=0, description="Число сохранённых сценариев.")
+    failed: int = Field(..., ge=0, description="Число отклонённых записей.")
+    ids: List[str] = Field(..., description="id сохранённых сценариев (в порядке входных данных).")
+    errors: List[ScenarioImportError] = Field(
+        default_factory=list,
+        description="Ошибки отклонённых записей.",
+    )
+
+
+class ScenarioRecomputeProgress(BaseModel):
+    """Ход (и итог) массового пересчёта last_result сохранённых сценариев."""
+
+    formula_version: int = Field(..., description="Версия формул, по которой пересчитываются результаты.")
+    scanned: int = Field(..., ge=0, description="Просмотрено сценариев.")
+    recomputed: int = Field(..., ge=0, description="Пересчитано и сохранено сценариев.")
+    skipped: int = Field(
+        ...,
+        ge=0,
+        description=(
+            "Пропущено: результат уже посчитан текущей версией формул "
+            "или сценарий изменён во время пересчёта."
+        ),
+    )
+    failed: int = Field(..., ge=0, description="Не удалось пересчитать (ошибка входных данных).")
+    elapsed_seconds: float = Field(..., ge=0, description="Время с начала пересчёта, с.")
+    scenarios_per_second: float = Field(..., ge=0, description="Пропускная способность: просмотрено сценариев в секунду.")
+    done: bool = Field(..., description="True — пересчёт завершён (итоговая запись).")
+
+
+## === АНАЛИТИКА ПО ВСЕМ СОХРАНЁННЫМ СЦЕНАРИЯМ =========================================
+
+
+class PortfolioAnalyticsQuery(BaseModel):
+    """Параметры сводной аналитики по сценариям хранилища."""
+
+    percentiles: List[Annotated[float, Field(ge=0, le=100)]] = Field(
+        default_factory=lambda: [5.0, 25.0, 50.0, 75.0, 95.0],
+        min_length=1,
+        description="Уровни перцентилей (в процентах).",
+    )
+    histogram_bins: int = Field(
+        default=20,
+        ge=1,
+        le=1000,
+        description="Количество интервалов гистограммы срока окупаемости.",
+    )
+
+
+class PortfolioAnalytics(BaseModel):
+    """
+    Сводные показатели портфеля — всех сохранённых сценариев.
+
+    Показатели считаются по входным данным сценариев текущими формулами
+    (а не по сохранённым last_result, которые могут быть устаревшими).
+    """
+
+    count: int = Field(..., ge=0, description="Число сценариев.")
+    with_schedules: int = Field(..., ge=0, description="Из них с помесячными графиками.")
+    total_capex: float = Field(..., description="Суммарный CAPEX.")
+    total_opex: float = Field(..., description="Суммарный OPEX.")
+    total_effects: float = Field(..., description="Суммарные эффекты.")
+    never_pay_back: int = Field(..., ge=0, description="Число проектов, которые не окупаются за период анализа.")
+    percentiles: List[float] = Field(..., description="Уровни перцентилей в статистиках ниже.")
+    roi_percent: Optional[MetricStats] = Field(
+        default=None,
+        description="Распределение ROI, % (None, если сценариев нет).",
+    )
+    payback_months: Optional[MetricStats] = Field(
+        default=None,
+        description="Распределение срока окупаемости, мес. — по окупающимся проектам.",
+    )
+    payback_histogram: Optional[Histogram] = Field(
+        default=None,
+        description="Гистограмма срока окупаемости (мес.) окупающихся проектов.",
+    )
+    npv: Optional[MetricStats] = Field(
+        default=None,
+        description="Распределение NPV — по сценариям с заданной ставкой дисконтирования.",
+    )
+
+
+## === ДИАГНОСТИКА: ПРОФИЛИ ЗАПРОСОВ =================================================
+
+
+class RequestProfileInfo(BaseModel):
+    """Сохранённый профиль запроса (см. src/core/profiling.py)."""
+
+    id: str = Field(..., description="Идентификатор профиля (заголовок ответа X-Profile-Id).")
+    method: str = Field(..., description="HTTP-метод запроса.")
+    path: str = Field(..., description="Путь запроса.")
+    query: str = Field(default="", description="Строка параметров запроса.")
+    status: int = Field(..., description="Код ответа.")
+    duration_ms: float = Field(..., description="Длительность запроса под профилировщиком, мс.")
+    samples: int = Field(..., ge=0, description="Число снятых стеков (выборочный профилировщик).")
+    created_at: datetime = Field(..., description="Время записи профиля (UTC).")
+
+
+## === ДИАГНОСТИКА: ТРАССЫ ЗАПРОСОВ ==================================================
+
+
+class TraceSpanInfo(BaseModel):
+    """Спан трассы (операция слоя API, сервиса или хранилища)."""
+
+    span_id: str = Field(..., description="Идентификатор спана (8 байт, hex).")
+    parent_span_id: Optional[str] = Field(default=None, description="Родительский спан (None — корневой).")
+    name: str = Field(..., description="Операция: api.*, service.*, storage.* или «МЕТОД маршрут» для корня.")
+    start_offset_ms: float = Field(..., description="Начало относительно начала трассы, мс.")
+    duration_ms: float = Field(..., description="Длительность, мс.")
+    status: str = Field(..., description="OK или ERROR.")
+    attributes: Dict[str, Any] = Field(default_factory=dict, description="Атрибуты спана.")
+
+
+class TraceInfo(BaseModel):
+    """Трасса одного запроса (см. src/core/tracing.py)."""
+
+    trace_id: str = Field(..., description="Идентификатор трассы (16 байт, hex).")
+    name: str = Field(..., description="Корневой спан: «МЕТОД шаблон маршрута».")
+    started_at: datetime = Field(..., description="Начало запроса (UTC).")
+    duration_ms: float = Field(..., description="Длительность запроса, мс.")
+    dropped_spans: int = Field(default=0, ge=0, description="Спаны сверх settings.TRACING_MAX_SPANS (не записаны).")
+    spans: List[TraceSpanInfo] = Field(..., description="Спаны в порядке начала.")
@@ -0,0 +1,167 @@
+## src/services/cache.py
+"""
+Кэш результатов расчётов InvestCalc (мемоизация в памяти процесса).
+
+Дашборды многократно присылают одни и те же входные данные
+(примеры из data/input-*.json, сохранённые сценарии), поэтому
+результаты calculate_metrics() и run_sensitivity() кэшируются:
+
+- ключ — SHA-256 от канонического JSON запроса (Pydantic-модели);
+- вытеснение по размеру (LRU) и по времени жизни (TTL);
+- счётчики попаданий, промахов и вытеснений;
+- включение/выключение и параметры — в src/core/config.py;
+- счётчики также выдаются в GET /metrics (src/core/metrics.py).
+
+В кэше хранится JSON результата, а наружу отдаётся новая модель,
+восстановленная из него: ответ побайтно совпадает со свежим расчётом
+и не может быть испорчен вызывающим кодом (это и быстрее deepcopy).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.core.metrics import registry as metrics_registry
+
+
+def model_cache_key(namespace: str, model: BaseModel) -> str:
+    """Канонический ключ кэша: пространство имён + SHA-256 от JSON модели."""
+    digest = hashlib.sha256(model.model_dump_json().encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class ResultCache:
+    """
+    Потокобезопасный LRU-кэш с TTL и счётчиками.
+
+    max_size — максимальное число записей (самые старые по обращению вытесняются);
+    ttl_seconds — время жизни записи (None или 0 — без ограничения).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._items: "OrderedDict[str, Tuple[float, Type[BaseModel], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        """Возвращает копию результата или None (промах либо истёкшая запись)."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, model_type, raw = entry
+            if self.ttl_seconds and self._clock() - stored_at >= self.ttl_seconds:
+                del self._items[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+        return model_type.model_validate_json(raw)
+
+    def put(self, key: str, value: BaseModel) -> None:
+        """Сохраняет результат (как JSON); при переполнении вытесняет самые давние записи."""
+        if self.max_size <= 0:
+            return
+        raw = value.model_dump_json()
+        with self._lock:
+            self._items[key] = (self._clock(), type(value), raw)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Очищает кэш и обнуляет счётчики."""
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict:
+        """Текущее состояние кэша (для /api/v1/cache/stats)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.RESULT_CACHE_ENABLED,
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+## Общий кэш сервисного слоя
+result_cache = ResultCache(
+    max_size=settings.RESULT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+)
+
+
+def cached_result(namespace: str) -> Callable:
+    """
+    Декоратор для функций вида f(request: BaseModel) -> BaseModel.
+
+    Исключения (ValueError и т.п.) не кэшируются. Если settings.RESULT_CACHE_ENABLED
+    выключен, функция вызывается напрямую, а кэш не трогается.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(request: BaseModel):
+            if not settings.RESULT_CACHE_ENABLED:
+                return func(request)
+
+            key = model_cache_key(namespace, request)
+            cached = result_cache.get(key)
+            if cached is not None:
+                return cached
+
+            result = func(request)
+            result_cache.put(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _cache_metrics():
+    """Сборщик метрик кэша для GET /metrics."""
+    stats = result_cache.stats()
+    yield ("investcalc_result_cache_entries", "gauge", "Записей в кэше результатов.", [({}, stats["size"])])
+    for name in ("hits", "misses", "evictions", "expirations"):
+        yield (
+            f"investcalc_result_cache_{name}_total",
+            "counter",
+            f"Кэш результатов: {name}.",
+            [({}, stats[name])],
+        )
+
+
+metrics_registry.add_collector(_cache_metrics)
@@ -2,8 +2,20 @@
 """
 Бизнес-логика InvestCalc:
 - расчёт экономических показателей (TCO, ROI, Payback);
-- анализ чувствительности ±N%;
-- работа со сценариями в JSON-файле (без БД).
+- пакетный (векторный, NumPy) расчёт по множеству проектов;
+- анализ чувствительности ±N% и sweep по сетке изменений;
+- двумерные таблицы данных (heatmap) по двум параметрам;
+- имитационное моделирование рисков (Monte Carlo);
+- дисконтированные денежные потоки (NPV, IRR, дисконтированная окупаемость);
+- помесячные графики CAPEX/OPEX/эффектов (неравномерные денежные потоки);
+- подбор параметра под целевое значение показателя (goal seek);
+- кэширование результатов расчётов (LRU + TTL, см. cache.py);
+- работа со сценариями через хранилище (JSON-файл или SQLite, см. src/storage);
+- массовый импорт сценариев (JSON-массив или NDJSON) с отчётом об ошибках записей;
+- пересчёт сохранённых last_result по текущей версии формул (FORMULA_VERSION);
+- сводная аналитика по всем сохранённым сценариям (кэшированная таблица pandas);
+- метрики длительности расчётов и операций с хранилищем (см. src/core/metrics.py);
+- спаны трассировки запросов для расчётов и операций со сценариями (см. src/core/tracing.py).
 
 Этот модуль не зависит от FastAPI и может использоваться
 как отдельно, так и в тестах (pytest).
@@ -11,68 +23,90 @@
 
 from __future__ import annotations
 
+import hashlib
+import itertools
 import json
-from copy import deepcopy
-from datetime import datetime
-from typing import List, Optional
+import multiprocessing
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from uuid import uuid4
 
+import numpy as np
+import pandas as pd
+from pydantic import TypeAdapter, ValidationError
+
 from src.core.config import settings
+from src.core.metrics import operation_duration, registry as metrics_registry, timed_operation
+from src.core.tracing import traced
+from src.services.cache import cached_result
+from src.storage import ScenarioStorage, get_storage
+from src.storage.columns import ScenarioColumns
 from src.models.invest import (
+    BatchCalcRequest,
+    BatchCalcResult,
+    Distribution,
+    GoalSeekBatchRequest,
+    GoalSeekBatchResult,
+    GoalSeekRequest,
+    GoalSeekResult,
+    Histogram,
     InvestInput,
     InvestResult,
+    MetricStats,
+    MonteCarloRequest,
+    MonteCarloResult,
+    PortfolioAnalytics,
+    PortfolioAnalyticsQuery,
+    SensitivityGridRequest,
+    SensitivityGridResult,
     SensitivityRequest,
     SensitivityResult,
     SensitivityItem,
+    SensitivitySweepResult,
+    SensitivitySweepSeries,
     ScenarioShort,
     ScenarioDetail,
+    ScenarioImportError,
+    ScenarioImportResult,
+    ScenarioListQuery,
+    ScenarioPage,
+    ScenarioRecomputeProgress,
 )
 
 
-## === ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ДЛЯ JSON ===============================================
-
+## === ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =======================================================
 
-def _ensure_data_dir() -> None:
-    """Гарантирует, что каталог для данных существует."""
-    settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+def _now() -> datetime:
+    """Текущее время в UTC (без таймзоны)."""
+    return datetime.utcnow()
 
-def _load_scenarios_raw() -> List[dict]:
-    """
-    Считывает сценарии из JSON-файла.
 
-    Формат файла:
-    [
-        {...сценарий 1...},
-        {...сценарий 2...}
-    ]
-    """
-    _ensure_data_dir()
-    if not settings.SCENARIOS_FILE.exists():
-        return []
-    try:
-        with settings.SCENARIOS_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, list):
-            return []
-        return data
-    except json.JSONDecodeError:
-        return []
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Приводит дату к UTC без таймзоны (в таком виде даты сценариев сравниваются и сортируются)."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 
-def _save_scenarios_raw(items: List[dict]) -> None:
-    """Сохраняет список сценариев в JSON-файл."""
-    _ensure_data_dir()
-    with settings.SCENARIOS_FILE.open("w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+## === РАСЧЁТ ПОКАЗАТЕЛЕЙ =============================================================
 
 
-def _now() -> datetime:
-    """Текущее время в UTC (без таймзоны)."""
-    return datetime.utcnow()
+## Версия формул расчёта показателей. Увеличивается при любом изменении формул,
+## влияющем на InvestResult: сохранённые результаты с другой версией считаются
+## устаревшими и пересчитываются (см. recompute_scenarios).
+FORMULA_VERSION = 1
 
+ROI_INFINITE = 999.99
 
-## === РАСЧЁТ ПОКАЗАТЕЛЕЙ =============================================================
+NOTE_PAYS_BACK = "Проект окупается в рамках заданного периода анализа."
+NOTE_NO_PAYBACK = "Проект не окупается в рамках заданного периода: ежемесячный денежный поток ≤ 0."
+NOTE_NO_PAYBACK_SCHEDULE = "Проект не окупается в рамках заданного периода: накопленный денежный поток < 0."
 
 
 def _calculate_tco(input_data: InvestInput) -> float:
@@ -93,7 +127,7 @@ def _calculate_roi_percent(input_data: InvestInput, tco: float) -> float:
     """
     if tco == 0:
         if input_data.effects > 0:
-            return 999.99
+            return ROI_INFINITE
         return 0.0
 
     roi = (input_data.effects - tco) / tco * 100.0
@@ -118,11 +152,7 @@ def _calculate_payback(input_data: InvestInput) -> tuple[Optional[float], Option
     monthly_cash_flow = monthly_effect - monthly_opex
 
     if monthly_cash_flow <= 0:
-        return (
-            None,
-            None,
-            "Проект не окупается в рамках заданного периода: ежемесячный денежный поток ≤ 0.",
-        )
+        return None, None, NOTE_NO_PAYBACK
 
     payback_months = input_data.capex / monthly_cash_flow
     payback_years = payback_months / 12.0
@@ -134,12 +164,86 @@ def _calculate_payback(input_data: InvestInput) -> tuple[Optional[float], Option
     )
 
 
+def _monthly_cash_flows(input_data: InvestInput) -> np.ndarray:
+    """
+    Денежный поток проекта по месяцам: flows[0] — момент старта, flows[t] — месяц t.
+
+    Без графика CAPEX тратится целиком в месяц 0; OPEX и эффекты без графиков
+    распределяются равномерно по period_months.
+    """
+    months = input_data.period_months
+
+    def monthly(total: float, schedule: Optional[List[float]]) -> np.ndarray:
+        if schedule is not None:
+            return np.asarray(schedule, dtype=np.float64)
+        return np.full(months, total / months)
+
+    flows = np.zeros(months + 1)
+    flows[1:] = monthly(input_data.effects, input_data.effects_schedule) - monthly(
+        input_data.opex, input_data.opex_schedule
+    )
+    if input_data.capex_schedule is None:
+        flows[0] = -input_data.capex
+    else:
+        flows[1:] -= np.asarray(input_data.capex_schedule, dtype=np.float64)
+    return flows
+
+
+def _payback_from_flows(flows: np.ndarray) -> Optional[float]:
+    """
+    Момент (в месяцах), после которого накопленный денежный поток больше не бывает < 0.
+
+    Минимум «хвоста» накопленного потока не убывает по времени, поэтому первый
+    месяц с неотрицательным хвостом ищется через searchsorted, без цикла.
+    Внутри месяца — линейная интерполяция. None — не окупается за период.
+    """
+    cumulative = np.cumsum(flows)
+    tail_min = np.minimum.accumulate(cumulative[::-1])[::-1]
+    month = int(np.searchsorted(tail_min, 0.0, side="left"))
+    if month >= flows.size:
+        return None
+    if month == 0:
+        return 0.0
+    return float((month - 1) + (-cumulative[month - 1]) / flows[month])
+
+
+def _calculate_scheduled_payback(
+    input_data: InvestInput,
+) -> tuple[Optional[float], Optional[float], Optional[str]]:
+    """
+    Срок окупаемости по помесячным графикам (неравномерный денежный поток).
+
+    В отличие от равномерной модели, окупаемость ищется только в пределах period_months.
+    """
+    payback_months = _payback_from_flows(_monthly_cash_flows(input_data))
+    if payback_months is None:
+        return None, None, NOTE_NO_PAYBACK_SCHEDULE
+    return (
+        float(round(payback_months, 2)),
+        float(round(payback_months / 12.0, 2)),
+        None,
+    )
+
+
+@traced("service.calculate_metrics")
+@timed_operation("calculate_metrics")
+@cached_result("calc")
 def calculate_metrics(input_data: InvestInput) -> InvestResult:
     """
     Выполняет полный расчёт экономических показателей по входным данным.
 
+    Результат кэшируется по входным данным (см. src/services/cache.py).
+    Внутренние массовые расчёты (пересчёт и аналитика сценариев, подбор параметра)
+    вызывают _calculate_metrics() напрямую, чтобы не вытеснять из кэша
+    результаты пользовательских запросов.
+
     При некорректных входных данных может выбросить ValueError.
     """
+    return _calculate_metrics(input_data)
+
+
+def _calculate_metrics(input_data: InvestInput) -> InvestResult:
+    """Расчёт calculate_metrics() без кэша, трассировки и метрик."""
     if input_data.capex < 0 or input_data.opex < 0 or input_data.effects < 0:
         raise ValueError("CAPEX, OPEX и эффекты не могут быть отрицательными.")
 
@@ -148,9 +252,14 @@ def calculate_metrics(input_data: InvestInput) -> InvestResult:
 
     tco = _calculate_tco(input_data)
     roi_percent = _calculate_roi_percent(input_data, tco)
-    payback_months, payback_years, note = _calculate_payback(input_data)
+    if input_data.has_schedules:
+        payback_months, payback_years, note = _calculate_scheduled_payback(input_data)
+    else:
+        payback_months, payback_years, note = _calculate_payback(input_data)
+
+    npv, irr_percent, discounted_payback_months = _calculate_dcf(input_data)
 
-    final_note = note or "Проект окупается в рамках заданного периода анализа."
+    final_note = note or NOTE_PAYS_BACK
 
     return InvestResult(
         project_name=input_data.project_name,
@@ -158,131 +267,1222 @@ def calculate_metrics(input_data: InvestInput) -> InvestResult:
         roi_percent=roi_percent,
         payback_months=payback_months,
         payback_years=payback_years,
+        npv=npv,
+        irr_percent=irr_percent,
+        discounted_payback_months=discounted_payback_months,
         note=final_note,
+        formula_version=FORMULA_VERSION,
+    )
+
+
+## === ПАКЕТНЫЙ (ВЕКТОРНЫЙ) РАСЧЁТ ====================================================
+
+
+class _MetricArrays(NamedTuple):
+    """
+    Результаты векторного расчёта (NaN в payback — проект не окупается).
+
+    DCF-показатели заполняются только при заданной ставке дисконтирования.
+    """
+
+    tco: np.ndarray
+    roi_percent: np.ndarray
+    payback_months: np.ndarray
+    payback_years: np.ndarray
+    pays_back: np.ndarray
+    npv: Optional[np.ndarray] = None
+    irr_percent: Optional[np.ndarray] = None
+    discounted_payback_months: Optional[np.ndarray] = None
+
+    def take(self, index) -> "_MetricArrays":
+        """Выборка строк по индексу/срезу из всех заполненных массивов."""
+        return _MetricArrays(*(None if column is None else column[index] for column in self))
+
+
+## Константа Деккера для точного разложения произведения (2**27 + 1)
+_DEKKER_SPLITTER = 134217729.0
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """
+    Векторный аналог float(round(x, 2)).
+
+    np.round() округляет через x * 100, и результат может разойтись со встроенным
+    round() только когда произведение x * 100 округлилось ровно в «k + 0.5».
+    Для таких элементов точная ошибка произведения восстанавливается
+    разложением Деккера, и направление округления выбирается по её знаку
+    (при нулевой ошибке — к чётному, как в round()).
+    NaN и ±inf возвращаются без изменений (и без RuntimeWarning).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * 100.0
+        result = np.round(scaled) / 100.0
+
+        tie = finite & ((scaled - np.floor(scaled)) == 0.5)
+        if tie.any():
+            idx = np.flatnonzero(tie)
+            x = values.flat[idx]
+            p = scaled.flat[idx]
+            t = x * _DEKKER_SPLITTER
+            hi = t - (t - x)
+            lo = x - hi
+            error = (hi * 100.0 - p) + lo * 100.0
+            n = np.where(error > 0, np.ceil(p), np.where(error < 0, np.floor(p), np.round(p)))
+            result.flat[idx] = n / 100.0
+
+        ## За пределами 2**52 у double нет дробной части (x * 100 может и переполниться) —
+        ## оставляем это встроенному round()
+        huge = finite & ~(np.abs(scaled) < 2.0**52)
+    if huge.any():
+        idx = np.flatnonzero(huge)
+        result.flat[idx] = [round(float(v), 2) for v in values.flat[idx]]
+    if not finite.all():
+        result = np.where(finite, result, values)
+    return result
+
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    """Переводит массив в список Python, заменяя NaN на None."""
+    result = values.tolist()
+    for idx in np.flatnonzero(np.isnan(values)).tolist():
+        result[idx] = None
+    return result
+
+
+def _check_batch_columns(
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+) -> None:
+    """Проверки, аналогичные ограничениям InvestInput, но сразу для всех строк."""
+    if not ((capex >= 0).all() and (opex >= 0).all() and (effects >= 0).all()):
+        raise ValueError("CAPEX, OPEX и эффекты не могут быть отрицательными.")
+    if not ((months > 0).all() and (months <= 600).all()):
+        raise ValueError("Период анализа (period_months) должен быть в диапазоне 1..600 месяцев.")
+
+
+class _RawMetricArrays(NamedTuple):
+    """Неокруглённые промежуточные результаты векторного расчёта."""
+
+    tco: np.ndarray
+    roi: np.ndarray
+    payback: np.ndarray
+    zero_tco: np.ndarray
+    pays_back: np.ndarray
+    roi_zero_tco: np.ndarray
+
+
+def _raw_metric_arrays(
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+) -> _RawMetricArrays:
+    """
+    Векторная версия цепочки _calculate_tco → _calculate_roi_percent → _calculate_payback
+    (без округления).
+
+    Порядок арифметических операций повторяет скалярные функции,
+    поэтому после _round2() результаты совпадают с calculate_metrics() побитово.
+    Массивы могут иметь любую (согласованную для broadcasting) форму.
+    """
+    tco = capex + opex
+    zero_tco = tco == 0
+    ## Деление маскируется заранее, чтобы не получать inf/NaN и предупреждения NumPy
+    roi = (effects - tco) / np.where(zero_tco, 1.0, tco) * 100.0
+
+    monthly_cash_flow = effects / months - opex / months
+    pays_back = monthly_cash_flow > 0
+    payback = capex / np.where(pays_back, monthly_cash_flow, 1.0)
+
+    return _RawMetricArrays(
+        tco=tco,
+        roi=roi,
+        payback=payback,
+        zero_tco=zero_tco,
+        pays_back=pays_back,
+        roi_zero_tco=np.where(effects > 0, ROI_INFINITE, 0.0),
+    )
+
+
+def _calculate_metrics_arrays(
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+    rate: Optional[float] = None,
+) -> _MetricArrays:
+    """
+    Векторный аналог calculate_metrics(): все показатели с округлением до 0.01.
+
+    Если задана ставка дисконтирования rate (годовая, %), дополнительно
+    считаются DCF-показатели (входные массивы при этом одномерные).
+    """
+    raw = _raw_metric_arrays(capex, opex, effects, months)
+
+    ## Все округления — одним вызовом: так дешевле на маленьких массивах.
+    ## payback зависит от всех входов, поэтому имеет итоговую форму broadcasting.
+    stacked = np.empty((4,) + raw.payback.shape, dtype=np.float64)
+    stacked[0] = raw.tco
+    stacked[1] = raw.roi
+    stacked[2] = raw.payback
+    np.divide(raw.payback, 12.0, out=stacked[3])
+    rounded = _round2(stacked)
+
+    return _MetricArrays(
+        tco=rounded[0],
+        roi_percent=np.where(raw.zero_tco, raw.roi_zero_tco, rounded[1]),
+        payback_months=np.where(raw.pays_back, rounded[2], np.nan),
+        payback_years=np.where(raw.pays_back, rounded[3], np.nan),
+        pays_back=np.broadcast_to(raw.pays_back, raw.payback.shape),
+        **(_dcf_arrays(capex, opex, effects, months, rate) if rate is not None else {}),
+    )
+
+
+def _calculate_metric_array(
+    metric: str,
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+) -> np.ndarray:
+    """Считает один показатель (поле InvestResult) без расчёта остальных."""
+    raw = _raw_metric_arrays(capex, opex, effects, months)
+    if metric == "tco":
+        return _round2(raw.tco)
+    if metric == "roi_percent":
+        return np.where(raw.zero_tco, raw.roi_zero_tco, _round2(raw.roi))
+    if metric == "payback_months":
+        return np.where(raw.pays_back, _round2(raw.payback), np.nan)
+    if metric == "payback_years":
+        return np.where(raw.pays_back, _round2(raw.payback / 12.0), np.nan)
+    raise ValueError(f"Неизвестный показатель: {metric}")
+
+
+@traced("service.calculate_metrics_batch")
+def calculate_metrics_batch(request: BatchCalcRequest) -> BatchCalcResult:
+    """
+    Пакетный расчёт TCO/ROI/Payback по колонкам входных данных.
+
+    Для каждой строки результат совпадает с calculate_metrics()
+    (включая округление, ROI = 999.99 при нулевом TCO и комментарии).
+    Если передана колонка discount_rate_percent — добавляются DCF-колонки
+    (для строк без ставки — None).
+    При некорректных входных данных выбрасывает ValueError.
+    """
+    capex = np.asarray(request.capex, dtype=np.float64)
+    opex = np.asarray(request.opex, dtype=np.float64)
+    effects = np.asarray(request.effects, dtype=np.float64)
+    months = np.asarray(request.period_months, dtype=np.int64)
+
+    _check_batch_columns(capex, opex, effects, months)
+
+    rate = None
+    if request.discount_rate_percent is not None:
+        rate = np.array(
+            [np.nan if value is None else value for value in request.discount_rate_percent],
+            dtype=np.float64,
+        )
+        if not (np.isnan(rate) | ((rate >= 0) & (rate <= 100))).all():
+            raise ValueError("Ставка дисконтирования должна быть в диапазоне 0..100%.")
+
+    metrics = _calculate_metrics_arrays(capex, opex, effects, months, rate)
+
+    return BatchCalcResult(
+        count=int(capex.size),
+        project_names=request.project_names,
+        tco=metrics.tco.tolist(),
+        roi_percent=metrics.roi_percent.tolist(),
+        payback_months=_nan_to_none(metrics.payback_months),
+        payback_years=_nan_to_none(metrics.payback_years),
+        npv=_nan_to_none(metrics.npv) if rate is not None else None,
+        irr_percent=_nan_to_none(metrics.irr_percent) if rate is not None else None,
+        discounted_payback_months=(
+            _nan_to_none(metrics.discounted_payback_months) if rate is not None else None
+        ),
+        note=[NOTE_PAYS_BACK if ok else NOTE_NO_PAYBACK for ok in metrics.pays_back.tolist()],
+    )
+
+
+## === ДИСКОНТИРОВАННЫЕ ДЕНЕЖНЫЕ ПОТОКИ (DCF) =========================================
+
+
+## Параметры векторного решателя IRR (месячная ставка ищется в [IRR_LOW, IRR_HIGH])
+_IRR_LOW = -0.99
+_IRR_HIGH = 10.0
+_IRR_MAX_ITERATIONS = 100
+_IRR_TOLERANCE = 1e-12
+
+
+@lru_cache(maxsize=1024)
+def _discount_factors(rate_percent: float, months: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Коэффициенты дисконтирования для пары (годовая ставка, число месяцев).
+
+    Возвращает (factors, cumulative):
+    - factors[t] = (1 + r_m) ** -t, t = 0..months, где r_m — эквивалентная месячная ставка;
+    - cumulative[t] = factors[1] + ... + factors[t] (cumulative[0] = 0).
+
+    Результат кэшируется, массивы доступны только для чтения.
+    """
+    monthly_rate = (1.0 + rate_percent / 100.0) ** (1.0 / 12.0) - 1.0
+    factors = (1.0 + monthly_rate) ** -np.arange(months + 1, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(factors[1:])))
+    factors.setflags(write=False)
+    cumulative.setflags(write=False)
+    return factors, cumulative
+
+
+def _annuity_factor(rate: np.ndarray, months: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Сумма (1 + r) ** -t по t = 1..months и её производная по r (векторно).
+
+    Около r = 0 используется разложение в ряд, чтобы избежать потери точности.
+    """
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        growth = np.exp(-months * np.log1p(rate))  ## (1 + r) ** -N
+        safe_rate = np.where(np.abs(rate) < 1e-8, 1.0, rate)
+        value = (1.0 - growth) / safe_rate
+        derivative = (months * growth / (1.0 + rate) * safe_rate - (1.0 - growth)) / safe_rate**2
+
+    small = np.abs(rate) < 1e-8
+    value = np.where(small, months - months * (months + 1) / 2.0 * rate, value)
+    derivative = np.where(small, -months * (months + 1) / 2.0, derivative)
+    return value, derivative
+
+
+def _solve_irr(capex: np.ndarray, cash_flow: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """
+    Векторный поиск месячной IRR: -capex + cash_flow * A(r) = 0.
+
+    Метод Ньютона с защитной бисекцией внутри вилки [_IRR_LOW, _IRR_HIGH].
+    Сошедшиеся элементы «замораживаются», поэтому результат для проекта
+    не зависит от состава пакета. NaN — IRR не существует или вне вилки.
+    """
+    solvable = (cash_flow > 0) & (capex > 0)
+    target = np.where(solvable, capex / np.where(solvable, cash_flow, 1.0), 1.0)
+    months = months.astype(np.float64)
+
+    low = np.full(target.shape, _IRR_LOW)
+    high = np.full(target.shape, _IRR_HIGH)
+    ## A(r) убывает по r: корень есть, только если A(low) >= target >= A(high)
+    solvable &= (_annuity_factor(low, months)[0] >= target) & (_annuity_factor(high, months)[0] <= target)
+
+    rate = np.where(target > months, -0.01, 0.01)
+    active = solvable.copy()
+    for _ in range(_IRR_MAX_ITERATIONS):
+        if not active.any():
+            break
+        value, derivative = _annuity_factor(rate, months)
+        residual = value - target
+
+        converged = np.abs(residual) <= _IRR_TOLERANCE * target
+        active &= ~converged
+
+        low = np.where(active & (residual > 0), rate, low)
+        high = np.where(active & (residual < 0), rate, high)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = rate - residual / derivative
+        inside = np.isfinite(newton) & (newton > low) & (newton < high)
+        step = np.where(inside, newton, (low + high) / 2.0)
+        active &= high - low > 1e-15
+        rate = np.where(active, step, rate)
+
+    return np.where(solvable, rate, np.nan)
+
+
+def _dcf_arrays(
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+    rate: np.ndarray,
+) -> dict:
+    """
+    DCF-показатели для одномерных колонок (rate — годовая ставка в %, NaN — ставки нет).
+
+    Денежный поток проекта: -CAPEX в месяц 0 и (эффекты - OPEX) / N в месяцы 1..N.
+    - NPV = -CAPEX + CF * sum(factors[1..N]);
+    - дисконтированная окупаемость — первый месяц, где накопленный дисконтированный
+      поток становится >= 0 (поиск через searchsorted по накопленным коэффициентам,
+      с линейной интерполяцией внутри месяца); NaN, если не окупается за период;
+    - IRR — годовая ставка, эквивалентная месячной IRR.
+    Возвращает dict с ключами npv, irr_percent, discounted_payback_months.
+    """
+    capex, opex, effects, months, rate = (
+        np.ravel(column) for column in np.broadcast_arrays(capex, opex, effects, months, rate)
     )
+    months = months.astype(np.int64)
+    has_rate = ~np.isnan(rate)
+    cash_flow = effects / months - opex / months
+
+    npv = np.full(capex.shape, np.nan)
+    discounted_payback = np.full(capex.shape, np.nan)
+
+    ## Коэффициенты общие для всех строк с одной парой (ставка, период)
+    keys = np.stack([np.where(has_rate, rate, 0.0), months.astype(np.float64)], axis=1)[has_rate]
+    rows_with_rate = np.flatnonzero(has_rate)
+    if rows_with_rate.size:
+        unique_keys, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse.reshape(-1), kind="stable")
+        groups = np.split(rows_with_rate[order], np.cumsum(counts)[:-1])
+        for (rate_percent, n), rows in zip(unique_keys.tolist(), groups):
+            factors, cumulative = _discount_factors(rate_percent, int(n))
+            npv[rows] = -capex[rows] + cash_flow[rows] * cumulative[-1]
+
+            positive = rows[cash_flow[rows] > 0]
+            threshold = capex[positive] / cash_flow[positive]
+            month = np.searchsorted(cumulative, threshold, side="left")
+            within = month <= n
+            month, positive, threshold = month[within], positive[within], threshold[within]
+            previous = np.maximum(month - 1, 0)
+            discounted_payback[positive] = np.where(
+                month == 0,
+                0.0,
+                previous + (threshold - cumulative[previous]) / factors[np.maximum(month, 1)],
+            )
+
+    monthly_irr = _solve_irr(capex, cash_flow, months)
+    with np.errstate(invalid="ignore"):
+        irr = np.expm1(12.0 * np.log1p(monthly_irr)) * 100.0
+
+    return {
+        "npv": _round2(npv),
+        "irr_percent": np.where(has_rate, _round2(irr), np.nan),
+        "discounted_payback_months": _round2(discounted_payback),
+    }
+
+
+def _calculate_dcf(input_data: InvestInput) -> tuple[Optional[float], Optional[float], Optional[float]]:
+    """
+    DCF-показатели одного проекта: (NPV, IRR в % годовых, дисконтированная окупаемость).
+
+    Если ставка дисконтирования не задана — (None, None, None).
+    Считается тем же векторным кодом, что и пакетный расчёт, чтобы результаты совпадали.
+    """
+    if input_data.discount_rate_percent is None:
+        return None, None, None
+    if input_data.has_schedules:
+        return _calculate_scheduled_dcf(input_data)
+
+    dcf = _dcf_arrays(
+        np.array([input_data.capex], dtype=np.float64),
+        np.array([input_data.opex], dtype=np.float64),
+        np.array([input_data.effects], dtype=np.float64),
+        np.array([input_data.period_months], dtype=np.int64),
+        np.array([input_data.discount_rate_percent], dtype=np.float64),
+    )
+    return tuple(_nan_to_none(dcf[key])[0] for key in ("npv", "irr_percent", "discounted_payback_months"))
+
+
+def _solve_irr_flows(flows: np.ndarray) -> Optional[float]:
+    """
+    Месячная IRR для произвольного денежного потока (бисекция по [_IRR_LOW, _IRR_HIGH]).
+
+    Для r < 0 NPV домножается на (1 + r) ** N (знак не меняется), чтобы избежать
+    переполнения. None — на концах вилки NPV одного знака.
+    """
+    periods = np.arange(flows.size, dtype=np.float64)
+    horizon = periods[-1]
+
+    def npv_sign(rate: float) -> float:
+        if rate < 0:
+            return float(flows @ np.exp((horizon - periods) * np.log1p(rate)))
+        return float(flows @ np.exp(-periods * np.log1p(rate)))
+
+    low, high = _IRR_LOW, _IRR_HIGH
+    f_low, f_high = npv_sign(low), npv_sign(high)
+    if not (np.isfinite(f_low) and np.isfinite(f_high)) or f_low * f_high > 0:
+        return None
+    for _ in range(_IRR_MAX_ITERATIONS * 2):
+        middle = (low + high) / 2.0
+        f_middle = npv_sign(middle)
+        if f_middle == 0 or high - low <= 1e-15:
+            return middle
+        if (f_middle > 0) == (f_low > 0):
+            low, f_low = middle, f_middle
+        else:
+            high = middle
+    return (low + high) / 2.0
+
+
+def _calculate_scheduled_dcf(
+    input_data: InvestInput,
+) -> tuple[Optional[float], Optional[float], Optional[float]]:
+    """DCF-показатели по помесячным графикам: (NPV, IRR в % годовых, дисконтированная окупаемость)."""
+    flows = _monthly_cash_flows(input_data)
+    factors, _ = _discount_factors(float(input_data.discount_rate_percent), input_data.period_months)
+    discounted = flows * factors
+
+    npv = float(round(float(discounted.sum()), 2))
+    payback = _payback_from_flows(discounted)
+    monthly_irr = _solve_irr_flows(flows)
+    irr = None if monthly_irr is None else float(round(((1.0 + monthly_irr) ** 12 - 1.0) * 100.0, 2))
+    return npv, irr, None if payback is None else float(round(payback, 2))
+
+
+def _reject_schedules(input_data: InvestInput, operation: str) -> None:
+    """Векторные режимы работают с итоговыми суммами; помесячные графики в них не поддерживаются."""
+    if input_data.has_schedules:
+        raise ValueError(
+            f"{operation}: помесячные графики (*_schedule) не поддерживаются, "
+            "используйте расчёт по одному проекту (/calc)."
+        )
 
 
 ## === АНАЛИЗ ЧУВСТВИТЕЛЬНОСТИ =========================================================
 
 
-def _apply_delta(value: float, delta_percent: float, direction: str) -> float:
-    """Увеличивает или уменьшает значение на delta_percent процентов."""
-    factor = delta_percent / 100.0
-    if direction == "minus":
-        return float(round(value * (1.0 - factor), 2))
-    if direction == "plus":
-        return float(round(value * (1.0 + factor), 2))
-    raise ValueError("direction must be 'minus' or 'plus'")
+## Колонки компактного представления входных данных для анализа чувствительности
+_SENSITIVITY_COLUMNS = {"capex": 0, "opex": 1, "effects": 2}
+
 
+def _sensitivity_grid(
+    base_input: InvestInput,
+    parameters: List[str],
+    multipliers: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Строит компактную матрицу входных данных для анализа чувствительности.
+
+    Строка 0 — базовый сценарий, далее для каждого параметра идут
+    len(multipliers) строк, в которых значение параметра умножено на множитель
+    и округлено до копеек (как в прежнем пересчёте через InvestInput).
 
-def run_sensitivity(request: SensitivityRequest) -> SensitivityResult:
+    Возвращает (values, months): values.shape == (n, 3) — CAPEX/OPEX/эффекты.
+    """
+    base_row = np.array(
+        [base_input.capex, base_input.opex, base_input.effects],
+        dtype=np.float64,
+    )
+    columns = np.array([_SENSITIVITY_COLUMNS[p] for p in parameters], dtype=np.intp)
+    steps = multipliers.size
+
+    values = np.empty((1 + columns.size * steps, 3), dtype=np.float64)
+    values[:] = base_row
+    perturbed = _round2(base_row[columns][:, None] * multipliers[None, :])
+    rows = np.arange(1, values.shape[0])
+    values[rows, np.repeat(columns, steps)] = perturbed.reshape(-1)
+
+    months = np.full(values.shape[0], base_input.period_months, dtype=np.int64)
+    return values, months
+
+
+def _results_from_arrays(
+    metrics: _MetricArrays,
+    project_names: Iterable[Optional[str]],
+) -> List[InvestResult]:
+    """Собирает InvestResult для каждой строки результатов векторного расчёта (project_names — по строкам)."""
+    size = metrics.tco.size
+    if metrics.npv is not None:
+        dcf_rows = zip(
+            _nan_to_none(metrics.npv),
+            _nan_to_none(metrics.irr_percent),
+            _nan_to_none(metrics.discounted_payback_months),
+        )
+    else:
+        dcf_rows = [(None, None, None)] * size
+
+    rows = zip(
+        project_names,
+        metrics.tco.tolist(),
+        metrics.roi_percent.tolist(),
+        metrics.payback_months.tolist(),
+        metrics.payback_years.tolist(),
+        metrics.pays_back.tolist(),
+        dcf_rows,
+    )
+    return [
+        InvestResult(
+            project_name=project_name,
+            tco=tco,
+            roi_percent=roi_percent,
+            payback_months=payback_months if pays_back else None,
+            payback_years=payback_years if pays_back else None,
+            npv=npv,
+            irr_percent=irr_percent,
+            discounted_payback_months=discounted_payback_months,
+            note=NOTE_PAYS_BACK if pays_back else NOTE_NO_PAYBACK,
+            formula_version=FORMULA_VERSION,
+        )
+        for project_name, tco, roi_percent, payback_months, payback_years, pays_back, (
+            npv,
+            irr_percent,
+            discounted_payback_months,
+        ) in rows
+    ]
+
+
+def _sweep_deltas(request: SensitivityRequest) -> np.ndarray:
+    """Возвращает массив изменений (в процентах) для режима sweep."""
+    if request.deltas is not None:
+        return np.asarray(request.deltas, dtype=np.float64)
+
+    delta_range = request.delta_range
+    count = int(np.floor((delta_range.stop - delta_range.start) / delta_range.step + 1e-9)) + 1
+    ## Округление убирает хвосты вида 0.30000000000000004 от накопления шага
+    return np.round(delta_range.start + np.arange(count) * delta_range.step, 6)
+
+
+def run_sensitivity_sweep(request: SensitivityRequest) -> SensitivitySweepResult:
+    """
+    Анализ чувствительности в режиме sweep.
+
+    Для каждого параметра значение изменяется на каждый из deltas процентов;
+    вся сетка «параметр × изменение» считается одним векторным проходом,
+    а результат возвращается колонками (без вложенных InvestResult).
+    """
+    if not request.parameters:
+        raise ValueError("Не указан ни один параметр для анализа чувствительности.")
+    _reject_schedules(request.base_input, "Анализ чувствительности")
+
+    parameters = [p for p in request.parameters if p in _SENSITIVITY_COLUMNS]
+    deltas = _sweep_deltas(request)
+    steps = deltas.size
+
+    values, months = _sensitivity_grid(request.base_input, parameters, 1.0 + deltas / 100.0)
+    metrics = _calculate_metrics_arrays(
+        values[:, 0], values[:, 1], values[:, 2], months, request.base_input.discount_rate_percent
+    )
+    base_result = _results_from_arrays(metrics.take(slice(0, 1)), [request.base_input.project_name])[0]
+
+    series = []
+    for i, param in enumerate(parameters):
+        rows = slice(1 + i * steps, 1 + (i + 1) * steps)
+        series.append(
+            SensitivitySweepSeries(
+                parameter=param,
+                values=values[rows, _SENSITIVITY_COLUMNS[param]].tolist(),
+                tco=metrics.tco[rows].tolist(),
+                roi_percent=metrics.roi_percent[rows].tolist(),
+                payback_months=_nan_to_none(metrics.payback_months[rows]),
+                payback_years=_nan_to_none(metrics.payback_years[rows]),
+                npv=_nan_to_none(metrics.npv[rows]) if metrics.npv is not None else None,
+            )
+        )
+
+    return SensitivitySweepResult(
+        base_result=base_result,
+        deltas=deltas.tolist(),
+        series=series,
+    )
+
+
+@traced("service.run_sensitivity")
+@timed_operation("run_sensitivity")
+@cached_result("sensitivity")
+def run_sensitivity(request: SensitivityRequest) -> Union[SensitivityResult, SensitivitySweepResult]:
     """
     Выполняет анализ чувствительности для списка параметров.
 
     Для каждого параметра:
     - рассчитывается базовый результат,
     - рассчитываются результаты при уменьшении и увеличении на delta_percent.
+
+    Все точки (базовая и ±delta по каждому параметру) считаются одним
+    векторным проходом; Pydantic-модели создаются только для ответа.
+    Если в запросе задан deltas/delta_range — выполняется sweep (см. run_sensitivity_sweep).
+    Результат кэшируется по запросу (см. src/services/cache.py).
     """
+    if request.is_sweep:
+        return run_sensitivity_sweep(request)
+
     if request.delta_percent <= 0:
         raise ValueError("delta_percent должен быть больше 0.")
     if not request.parameters:
         raise ValueError("Не указан ни один параметр для анализа чувствительности.")
+    _reject_schedules(request.base_input, "Анализ чувствительности")
 
-    base_result = calculate_metrics(request.base_input)
-    items: List[SensitivityItem] = []
-
-    base_input_dict = request.base_input.model_dump()
-
-    for param in request.parameters:
-        if param not in base_input_dict:
-            continue
+    parameters = [p for p in request.parameters if p in _SENSITIVITY_COLUMNS]
+    factor = request.delta_percent / 100.0
+    multipliers = np.array([1.0 - factor, 1.0 + factor])
 
-        ## minus
-        minus_input_dict = deepcopy(base_input_dict)
-        minus_input_dict[param] = _apply_delta(
-            float(base_input_dict[param]),
-            request.delta_percent,
-            "minus",
-        )
-        minus_input = InvestInput(**minus_input_dict)
-        minus_result = calculate_metrics(minus_input)
-
-        ## plus
-        plus_input_dict = deepcopy(base_input_dict)
-        plus_input_dict[param] = _apply_delta(
-            float(base_input_dict[param]),
-            request.delta_percent,
-            "plus",
-        )
-        plus_input = InvestInput(**plus_input_dict)
-        plus_result = calculate_metrics(plus_input)
+    values, months = _sensitivity_grid(request.base_input, parameters, multipliers)
+    metrics = _calculate_metrics_arrays(
+        values[:, 0], values[:, 1], values[:, 2], months, request.base_input.discount_rate_percent
+    )
+    results = _results_from_arrays(metrics, itertools.repeat(request.base_input.project_name))
 
-        items.append(
-            SensitivityItem(
-                parameter=param,
-                minus_delta_result=minus_result,
-                plus_delta_result=plus_result,
-            )
+    items = [
+        SensitivityItem(
+            parameter=param,
+            minus_delta_result=results[1 + 2 * i],
+            plus_delta_result=results[2 + 2 * i],
         )
+        for i, param in enumerate(parameters)
+    ]
 
     return SensitivityResult(
-        base_result=base_result,
+        base_result=results[0],
         delta_percent=request.delta_percent,
         items=items,
     )
 
 
-## === РАБОТА СО СЦЕНАРИЯМИ В JSON ====================================================
+## === ДВУМЕРНАЯ ТАБЛИЦА ДАННЫХ (HEATMAP) ============================================
 
 
-def _parse_scenario(item: dict) -> Optional[ScenarioDetail]:
-    """Преобразует dict из JSON в ScenarioDetail, при ошибке возвращает None."""
-    try:
-        return ScenarioDetail.model_validate(item)
-    except Exception:
-        return None
+def _grid_axis_values(parameter: str, values: List[float]) -> np.ndarray:
+    """Проверяет значения оси таблицы и приводит их к нужному типу."""
+    array = np.asarray(values, dtype=np.float64)
+    if parameter == "period_months":
+        if not ((array == np.floor(array)).all() and (array > 0).all() and (array <= 600).all()):
+            raise ValueError("Значения period_months должны быть целыми числами в диапазоне 1..600.")
+        return array.astype(np.int64)
+    if not (array >= 0).all():
+        raise ValueError(f"Значения {parameter} не могут быть отрицательными.")
+    return array
 
 
-def list_scenarios() -> List[ScenarioShort]:
+@traced("service.run_sensitivity_grid")
+def run_sensitivity_grid(request: SensitivityGridRequest) -> SensitivityGridResult:
     """
-    Возвращает список кратких сведений о сценариях.
+    Строит двумерную таблицу показателя по двум параметрам.
 
-    Используется в GET /scenarios.
+    Значения строк превращаются в столбец (n, 1), значения столбцов — в строку (1, m),
+    и формулы calculate_metrics() считаются сразу по всей сетке через broadcasting NumPy.
     """
-    raw_items = _load_scenarios_raw()
-    result: List[ScenarioShort] = []
+    _reject_schedules(request.base_input, "Таблица данных")
+    row_values = _grid_axis_values(request.rows.parameter, request.rows.values)
+    column_values = _grid_axis_values(request.columns.parameter, request.columns.values)
+
+    base = request.base_input
+    inputs = {
+        "capex": np.float64(base.capex),
+        "opex": np.float64(base.opex),
+        "effects": np.float64(base.effects),
+        "period_months": np.int64(base.period_months),
+    }
+    inputs[request.rows.parameter] = row_values[:, None]
+    inputs[request.columns.parameter] = column_values[None, :]
+
+    matrix = _calculate_metric_array(
+        request.metric,
+        inputs["capex"],
+        inputs["opex"],
+        inputs["effects"],
+        inputs["period_months"],
+    )
+    shape = (row_values.size, column_values.size)
+    flat = np.broadcast_to(matrix, shape).ravel()
+
+    return SensitivityGridResult(
+        metric=request.metric,
+        row_parameter=request.rows.parameter,
+        column_parameter=request.columns.parameter,
+        row_values=row_values.tolist(),
+        column_values=column_values.tolist(),
+        shape=list(shape),
+        values=_nan_to_none(flat) if request.metric.startswith("payback") else flat.tolist(),
+    )
 
-    for item in raw_items:
-        scenario = _parse_scenario(item)
-        if scenario is None:
+
+## === ИМИТАЦИОННОЕ МОДЕЛИРОВАНИЕ (MONTE CARLO) ======================================
+
+
+_monte_carlo_pool: Optional[ProcessPoolExecutor] = None
+_monte_carlo_pool_lock = threading.Lock()
+
+
+def _sample_distribution(
+    rng: np.random.Generator,
+    distribution: Distribution,
+    size: int,
+) -> np.ndarray:
+    """Разыгрывает выборку заданного распределения."""
+    if distribution.kind == "normal":
+        return rng.normal(distribution.mean, distribution.std, size)
+    if distribution.kind == "lognormal":
+        ## Параметры нормального распределения логарифма по среднему и std самой величины
+        sigma2 = np.log1p((distribution.std / distribution.mean) ** 2)
+        mu = np.log(distribution.mean) - sigma2 / 2.0
+        return rng.lognormal(mu, np.sqrt(sigma2), size)
+    if distribution.kind == "uniform":
+        return rng.uniform(distribution.low, distribution.high, size)
+    if distribution.kind == "triangular":
+        return rng.triangular(distribution.low, distribution.mode, distribution.high, size)
+    raise ValueError(f"Неизвестный вид распределения: {distribution.kind}")
+
+
+def _monte_carlo_chunk(
+    request: MonteCarloRequest,
+    size: int,
+    seed_sequence: np.random.SeedSequence,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Разыгрывает один блок испытаний и считает по нему показатели.
+
+    Функция верхнего уровня, чтобы её можно было выполнять в пуле процессов.
+    Возвращает (tco, roi_percent, payback_months, paid_back_within_period),
+    payback_months = NaN, если проект не окупается.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    base = request.base_input
+    columns = {
+        "capex": np.float64(base.capex),
+        "opex": np.float64(base.opex),
+        "effects": np.float64(base.effects),
+        "period_months": np.int64(base.period_months),
+    }
+    ## Порядок розыгрыша фиксирован, чтобы результат не зависел от порядка ключей в запросе
+    for param in ("capex", "opex", "effects", "period_months"):
+        distribution = request.distributions.get(param)
+        if distribution is None:
             continue
-        result.append(
-            ScenarioShort(
-                id=scenario.id,
-                name=scenario.name,
-                created_at=scenario.created_at,
-                updated_at=scenario.updated_at,
+        sample = _sample_distribution(rng, distribution, size)
+        if param == "period_months":
+            columns[param] = np.clip(np.rint(sample), 1, 600).astype(np.int64)
+        else:
+            columns[param] = np.maximum(sample, 0.0)
+
+    raw = _raw_metric_arrays(columns["capex"], columns["opex"], columns["effects"], columns["period_months"])
+    shape = (size,)
+    tco = np.broadcast_to(raw.tco, shape)
+    roi = np.broadcast_to(np.where(raw.zero_tco, raw.roi_zero_tco, raw.roi), shape)
+    payback = np.broadcast_to(np.where(raw.pays_back, raw.payback, np.nan), shape)
+    within = np.broadcast_to(raw.pays_back & (raw.payback <= columns["period_months"]), shape)
+    return np.array(tco), np.array(roi), np.array(payback), np.array(within)
+
+
+def _get_monte_carlo_pool() -> ProcessPoolExecutor:
+    """
+    Ленивая инициализация пула процессов для больших выборок.
+
+    Процессы запускаются методом spawn: к моменту расчёта в приложении уже
+    работают потоки (пул хранилища, фоновая запись), а fork при живых
+    потоках может унаследовать захваченные ими замки.
+    """
+    global _monte_carlo_pool
+    with _monte_carlo_pool_lock:
+        if _monte_carlo_pool is None:
+            _monte_carlo_pool = ProcessPoolExecutor(
+                max_workers=settings.MONTE_CARLO_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
             )
+        return _monte_carlo_pool
+
+
+def shutdown_monte_carlo_pool() -> None:
+    """Останавливает пул процессов Monte Carlo (при завершении приложения), если он создавался."""
+    global _monte_carlo_pool
+    with _monte_carlo_pool_lock:
+        pool, _monte_carlo_pool = _monte_carlo_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _metric_stats(values: np.ndarray, percentiles: List[float]) -> MetricStats:
+    """Сводные статистики выборки (значения округляются до 0.01)."""
+    summary = np.concatenate(
+        [
+            [values.mean(), values.std(), values.min(), values.max()],
+            np.percentile(values, percentiles),
+        ]
+    )
+    summary = _round2(summary).tolist()
+    return MetricStats(
+        mean=summary[0],
+        std=summary[1],
+        min=summary[2],
+        max=summary[3],
+        percentiles=summary[4:],
+    )
+
+
+@traced("service.run_monte_carlo")
+def run_monte_carlo(request: MonteCarloRequest) -> MonteCarloResult:
+    """
+    Имитационное моделирование TCO/ROI/Payback.
+
+    Испытания разыгрываются блоками по settings.MONTE_CARLO_CHUNK_SIZE;
+    у каждого блока своё зерно, порождённое из seed (SeedSequence.spawn),
+    поэтому результат при одном seed не зависит от числа процессов.
+    Показатели считаются по целым массивам выборки.
+    """
+    _reject_schedules(request.base_input, "Имитационное моделирование")
+    seed = request.seed if request.seed is not None else secrets.randbits(63)
+    chunk_size = max(1, settings.MONTE_CARLO_CHUNK_SIZE)
+    sizes = [min(chunk_size, request.n_samples - start) for start in range(0, request.n_samples, chunk_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if settings.MONTE_CARLO_WORKERS > 1 and len(sizes) > 1:
+        pool = _get_monte_carlo_pool()
+        chunks = list(pool.map(_monte_carlo_chunk, [request] * len(sizes), sizes, seed_sequences))
+    else:
+        chunks = [_monte_carlo_chunk(request, size, seq) for size, seq in zip(sizes, seed_sequences)]
+
+    tco, roi, payback, within = (np.concatenate(parts) for parts in zip(*chunks))
+    paid_back = payback[~np.isnan(payback)]
+    counts, bin_edges = np.histogram(roi, bins=request.histogram_bins)
+
+    return MonteCarloResult(
+        n_samples=request.n_samples,
+        seed=seed,
+        percentiles=request.percentiles,
+        tco=_metric_stats(tco, request.percentiles),
+        roi_percent=_metric_stats(roi, request.percentiles),
+        payback_months=_metric_stats(paid_back, request.percentiles) if paid_back.size else None,
+        probability_payback_within_period=float(round(within.mean(), 4)),
+        roi_histogram=Histogram(bin_edges=_round2(bin_edges).tolist(), counts=counts.tolist()),
+    )
+
+
+## === ПОДБОР ПАРАМЕТРА (GOAL SEEK) ==================================================
+
+
+GOAL_NOT_DEPENDENT = "Показатель не зависит от подбираемого параметра."
+GOAL_NEEDS_RATE = "Для подбора по NPV нужна ставка дисконтирования (discount_rate_percent)."
+GOAL_UNREACHABLE = "Цель недостижима: решение вне допустимых значений параметра."
+GOAL_SCHEDULES = "Подбор параметра не поддерживает помесячные графики (*_schedule)."
+
+
+def _cumulative_factor(rate: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Сумма коэффициентов дисконтирования за months месяцев (NaN, если ставки нет)."""
+    return np.array(
+        [
+            np.nan if r != r else _discount_factors(r, int(n))[1][-1]
+            for r, n in zip(rate.tolist(), months.tolist())
+        ],
+        dtype=np.float64,
+    )
+
+
+def _npv_uniform(
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+    rate: np.ndarray,
+) -> np.ndarray:
+    """NPV равномерной модели (та же формула, что в _dcf_arrays, без округления)."""
+    return -capex + (effects / months - opex / months) * _cumulative_factor(rate, months)
+
+
+def _goal_seek_closed_form(
+    variable: str,
+    metric: str,
+    target: np.ndarray,
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    months: np.ndarray,
+    rate: np.ndarray,
+) -> np.ndarray:
+    """
+    Аналитическое обращение формул calculate_metrics() (NaN — решения нет).
+
+    ROI = (E - C - O) / (C + O) * 100, Payback = C * N / (E - O),
+    NPV = -C + (E - O) / N * S(N), где S(N) — сумма коэффициентов дисконтирования.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if metric == "roi_percent":
+            k = 1.0 + target / 100.0
+            if variable == "effects":
+                return np.where(capex + opex > 0, k * (capex + opex), np.nan)
+            if variable == "capex":
+                return np.where(k > 0, effects / k - opex, np.nan)
+            if variable == "opex":
+                return np.where(k > 0, effects / k - capex, np.nan)
+        if metric == "payback_months":
+            if variable == "capex":
+                return np.where(effects > opex, target * (effects - opex) / months, np.nan)
+            if variable == "effects":
+                return opex + capex * months / target
+            if variable == "opex":
+                return effects - capex * months / target
+            if variable == "period_months":
+                return np.where(
+                    (capex > 0) & (effects > opex),
+                    np.floor(target * (effects - opex) / capex),
+                    np.nan,
+                )
+        if metric == "npv":
+            annuity = _cumulative_factor(rate, months)
+            if variable == "capex":
+                return (effects - opex) / months * annuity - target
+            if variable == "effects":
+                return opex + (target + capex) * months / annuity
+            if variable == "opex":
+                return effects - (target + capex) * months / annuity
+    return np.full(target.shape, np.nan)
+
+
+def _goal_seek_period_bisection(
+    target: np.ndarray,
+    capex: np.ndarray,
+    opex: np.ndarray,
+    effects: np.ndarray,
+    rate: np.ndarray,
+) -> np.ndarray:
+    """
+    Векторная бисекция по целому period_months для цели по NPV.
+
+    При фиксированных итогах NPV монотонен по периоду, поэтому ищется граница
+    между 1 и 600 месяцами; возвращается период на той стороне, где NPV >= цели.
+    """
+    low = np.ones(target.shape, dtype=np.int64)
+    high = np.full(target.shape, 600, dtype=np.int64)
+    low_ok = _npv_uniform(capex, opex, effects, low, rate) >= target
+    high_ok = _npv_uniform(capex, opex, effects, high, rate) >= target
+    crossing = low_ok != high_ok
+
+    while (crossing & (high - low > 1)).any():
+        middle = (low + high) // 2
+        middle_ok = _npv_uniform(capex, opex, effects, middle, rate) >= target
+        same = middle_ok == low_ok
+        narrowing = crossing & (high - low > 1)
+        low = np.where(narrowing & same, middle, low)
+        high = np.where(narrowing & ~same, middle, high)
+
+    return np.where(crossing, np.where(low_ok, low, high), np.nan).astype(np.float64)
+
+
+def _goal_seek_columns(goals: List[GoalSeekRequest]) -> dict:
+    """
+    Решает набор целей векторно (цели группируются по паре «параметр, показатель»).
+
+    Возвращает колонки: status, method, value, achieved, message и solved_inputs
+    (InvestInput с подставленным решением или None).
+    """
+    size = len(goals)
+    capex = np.array([g.base_input.capex for g in goals], dtype=np.float64)
+    opex = np.array([g.base_input.opex for g in goals], dtype=np.float64)
+    effects = np.array([g.base_input.effects for g in goals], dtype=np.float64)
+    months = np.array([g.base_input.period_months for g in goals], dtype=np.int64)
+    rate = np.array(
+        [np.nan if g.base_input.discount_rate_percent is None else g.base_input.discount_rate_percent for g in goals],
+        dtype=np.float64,
+    )
+    target = np.array([g.target for g in goals], dtype=np.float64)
+    variables = np.array([g.solve_for for g in goals])
+    metrics = np.array([g.metric for g in goals])
+
+    value = np.full(size, np.nan)
+    message: List[Optional[str]] = [None] * size
+    method = ["bisection" if g.metric == "npv" and g.solve_for == "period_months" else "closed_form" for g in goals]
+
+    for variable, metric in {(g.solve_for, g.metric) for g in goals}:
+        rows = np.flatnonzero((variables == variable) & (metrics == metric))
+        if metric == "npv" and variable == "period_months":
+            value[rows] = _goal_seek_period_bisection(
+                target[rows], capex[rows], opex[rows], effects[rows], rate[rows]
+            )
+        else:
+            value[rows] = _goal_seek_closed_form(
+                variable,
+                metric,
+                target[rows],
+                capex[rows],
+                opex[rows],
+                effects[rows],
+                months[rows],
+                rate[rows],
+            )
+
+    ## Проверка допустимости и округление решения
+    is_period = variables == "period_months"
+    value = np.where(is_period, value, _round2(value))
+    valid = np.isfinite(value) & (value >= 0) & (~is_period | ((value >= 1) & (value <= 600)))
+
+    for i, goal in enumerate(goals):
+        if goal.base_input.has_schedules:
+            message[i] = GOAL_SCHEDULES
+        elif goal.metric == "npv" and goal.base_input.discount_rate_percent is None:
+            message[i] = GOAL_NEEDS_RATE
+        elif goal.metric == "roi_percent" and goal.solve_for == "period_months":
+            message[i] = GOAL_NOT_DEPENDENT
+        elif not valid[i]:
+            message[i] = GOAL_UNREACHABLE
+    solved = np.array([m is None for m in message])
+
+    ## Достигнутые значения показателя — тем же векторным расчётом
+    columns = {"capex": capex.copy(), "opex": opex.copy(), "effects": effects.copy(), "period_months": months.copy()}
+    for name, column in columns.items():
+        rows = np.flatnonzero(solved & (variables == name))
+        column[rows] = value[rows]
+    achieved_metrics = _calculate_metrics_arrays(
+        columns["capex"], columns["opex"], columns["effects"], columns["period_months"], rate
+    )
+    achieved = np.full(size, np.nan)
+    for metric_name in ("roi_percent", "payback_months", "npv"):
+        rows = np.flatnonzero(metrics == metric_name)
+        achieved[rows] = getattr(achieved_metrics, metric_name)[rows]
+
+    ## Например, окупаемость при E <= O не определена — цель недостижима
+    unreachable = solved & np.isnan(achieved)
+    for i in np.flatnonzero(unreachable).tolist():
+        message[i] = GOAL_UNREACHABLE
+    solved &= ~unreachable
+
+    return {
+        "status": ["solved" if ok else "infeasible" for ok in solved.tolist()],
+        "method": method,
+        "value": _nan_to_none(np.where(solved, value, np.nan)),
+        "achieved": _nan_to_none(np.where(solved, achieved, np.nan)),
+        "message": message,
+        "solved": solved.tolist(),
+    }
+
+
+@traced("service.run_goal_seek")
+def run_goal_seek(request: GoalSeekRequest) -> GoalSeekResult:
+    """
+    Подбирает значение параметра, при котором показатель равен цели.
+
+    Где формулы позволяют — аналитически, иначе (NPV по периоду) — бисекцией.
+    """
+    columns = _goal_seek_columns([request])
+    result = None
+    if columns["solved"][0]:
+        value = columns["value"][0]
+        solved_input = request.base_input.model_copy(
+            update={request.solve_for: int(value) if request.solve_for == "period_months" else value}
         )
+        result = _calculate_metrics(solved_input)
+
+    return GoalSeekResult(
+        solve_for=request.solve_for,
+        metric=request.metric,
+        target=request.target,
+        status=columns["status"][0],
+        method=columns["method"][0],
+        value=columns["value"][0],
+        achieved=columns["achieved"][0],
+        message=columns["message"][0],
+        result=result,
+    )
 
-    result.sort(key=lambda s: (s.updated_at or s.created_at), reverse=True)
-    return result
+
+@traced("service.run_goal_seek_batch")
+def run_goal_seek_batch(request: GoalSeekBatchRequest) -> GoalSeekBatchResult:
+    """Пакетный подбор параметров: все цели решаются одним векторным проходом."""
+    columns = _goal_seek_columns(request.goals)
+    return GoalSeekBatchResult(
+        count=len(request.goals),
+        status=columns["status"],
+        method=columns["method"],
+        value=columns["value"],
+        achieved=columns["achieved"],
+        message=columns["message"],
+    )
+
+
+## === РАБОТА СО СЦЕНАРИЯМИ (ХРАНИЛИЩЕ) ===============================================
+
+
+@traced("service.list_scenarios")
+def list_scenarios(storage: Optional[ScenarioStorage] = None) -> List[ScenarioShort]:
+    """
+    Возвращает список кратких сведений о сценариях
+    (от последних изменённых к давним).
+
+    storage — хранилище; по умолчанию выбирается settings.STORAGE_BACKEND.
+    Используется в GET /scenarios.
+    """
+    with operation_duration.time(operation="storage_load"):
+        return (storage or get_storage()).list_scenarios()
+
+
+@traced("service.list_scenarios_page")
+def list_scenarios_page(
+    query: ScenarioListQuery, storage: Optional[ScenarioStorage] = None
+) -> ScenarioPage:
+    """
+    Возвращает страницу списка сценариев с фильтрами (курсорная пагинация).
+
+    Используется в GET /scenarios; при некорректном курсоре выбрасывает ValueError.
+    """
+    with operation_duration.time(operation="storage_load"):
+        return (storage or get_storage()).list_scenarios_page(query)
+
+
+def iter_scenarios(
+    query: Optional[ScenarioListQuery] = None, storage: Optional[ScenarioStorage] = None
+) -> Iterator[ScenarioShort]:
+    """
+    Все подходящие сценарии (краткие сведения) по одному — для потоковой выдачи
+    списка: в памяти одновременно не больше одной страницы хранилища.
+    """
+    return (storage or get_storage()).iter_scenarios(query)
 
 
-def get_scenario(scenario_id: str) -> Optional[ScenarioDetail]:
+def iter_scenario_details(
+    query: Optional[ScenarioListQuery] = None, storage: Optional[ScenarioStorage] = None
+) -> Iterator[ScenarioDetail]:
+    """Полные сценарии по одному — для потоковой выгрузки (export)."""
+    return (storage or get_storage()).iter_scenario_details(query)
+
+
+@traced("service.get_scenario")
+def get_scenario(scenario_id: str, storage: Optional[ScenarioStorage] = None) -> Optional[ScenarioDetail]:
     """
     Возвращает сценарий по id или None, если не найден.
 
     Используется в GET /scenarios/{id}.
     """
-    raw_items = _load_scenarios_raw()
-    for item in raw_items:
-        if item.get("id") == scenario_id:
-            return _parse_scenario(item)
-    return None
+    with operation_duration.time(operation="storage_load"):
+        return (storage or get_storage()).get_scenario(scenario_id)
+
+
+def _storage_metrics() -> Iterator[tuple]:
+    """Сборщик метрик хранилища для GET /metrics: число сценариев и размер файлов."""
+    storage = get_storage()
+    labels = {"backend": settings.STORAGE_BACKEND}
+    yield (
+        "investcalc_scenarios",
+        "gauge",
+        "Число сохранённых сценариев.",
+        [(labels, storage.count_scenarios())],
+    )
+    size = storage.data_size_bytes()
+    if size is not None:
+        yield (
+            "investcalc_storage_size_bytes",
+            "gauge",
+            "Размер файлов хранилища сценариев на диске, байт.",
+            [(labels, size)],
+        )
+
+
+metrics_registry.add_collector(_storage_metrics)
 
 
-def save_scenario(scenario: ScenarioDetail) -> ScenarioDetail:
+class StoreVersion(NamedTuple):
+    """Версия содержимого хранилища сценариев (для условных GET-запросов)."""
+
+    tag: str
+    modified_at: Optional[datetime]
+
+
+def store_version(storage: Optional[ScenarioStorage] = None) -> Optional[StoreVersion]:
+    """
+    Версия хранилища: tag меняется при каждом сохранении (в том числе другим
+    процессом), modified_at — время последнего изменения (UTC).
+
+    Данные сценариев не читаются (только метаданные хранилища: подпись
+    файлов или счётчик версий). None — хранилище не сообщает версию.
+    """
+    storage = storage or get_storage()
+    version = storage.data_version()
+    if version is None:
+        return None
+    tag = hashlib.blake2b(repr(version).encode("utf-8"), digest_size=12).hexdigest()
+    return StoreVersion(tag=tag, modified_at=storage.data_modified_at())
+
+
+def scenario_columns(storage: Optional[ScenarioStorage] = None) -> ScenarioColumns:
+    """
+    Входные данные всех сохранённых сценариев колонками NumPy
+    (JSON-хранилище отдаёт их из столбцового снимка через mmap).
+    """
+    return (storage or get_storage()).scenario_columns()
+
+
+@traced("service.save_scenario")
+def save_scenario(scenario: ScenarioDetail, storage: Optional[ScenarioStorage] = None) -> ScenarioDetail:
     """
     Создаёт новый или обновляет существующий сценарий.
 
@@ -290,44 +1490,428 @@ def save_scenario(scenario: ScenarioDetail) -> ScenarioDetail:
     - если created_at отсутствует → проставляется текущее время;
     - updated_at всегда обновляется.
     """
-    raw_items = _load_scenarios_raw()
-    items: List[ScenarioDetail] = []
+    final_scenario = _stamp_scenario(scenario, _now())
 
-    for item in raw_items:
-        parsed = _parse_scenario(item)
-        if parsed is not None:
-            items.append(parsed)
+    with operation_duration.time(operation="storage_save"):
+        (storage or get_storage()).save_scenario(final_scenario)
 
-    now = _now()
+    return final_scenario
 
-    scenario_id = scenario.id or str(uuid4())
-    created_at = scenario.created_at or now
-    updated_at = now
 
-    final_scenario = ScenarioDetail(
-        id=scenario_id,
+def _stamp_scenario(scenario: ScenarioDetail, now: datetime) -> ScenarioDetail:
+    """Назначает id (если пустой), created_at (если не задан) и updated_at = now."""
+    return ScenarioDetail(
+        id=scenario.id or str(uuid4()),
         name=scenario.name,
-        created_at=created_at,
-        updated_at=updated_at,
+        created_at=_naive_utc(scenario.created_at) or now,
+        updated_at=now,
         description=scenario.description,
         input=scenario.input,
         last_result=scenario.last_result,
     )
 
-    found = False
-    for idx, existing in enumerate(items):
-        if existing.id == final_scenario.id:
-            items[idx] = final_scenario
-            found = True
-            break
 
-    if not found:
-        items.append(final_scenario)
+## === МАССОВЫЙ ИМПОРТ СЦЕНАРИЕВ =====================================================
 
-    raw_to_save = [item.model_dump(mode="json") for item in items]
-    _save_scenarios_raw(raw_to_save)
+_scenario_list_adapter = TypeAdapter(List[ScenarioDetail])
 
-    return final_scenario
+
+def iter_ndjson(lines: Iterable[Union[str, bytes]]) -> Iterator[Any]:
+    """
+    Записи NDJSON по одной на строку (пустые строки пропускаются).
+
+    Вместо строки с некорректным JSON выдаётся ValueError — импорт
+    отмечает её как ошибочную запись и продолжает работу.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValueError(f"Некорректный JSON: {exc}")
+
+
+def parse_import_payload(data: Union[str, bytes]) -> List[Any]:
+    """
+    Записи из JSON-документа: массив записей или одна запись (объект).
+
+    ValueError — если документ не является JSON-массивом или объектом.
+    """
+    try:
+        payload = json.loads(data)
+    except ValueError as exc:
+        raise ValueError(f"Некорректный JSON: {exc}") from exc
+    if isinstance(payload, dict):
+        return [payload]
+    if not isinstance(payload, list):
+        raise ValueError("Ожидается JSON-массив сценариев или один сценарий (объект).")
+    return payload
+
+
+def _import_candidate(record: Any, index: int, now: datetime) -> Any:
+    """
+    Запись импорта в виде, пригодном для валидации ScenarioDetail.
+
+    Голые входные данные (как data/input-*.json) оборачиваются в сценарий
+    с названием проекта; недостающие id и created_at заполняются так же,
+    как при сохранении сценария через POST /scenarios.
+    """
+    if not isinstance(record, dict):
+        return record
+    if "input" not in record and "capex" in record:
+        record = {"name": record.get("project_name") or f"Импорт #{index + 1}", "input": record}
+    candidate = dict(record)
+    candidate.setdefault("id", "")
+    candidate.setdefault("created_at", now)
+    return candidate
+
+
+def _format_validation_error(error: dict) -> str:
+    loc = ".".join(str(part) for part in error["loc"])
+    return f"{loc or 'record'}: {error['msg']}"
+
+
+def _import_error(index: int, record: Any, errors: List[str]) -> ScenarioImportError:
+    fields = record if isinstance(record, dict) else {}
+    return ScenarioImportError(
+        index=index,
+        id=str(fields["id"]) if fields.get("id") else None,
+        name=str(fields["name"]) if fields.get("name") else None,
+        errors=errors,
+    )
+
+
+def _validate_import_batch(
+    batch: List[Tuple[int, Any]],
+    now: datetime,
+) -> Tuple[List[ScenarioDetail], List[ScenarioImportError]]:
+    """
+    Валидирует пачку записей одним вызовом pydantic для всего списка.
+
+    Если в пачке есть ошибки, они раскладываются по записям (первый элемент
+    loc — позиция в списке), а корректные записи валидируются повторно.
+    """
+    errors: Dict[int, List[str]] = {}
+    candidates: List[Any] = []
+    for pos, (index, record) in enumerate(batch):
+        if isinstance(record, Exception):
+            errors[pos] = [str(record)]
+        candidates.append(_import_candidate(record, index, now))
+
+    positions = [pos for pos in range(len(batch)) if pos not in errors]
+    try:
+        valid = _scenario_list_adapter.validate_python([candidates[pos] for pos in positions])
+    except ValidationError as exc:
+        for error in exc.errors():
+            item, *loc = error["loc"]
+            errors.setdefault(positions[item], []).append(_format_validation_error({**error, "loc": loc}))
+        valid = _scenario_list_adapter.validate_python(
+            [candidates[pos] for pos in positions if pos not in errors]
+        )
+
+    failed = [_import_error(batch[pos][0], batch[pos][1], messages) for pos, messages in sorted(errors.items())]
+    return valid, failed
+
+
+@traced("service.import_scenarios")
+def import_scenarios(
+    records: Iterable[Any],
+    storage: Optional[ScenarioStorage] = None,
+) -> ScenarioImportResult:
+    """
+    Массовый импорт сценариев.
+
+    - записи валидируются пачками по settings.SCENARIOS_IMPORT_BATCH;
+    - ошибочные записи не прерывают импорт, а попадают в отчёт (errors);
+    - все корректные записи сохраняются одной фиксацией (save_scenarios).
+
+    records — записи ScenarioDetail (id и даты необязательны) или голые
+    входные данные InvestInput; экземпляр исключения на месте записи
+    считается ошибкой разбора (см. iter_ndjson).
+    """
+    now = _now()
+    batch_size = max(1, settings.SCENARIOS_IMPORT_BATCH)
+    scenarios: List[ScenarioDetail] = []
+    errors: List[ScenarioImportError] = []
+
+    batch: List[Tuple[int, Any]] = []
+    for index, record in enumerate(records):
+        batch.append((index, record))
+        if len(batch) >= batch_size:
+            valid, failed = _validate_import_batch(batch, now)
+            scenarios.extend(_stamp_scenario(scenario, now) for scenario in valid)
+            errors.extend(failed)
+            batch = []
+    if batch:
+        valid, failed = _validate_import_batch(batch, now)
+        scenarios.extend(_stamp_scenario(scenario, now) for scenario in valid)
+        errors.extend(failed)
+
+    if scenarios:
+        with operation_duration.time(operation="storage_save"):
+            (storage or get_storage()).save_scenarios(scenarios)
+
+    return ScenarioImportResult(
+        imported=len(scenarios),
+        failed=len(errors),
+        ids=[scenario.id for scenario in scenarios],
+        errors=errors,
+    )
+
+
+## === ПЕРЕСЧЁТ СОХРАНЁННЫХ РЕЗУЛЬТАТОВ ==============================================
+
+
+def _is_stale(scenario: ScenarioDetail) -> bool:
+    """Результат отсутствует или посчитан не текущей версией формул."""
+    return scenario.last_result is None or scenario.last_result.formula_version != FORMULA_VERSION
+
+
+def _recompute_results(inputs: List[InvestInput]) -> List[Union[InvestResult, ValueError]]:
+    """
+    Результаты calculate_metrics() для порции входных данных.
+
+    Входные данные без графиков считаются одним векторным расчётом по колонкам
+    (как calculate_metrics_batch), с графиками — по одному. Для входных данных,
+    которые calculate_metrics() отвергает, на месте результата возвращается ValueError.
+    """
+    results: List[Any] = [None] * len(inputs)
+    plain = []
+    for idx, input_data in enumerate(inputs):
+        if input_data.has_schedules:
+            try:
+                results[idx] = _calculate_metrics(input_data)
+            except ValueError as exc:
+                results[idx] = exc
+        else:
+            plain.append(idx)
+    if not plain:
+        return results
+
+    rows = [inputs[idx] for idx in plain]
+    capex = np.array([row.capex for row in rows], dtype=np.float64)
+    opex = np.array([row.opex for row in rows], dtype=np.float64)
+    effects = np.array([row.effects for row in rows], dtype=np.float64)
+    months = np.array([row.period_months for row in rows], dtype=np.int64)
+    rate = None
+    if any(row.discount_rate_percent is not None for row in rows):
+        rate = np.array(
+            [np.nan if row.discount_rate_percent is None else row.discount_rate_percent for row in rows],
+            dtype=np.float64,
+        )
+
+    metrics = _calculate_metrics_arrays(capex, opex, effects, months, rate)
+    for idx, result in zip(plain, _results_from_arrays(metrics, (row.project_name for row in rows))):
+        results[idx] = result
+    return results
+
+
+def iter_recompute_scenarios(
+    storage: Optional[ScenarioStorage] = None,
+    force: bool = False,
+    chunk_size: Optional[int] = None,
+) -> Iterator[ScenarioRecomputeProgress]:
+    """
+    Пересчитывает last_result сохранённых сценариев по текущим формулам.
+
+    Сценарии читаются из хранилища потоком; устаревшие (см. _is_stale, при
+    force=True — все) собираются в порции по settings.SCENARIOS_RECOMPUTE_CHUNK,
+    считаются векторно и сохраняются одной фиксацией на порцию.
+    created_at/updated_at не меняются: пересчёт не считается изменением сценария.
+    Запись условная (save_scenarios_if_unchanged): сценарий, изменённый после
+    чтения порции, не перезаписывается старой версией и учитывается как пропущенный.
+
+    После каждой порции выдаётся ход пересчёта, последним — итог (done=True).
+    """
+    storage = storage or get_storage()
+    chunk_size = max(1, chunk_size or settings.SCENARIOS_RECOMPUTE_CHUNK)
+    started = time.perf_counter()
+    counters = {"scanned": 0, "recomputed": 0, "skipped": 0, "failed": 0}
+
+    def progress(done: bool) -> ScenarioRecomputeProgress:
+        elapsed = time.perf_counter() - started
+        return ScenarioRecomputeProgress(
+            formula_version=FORMULA_VERSION,
+            elapsed_seconds=round(elapsed, 6),
+            scenarios_per_second=round(counters["scanned"] / elapsed, 2) if elapsed > 0 else 0.0,
+            done=done,
+            **counters,
+        )
+
+    def flush(chunk: List[ScenarioDetail]) -> None:
+        updates = []
+        for scenario, result in zip(chunk, _recompute_results([s.input for s in chunk])):
+            if isinstance(result, ValueError):
+                counters["failed"] += 1
+            else:
+                updates.append((scenario, scenario.model_copy(update={"last_result": result})))
+        saved = 0
+        if updates:
+            with operation_duration.time(operation="storage_save"):
+                saved = storage.save_scenarios_if_unchanged(updates)
+        counters["recomputed"] += saved
+        counters["skipped"] += len(updates) - saved
+
+    chunk: List[ScenarioDetail] = []
+    for scenario in storage.iter_scenario_details():
+        counters["scanned"] += 1
+        if not force and not _is_stale(scenario):
+            counters["skipped"] += 1
+            continue
+        chunk.append(scenario)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+            yield progress(done=False)
+    if chunk:
+        flush(chunk)
+    yield progress(done=True)
+
+
+def recompute_scenarios(
+    storage: Optional[ScenarioStorage] = None,
+    force: bool = False,
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[ScenarioRecomputeProgress], None]] = None,
+) -> ScenarioRecomputeProgress:
+    """Выполняет iter_recompute_scenarios() целиком и возвращает итог (ход — в on_progress)."""
+    report = None
+    for report in iter_recompute_scenarios(storage, force, chunk_size):
+        if on_progress is not None:
+            on_progress(report)
+    return report
+
+
+## === АНАЛИТИКА ПО ВСЕМ СЦЕНАРИЯМ ХРАНИЛИЩА ========================================
+
+
+def build_scenarios_frame(storage: Optional[ScenarioStorage] = None) -> pd.DataFrame:
+    """
+    Таблица всех сохранённых сценариев: входные данные и показатели,
+    посчитанные текущими формулами (строка = сценарий, индекс — id).
+
+    Входные данные берутся колонками (scenario_columns) и считаются одним
+    векторным расчётом; сценарии с графиками — по одному через calculate_metrics.
+    payback_months = NaN — проект не окупается; npv/irr_percent = NaN — ставка не задана.
+    """
+    storage = storage or get_storage()
+    columns = storage.scenario_columns()
+    capex = np.asarray(columns.capex, dtype=np.float64)
+    opex = np.asarray(columns.opex, dtype=np.float64)
+    effects = np.asarray(columns.effects, dtype=np.float64)
+    months = np.asarray(columns.period_months, dtype=np.int64)
+    rate = np.asarray(columns.discount_rate_percent, dtype=np.float64)
+    has_rate = ~np.isnan(rate)
+
+    metrics = _calculate_metrics_arrays(capex, opex, effects, months, rate if has_rate.any() else None)
+    missing = np.full(len(columns), np.nan)
+    frame = pd.DataFrame(
+        {
+            "capex": capex,
+            "opex": opex,
+            "effects": effects,
+            "period_months": months,
+            "discount_rate_percent": rate,
+            "has_schedules": np.asarray(columns.has_schedules, dtype=bool),
+            "tco": metrics.tco,
+            "roi_percent": metrics.roi_percent,
+            "payback_months": metrics.payback_months,
+            "npv": missing if metrics.npv is None else metrics.npv,
+            "irr_percent": missing if metrics.irr_percent is None else metrics.irr_percent,
+        },
+        index=pd.Index(columns.ids, name="id"),
+    )
+
+    for scenario_id in frame.index[frame["has_schedules"]]:
+        scenario = storage.get_scenario(scenario_id)
+        if scenario is None:
+            continue
+        result = _calculate_metrics(scenario.input)
+        frame.loc[scenario_id, ["tco", "roi_percent", "payback_months", "npv", "irr_percent"]] = [
+            np.nan if value is None else value
+            for value in (result.tco, result.roi_percent, result.payback_months, result.npv, result.irr_percent)
+        ]
+    return frame
+
+
+class _ScenariosFrameCache:
+    """
+    Таблица сценариев для каждого хранилища вместе с версией его содержимого
+    (ScenarioStorage.data_version). Таблица пересобирается, только когда версия
+    изменилась; хранилище без версии (None) не кэшируется.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frames: Dict[ScenarioStorage, Tuple[Any, pd.DataFrame]] = {}
+        self.builds = 0
+
+    def get(self, storage: ScenarioStorage) -> pd.DataFrame:
+        version = storage.data_version()
+        with self._lock:
+            cached = self._frames.get(storage)
+            if version is not None and cached is not None and cached[0] == version:
+                return cached[1]
+            ## Версия снята до сборки: если хранилище изменится во время сборки,
+            ## следующий запрос соберёт таблицу заново
+            frame = build_scenarios_frame(storage)
+            self.builds += 1
+            if version is not None:
+                self._frames[storage] = (version, frame)
+            return frame
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+
+scenarios_frame_cache = _ScenariosFrameCache()
+
+
+def _optional_stats(values: np.ndarray, percentiles: List[float]) -> Optional[MetricStats]:
+    return _metric_stats(values, percentiles) if values.size else None
+
+
+@traced("service.portfolio_analytics")
+def portfolio_analytics(
+    query: Optional[PortfolioAnalyticsQuery] = None,
+    storage: Optional[ScenarioStorage] = None,
+) -> PortfolioAnalytics:
+    """
+    Сводные показатели по всем сохранённым сценариям: суммы, число
+    неокупающихся проектов, распределения ROI, срока окупаемости и NPV.
+
+    Таблица сценариев кэшируется до изменения хранилища, поэтому повторные
+    запросы считают только статистики.
+    """
+    query = query or PortfolioAnalyticsQuery()
+    frame = scenarios_frame_cache.get(storage or get_storage())
+
+    roi = frame["roi_percent"].to_numpy()
+    payback = frame["payback_months"].dropna().to_numpy()
+    npv = frame["npv"].dropna().to_numpy()
+    totals = _round2(frame[["capex", "opex", "effects"]].sum().to_numpy(dtype=np.float64)).tolist()
+
+    histogram = None
+    if payback.size:
+        counts, bin_edges = np.histogram(payback, bins=query.histogram_bins)
+        histogram = Histogram(bin_edges=_round2(bin_edges).tolist(), counts=counts.tolist())
+
+    return PortfolioAnalytics(
+        count=len(frame),
+        with_schedules=int(frame["has_schedules"].sum()),
+        total_capex=totals[0],
+        total_opex=totals[1],
+        total_effects=totals[2],
+        never_pay_back=int(frame["payback_months"].isna().sum()),
+        percentiles=query.percentiles,
+        roi_percent=_optional_stats(roi, query.percentiles),
+        payback_months=_optional_stats(payback, query.percentiles),
+        payback_histogram=histogram,
+        npv=_optional_stats(npv, query.percentiles),
+    )
 
 
 ## === КЛАСС-ОБЁРТКА ДЛЯ ТЕСТОВ И ДРУГИХ СЛОЁВ =======================================
@@ -339,32 +1923,102 @@ class InvestService:
 
     Оборачивает функции модуля:
     - calculate_metrics(...)
+    - calculate_metrics_batch(...)
     - run_sensitivity(...)
-    - list_scenarios()
-    - get_scenario(...)
-    - save_scenario(...)
+    - run_sensitivity_grid(...)
+    - run_monte_carlo(...)
+    - run_goal_seek(...), run_goal_seek_batch(...)
+    - list_scenarios(), list_scenarios_page(...)
+    - iter_scenarios(...), iter_scenario_details(...)
+    - get_scenario(...), scenario_columns(), store_version()
+    - save_scenario(...), import_scenarios(...)
+    - recompute_scenarios(...), portfolio_analytics(...)
+
+    storage — хранилище сценариев; по умолчанию выбирается
+    settings.STORAGE_BACKEND (см. src/storage).
     """
 
+    def __init__(self, storage: Optional[ScenarioStorage] = None) -> None:
+        self._storage = storage
+
+    @property
+    def storage(self) -> ScenarioStorage:
+        return self._storage or get_storage()
+
     ## --- Расчёты ---
 
     def calculate(self, input_data: InvestInput) -> InvestResult:
         """Выполняет расчёт TCO/ROI/Payback по входным данным."""
         return calculate_metrics(input_data)
 
-    def run_sensitivity(self, request: SensitivityRequest) -> SensitivityResult:
-        """Запускает анализ чувствительности для набора параметров."""
+    def calculate_batch(self, request: BatchCalcRequest) -> BatchCalcResult:
+        """Выполняет пакетный расчёт TCO/ROI/Payback по колонкам входных данных."""
+        return calculate_metrics_batch(request)
+
+    def run_sensitivity(
+        self, request: SensitivityRequest
+    ) -> Union[SensitivityResult, SensitivitySweepResult]:
+        """Запускает анализ чувствительности (±delta или sweep) для набора параметров."""
         return run_sensitivity(request)
 
+    def run_sensitivity_grid(self, request: SensitivityGridRequest) -> SensitivityGridResult:
+        """Строит двумерную таблицу показателя по двум параметрам."""
+        return run_sensitivity_grid(request)
+
+    def run_monte_carlo(self, request: MonteCarloRequest) -> MonteCarloResult:
+        """Выполняет имитационное моделирование (Monte Carlo)."""
+        return run_monte_carlo(request)
+
+    def run_goal_seek(self, request: GoalSeekRequest) -> GoalSeekResult:
+        """Подбирает значение параметра под целевое значение показателя."""
+        return run_goal_seek(request)
+
+    def run_goal_seek_batch(self, request: GoalSeekBatchRequest) -> GoalSeekBatchResult:
+        """Пакетный подбор параметров (например, по портфелю проектов)."""
+        return run_goal_seek_batch(request)
+
     ## --- Сценарии ---
 
     def list_scenarios(self) -> List[ScenarioShort]:
         """Возвращает список кратких сведений о сценариях."""
-        return list_scenarios()
+        return list_scenarios(self.storage)
+
+    def list_scenarios_page(self, query: ScenarioListQuery) -> ScenarioPage:
+        """Возвращает страницу списка сценариев с фильтрами."""
+        return list_scenarios_page(query, self.storage)
+
+    def iter_scenarios(self, query: Optional[ScenarioListQuery] = None) -> Iterator[ScenarioShort]:
+        """Все подходящие сценарии (краткие сведения) по одному."""
+        return iter_scenarios(query, self.storage)
+
+    def iter_scenario_details(self, query: Optional[ScenarioListQuery] = None) -> Iterator[ScenarioDetail]:
+        """Полные сценарии по одному (для выгрузки)."""
+        return iter_scenario_details(query, self.storage)
 
     def get_scenario(self, scenario_id: str) -> Optional[ScenarioDetail]:
         """Возвращает сценарий по id или None, если не найден."""
-        return get_scenario(scenario_id)
+        return get_scenario(scenario_id, self.storage)
+
+    def store_version(self) -> Optional[StoreVersion]:
+        """Версия содержимого хранилища (для ETag/Last-Modified)."""
+        return store_version(self.storage)
+
+    def scenario_columns(self) -> ScenarioColumns:
+        """Входные данные всех сохранённых сценариев колонками NumPy."""
+        return scenario_columns(self.storage)
 
     def save_scenario(self, scenario: ScenarioDetail) -> ScenarioDetail:
-        """Создаёт новый или обновляет существующий сценарий в JSON-файле."""
-        return save_scenario(scenario)
+        """Создаёт новый или обновляет существующий сценарий в хранилище."""
+        return save_scenario(scenario, self.storage)
+
+    def import_scenarios(self, records: Iterable[Any]) -> ScenarioImportResult:
+        """Массовый импорт сценариев с отчётом об ошибочных записях."""
+        return import_scenarios(records, self.storage)
+
+    def portfolio_analytics(self, query: Optional[PortfolioAnalyticsQuery] = None) -> PortfolioAnalytics:
+        """Сводная аналитика по всем сохранённым сценариям."""
+        return portfolio_analytics(query, self.storage)
+
+    def recompute_scenarios(self, force: bool = False) -> ScenarioRecomputeProgress:
+        """Пересчёт устаревших (при force — всех) last_result сохранённых сценариев."""
+        return recompute_scenarios(self.storage, force)
@@ -0,0 +1,61 @@
+## src/storage/__init__.py
+"""
+Хранилища сценариев InvestCalc.
+
+- ScenarioStorage — интерфейс, от которого зависит InvestService;
+- JsonScenarioStorage — JSON-файл + журнал сохранений (по умолчанию);
+- SqliteScenarioStorage — SQLite (WAL, индексы) для больших объёмов.
+
+Хранилище по умолчанию выбирается настройкой settings.STORAGE_BACKEND.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Tuple
+
+from src.core.config import settings
+from src.storage.base import ScenarioStorage, parse_record, scenario_to_record  ## noqa: F401
+from src.storage.json_storage import JsonScenarioStorage
+from src.storage.sqlite_storage import SqliteScenarioStorage
+
+
+STORAGE_BACKENDS = {
+    "json": JsonScenarioStorage,
+    "sqlite": SqliteScenarioStorage,
+}
+
+_storages: Dict[Tuple[str, str], ScenarioStorage] = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage() -> ScenarioStorage:
+    """
+    Хранилище по умолчанию согласно settings.STORAGE_BACKEND.
+
+    Экземпляры переиспользуются в пределах процесса (по бэкенду и пути к данным).
+    """
+    backend = settings.STORAGE_BACKEND
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(
+            f"Неизвестное хранилище STORAGE_BACKEND={backend!r}; "
+            f"допустимо: {', '.join(STORAGE_BACKENDS)}."
+        )
+    path = settings.SCENARIOS_DB_FILE if backend == "sqlite" else settings.SCENARIOS_FILE
+    key = (backend, str(path))
+
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None:
+            storage = STORAGE_BACKENDS[backend](path)
+            _storages[key] = storage
+    return storage
+
+
+__all__ = [
+    "ScenarioStorage",
+    "JsonScenarioStorage",
+    "SqliteScenarioStorage",
+    "STORAGE_BACKENDS",
+    "get_storage",
+]
@@ -0,0 +1,249 @@
+## src/storage/base.py
+"""
+Интерфейс хранилища сценариев и общие функции преобразования записей.
+
+Запись (record) — dict сценария в JSON-представлении, в котором помесячные
+графики упакованы в строки (см. pack_schedule в src.models.invest).
+В таком виде сценарии лежат и в JSON-файле, и в колонке data SQLite.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from src.models.invest import (
+    SCENARIOS_PAGE_MAX_LIMIT,
+    SCHEDULE_FIELDS,
+    ScenarioDetail,
+    ScenarioListQuery,
+    ScenarioPage,
+    ScenarioShort,
+    pack_schedule,
+)
+from src.storage.columns import ScenarioColumns, columns_from_records
+
+
+## Подпись файлов хранилища: (путь, mtime_ns, размер) каждого файла
+FileSignature = Tuple[str, Optional[int], Optional[int]]
+FilesSignature = Tuple[FileSignature, ...]
+
+
+def files_signature(paths: Iterable[Path]) -> FilesSignature:
+    """Подпись файлов; для отсутствующего файла — (путь, None, None)."""
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            signature.append((str(path), None, None))
+        else:
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def signature_modified_at(signature: FilesSignature) -> Optional[datetime]:
+    """Время последнего изменения (UTC) самого свежего из файлов подписи; None — файлов нет."""
+    mtimes = [mtime for _, mtime, _ in signature if mtime is not None]
+    if not mtimes:
+        return None
+    return datetime.fromtimestamp(max(mtimes) / 1e9, tz=timezone.utc)
+
+
+def signature_size(signature: FilesSignature) -> int:
+    """Суммарный размер файлов подписи, байт (отсутствующие файлы не учитываются)."""
+    return sum(size for _, _, size in signature if size is not None)
+
+
+## Ключ сортировки списка: (время последнего изменения, id); список идёт по убыванию ключа
+SortKey = Tuple[datetime, str]
+
+
+def sort_key(short: ScenarioShort) -> SortKey:
+    """Ключ сортировки сценария: (updated_at или created_at, id)."""
+    return (short.updated_at or short.created_at, short.id)
+
+
+def encode_cursor(key: SortKey) -> str:
+    """Курсор страницы — ключ последнего выданного сценария (base64url от JSON)."""
+    raw = json.dumps([key[0].isoformat(), key[1]], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Обратное преобразование к encode_cursor(); ValueError для некорректного курсора."""
+    try:
+        sort_at, scenario_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (datetime.fromisoformat(sort_at), str(scenario_id))
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise ValueError("Некорректный курсор страницы (cursor).") from exc
+
+
+def matches_query(short: ScenarioShort, query: ScenarioListQuery) -> bool:
+    """Проверяет фильтры запроса (кроме курсора) для одного сценария."""
+    updated = short.updated_at or short.created_at
+    return not (
+        (query.name_prefix and not short.name.startswith(query.name_prefix))
+        or (query.created_from and short.created_at < query.created_from)
+        or (query.created_to and short.created_at > query.created_to)
+        or (query.updated_from and updated < query.updated_from)
+        or (query.updated_to and updated > query.updated_to)
+    )
+
+
+def scenario_to_record(scenario: ScenarioDetail) -> dict:
+    """
+    Преобразует сценарий в запись для хранения: графики во входных данных
+    заменяются упакованными строками (пустые графики не сохраняются вовсе).
+    """
+    record = scenario.model_dump(mode="json")
+    input_data = record.get("input") or {}
+    for name in SCHEDULE_FIELDS:
+        if isinstance(input_data.get(name), list):
+            input_data[name] = pack_schedule(input_data[name])
+        elif name in input_data and input_data[name] is None:
+            del input_data[name]
+    return record
+
+
+def parse_record(record: dict) -> Optional[ScenarioDetail]:
+    """Преобразует запись в ScenarioDetail, при ошибке возвращает None."""
+    try:
+        return ScenarioDetail.model_validate(record)
+    except Exception:
+        return None
+
+
+def record_matches(expected: ScenarioDetail, record: Optional[dict]) -> bool:
+    """Сохранённая запись (None — сценария нет) — это тот же сценарий, что expected."""
+    return record is not None and parse_record(record) == expected
+
+
+def page_from_matches(matches: List[ScenarioShort], limit: int) -> ScenarioPage:
+    """
+    Формирует страницу из не более чем limit + 1 подходящих сценариев:
+    лишний сценарий означает, что есть следующая страница.
+    """
+    items = matches[:limit]
+    next_cursor = encode_cursor(sort_key(items[-1])) if len(matches) > limit else None
+    return ScenarioPage(items=items, next_cursor=next_cursor)
+
+
+class ScenarioStorage(ABC):
+    """
+    Хранилище сценариев, от которого зависит InvestService.
+
+    Назначение id и дат (created_at/updated_at) — забота сервиса;
+    хранилище сохраняет сценарий как есть (upsert по id).
+    """
+
+    @abstractmethod
+    def list_scenarios(self) -> List[ScenarioShort]:
+        """Краткие сведения о сценариях, от последних изменённых к давним."""
+
+    def list_scenarios_page(self, query: ScenarioListQuery) -> ScenarioPage:
+        """
+        Страница списка сценариев с фильтрами.
+
+        Базовая реализация фильтрует полный список; хранилища переопределяют её,
+        чтобы страница читалась по отсортированному индексу.
+        """
+        after = decode_cursor(query.cursor) if query.cursor else None
+        items = [
+            short
+            for short in self.list_scenarios()
+            if (after is None or sort_key(short) < after) and matches_query(short, query)
+        ]
+        return page_from_matches(items[: query.limit + 1], query.limit)
+
+    def iter_scenarios(self, query: Optional[ScenarioListQuery] = None) -> Iterator[ScenarioShort]:
+        """
+        Все подходящие под фильтры сценарии (краткие сведения) по одному,
+        начиная с query.cursor. Читаются страницами по query.limit, поэтому
+        в памяти одновременно находится не больше одной страницы.
+        """
+        query = query or ScenarioListQuery(limit=SCENARIOS_PAGE_MAX_LIMIT)
+        while True:
+            page = self.list_scenarios_page(query)
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            query = query.model_copy(update={"cursor": page.next_cursor})
+
+    def iter_scenario_details(self, query: Optional[ScenarioListQuery] = None) -> Iterator[ScenarioDetail]:
+        """Полные сценарии по одному (в порядке и с фильтрами iter_scenarios)."""
+        for short in self.iter_scenarios(query):
+            scenario = self.get_scenario(short.id)
+            if scenario is not None:
+                yield scenario
+
+    @abstractmethod
+    def get_scenario(self, scenario_id: str) -> Optional[ScenarioDetail]:
+        """Сценарий по id или None, если не найден."""
+
+    @abstractmethod
+    def save_scenario(self, scenario: ScenarioDetail) -> None:
+        """Создаёт или заменяет сценарий с тем же id."""
+
+    def save_scenarios(self, scenarios: List[ScenarioDetail]) -> None:
+        """
+        Сохраняет несколько сценариев одной фиксацией (массовый импорт).
+
+        Базовая реализация сохраняет сценарии по одному; хранилища
+        переопределяют её, чтобы запись шла одной транзакцией/дозаписью.
+        """
+        for scenario in scenarios:
+            self.save_scenario(scenario)
+
+    def save_scenarios_if_unchanged(self, updates: List[Tuple[ScenarioDetail, ScenarioDetail]]) -> int:
+        """
+        Условная запись (для фоновых пересчётов): пары (прочитанный сценарий, новый сценарий);
+        новый сохраняется, только если в хранилище лежит ровно прочитанный — иначе
+        сценарий успели изменить, и пересчёт по старой версии не должен его затереть.
+        Возвращает число сохранённых сценариев.
+
+        Базовая реализация сверяет и сохраняет сценарии по одному, без общего
+        замка; хранилища переопределяют её, чтобы сверка и запись шли под замком записи.
+        """
+        saved = 0
+        for expected, scenario in updates:
+            if self.get_scenario(expected.id) == expected:
+                self.save_scenario(scenario)
+                saved += 1
+        return saved
+
+    def data_version(self) -> Optional[Hashable]:
+        """
+        Версия содержимого хранилища: меняется при любом сохранении
+        (в том числе другим процессом). Кэши производных данных сбрасываются
+        по её изменению; None — версия неизвестна, кэшировать нельзя.
+        """
+        return None
+
+    def data_modified_at(self) -> Optional[datetime]:
+        """Время последнего изменения содержимого (UTC, для Last-Modified); None — неизвестно."""
+        return None
+
+    def data_size_bytes(self) -> Optional[int]:
+        """Размер файлов хранилища на диске, байт (для метрик); None — неизвестен."""
+        return None
+
+    def count_scenarios(self) -> int:
+        """Число сохранённых сценариев; хранилища переопределяют, чтобы не строить список."""
+        return len(self.list_scenarios())
+
+    def scenario_columns(self) -> ScenarioColumns:
+        """
+        Входные данные всех сценариев колонками NumPy (для аналитики и пакетных расчётов).
+
+        Базовая реализация читает сценарии целиком; хранилища переопределяют её,
+        чтобы не разбирать JSON и не создавать модели.
+        """
+        return columns_from_records(scenario_to_record(s) for s in self.iter_scenario_details())
+
+    def close(self) -> None:
+        """Освобождает ресурсы (соединения, потоки); по умолчанию ничего не делает."""
@@ -0,0 +1,209 @@
+## src/storage/columnar_snapshot.py
+"""
+Столбцовый снимок JSON-хранилища на диске (рядом со scenarios.json).
+
+Файлы:
+- scenarios.columns.json — описание: подпись файлов хранилища, по состоянию
+  которых построены колонки, и имена файлов с массивами;
+- scenarios.columns.<поколение>.rows.npy / .ids.npy — массивы ScenarioColumns.
+
+Массивы каждого поколения пишутся в новые файлы, а описание подменяется
+атомарно последним, поэтому читатель (в том числе другой процесс) видит
+согласованную пару массивов. Снимок открывается через mmap (np.load с mmap_mode)
+и используется, только если подпись в описании совпадает с текущей подписью
+файлов хранилища; иначе колонки строятся заново.
+
+После собственных сохранений процесса колонки обновляются инкрементально:
+изменённые записи приходят через apply_commit (как в индекс) и применяются
+к уже построенным колонкам при следующем обращении, без разбора JSON.
+Файлы снимка при этом не переписываются (это O(N) записи на каждое обращение
+после сохранения): синхронно снимок пишется только после полной пересборки,
+а инкрементально обновлённые колонки сохраняет persist() — его вызывает
+уплотнение журнала в фоновом потоке.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import secrets
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.storage.base import FilesSignature, files_signature
+from src.storage.columns import COLUMNS_DTYPE, ScenarioColumns, columns_from_records
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS_SUFFIX = ".columns"
+COLUMNS_FORMAT = 1
+
+
+class ColumnarSnapshot:
+    """
+    Колонки входных данных сценариев JSON-хранилища с файлом-снимком.
+
+    snapshot_path — путь к scenarios.json (снимок колонок лежит рядом);
+    paths — файлы данных хранилища (их подпись определяет актуальность колонок);
+    source — подпись файлов и все записи хранилища (для полной пересборки).
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Callable[[], Path],
+        paths: Callable[[], List[Path]],
+        source: Callable[[], Tuple[Optional[FilesSignature], List[dict]]],
+    ) -> None:
+        self._snapshot_path = snapshot_path
+        self._paths = paths
+        self._source = source
+        self._lock = threading.Lock()
+        self._columns: Optional[ScenarioColumns] = None
+        self._signature: Optional[FilesSignature] = None
+        ## Записи, сохранённые после построения колонок (по id, последняя версия)
+        self._pending: Dict[str, dict] = {}
+        self._written: List[Path] = []
+        ## Подпись, по состоянию которой записан последний снимок на диске
+        self._persisted: Optional[FilesSignature] = None
+        ## Статистика: полные пересборки, инкрементальные обновления, загрузки снимка с диска,
+        ## записи снимка на диск
+        self.rebuilds = 0
+        self.updates = 0
+        self.loads = 0
+        self.writes = 0
+
+    @property
+    def meta_path(self) -> Path:
+        snapshot = self._snapshot_path()
+        return snapshot.with_name(snapshot.stem + COLUMNS_SUFFIX + ".json")
+
+    def columns(self) -> ScenarioColumns:
+        """Колонки, согласованные с текущим содержимым хранилища."""
+        signature = files_signature(self._paths())
+        with self._lock:
+            if self._columns is not None and self._signature == signature:
+                ## Снимок на диске не переписывается: это сделает persist() при уплотнении
+                return self._apply_pending()
+            columns = self._load(signature)
+            if columns is not None:
+                self._install(columns, signature)
+                self._persisted = signature
+                self.loads += 1
+                return columns
+
+        ## Пересборка — вне замка: source() ждёт завершения сохранений этого
+        ## процесса, а они вызывают apply_commit, которому нужен этот замок
+        signature, records = self._source()
+        columns = columns_from_records(records)
+        with self._lock:
+            self._install(columns, signature)
+            self.rebuilds += 1
+        self._write(columns, signature)
+        return columns
+
+    def persist(self) -> None:
+        """
+        Записывает колонки из памяти (с применёнными сохранениями) в новое поколение
+        снимка, если снимок на диске построен по другому состоянию хранилища.
+        """
+        with self._lock:
+            if self._columns is None or self._signature in (None, self._persisted):
+                return
+            columns = self._apply_pending()
+            signature = self._signature
+        self._write(columns, signature)
+
+    def apply_commit(self, records: List[dict], before: FilesSignature, after: FilesSignature) -> None:
+        """Запоминает сохранённые записи (семантика before/after — как у ScenarioIndex.apply_commit)."""
+        with self._lock:
+            if self._signature is None or self._signature != before:
+                return
+            for record in records:
+                self._pending[record["id"]] = record
+            self._signature = after
+
+    def invalidate(self) -> None:
+        """Сбрасывает колонки в памяти: следующее обращение загрузит снимок или пересоберёт их."""
+        with self._lock:
+            self._columns = None
+            self._signature = None
+            self._pending = {}
+
+    def _apply_pending(self) -> ScenarioColumns:
+        """Применяет к колонкам сохранённые записи (вызывается под self._lock)."""
+        if self._pending:
+            self._columns = self._columns.updated(self._pending.values())
+            self._pending = {}
+            self.updates += 1
+        return self._columns
+
+    def _install(self, columns: ScenarioColumns, signature: Optional[FilesSignature]) -> None:
+        self._columns = columns
+        self._signature = signature
+        self._pending = {}
+
+    def _load(self, signature: FilesSignature) -> Optional[ScenarioColumns]:
+        """
+        Открывает снимок через mmap, если он построен по состоянию signature
+        (вызывается под self._lock; файлы снимка удалятся при записи следующего поколения).
+        """
+        meta_path = self.meta_path
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("format") != COLUMNS_FORMAT:
+                return None
+            if tuple(tuple(item) for item in meta["signature"]) != signature:
+                return None
+            rows_path = meta_path.with_name(meta["rows"])
+            ids_path = meta_path.with_name(meta["ids"])
+            rows = np.load(rows_path, mmap_mode="r")
+            id_bytes = np.load(ids_path, mmap_mode="r")
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if rows.dtype != COLUMNS_DTYPE or id_bytes.dtype != np.uint8:
+            return None
+        self._written = [rows_path, ids_path]
+        return ScenarioColumns(rows, id_bytes)
+
+    def _write(self, columns: ScenarioColumns, signature: Optional[FilesSignature]) -> None:
+        """Записывает новое поколение снимка; ошибки записи не мешают работе (снимок — кэш)."""
+        if signature is None:
+            return
+        meta_path = self.meta_path
+        prefix = meta_path.stem + "." + secrets.token_hex(6)
+        rows_path = meta_path.with_name(prefix + ".rows.npy")
+        ids_path = meta_path.with_name(prefix + ".ids.npy")
+        meta = {
+            "format": COLUMNS_FORMAT,
+            "signature": signature,
+            "count": len(columns),
+            "rows": rows_path.name,
+            "ids": ids_path.name,
+        }
+        tmp_path = meta_path.with_name(meta_path.name + ".tmp." + secrets.token_hex(4))
+        try:
+            np.save(rows_path, columns.rows)
+            np.save(ids_path, columns.id_bytes)
+            tmp_path.write_text(json.dumps(meta), encoding="utf-8")
+            os.replace(tmp_path, meta_path)
+        except OSError:
+            logger.exception("Не удалось записать столбцовый снимок сценариев")
+            for path in (rows_path, ids_path, tmp_path):
+                path.unlink(missing_ok=True)
+            return
+
+        ## Файлы прежнего поколения больше не нужны (открытые mmap остаются действительными)
+        with self._lock:
+            previous, self._written = self._written, [rows_path, ids_path]
+            self._persisted = signature
+            self.writes += 1
+        for path in previous:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
@@ -0,0 +1,167 @@
+## src/storage/columns.py
+"""
+Столбцовое (columnar) представление входных данных сценариев.
+
+Для расчётов по множеству сохранённых сценариев (аналитика, пакетные
+расчёты) не нужны ни JSON, ни pydantic-модели — достаточно колонок чисел.
+ScenarioColumns хранит их одним структурированным массивом NumPy
+(строка = сценарий) и id сценариев — одним массивом байт UTF-8 со смещениями.
+Оба массива можно записать в .npy и открыть через mmap без копирования
+(см. columnar_snapshot.py).
+
+Графики (*_schedule) в колонки не входят: для таких сценариев выставлен
+has_schedules, и расчёт по ним должен брать полные входные данные.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.invest import SCHEDULE_FIELDS
+
+
+## Строка колонок: входные данные + границы id в массиве байт (id_start:id_end).
+## discount_rate_percent = NaN — ставка не задана.
+COLUMNS_DTYPE = np.dtype(
+    [
+        ("capex", "<f8"),
+        ("opex", "<f8"),
+        ("effects", "<f8"),
+        ("period_months", "<i8"),
+        ("discount_rate_percent", "<f8"),
+        ("has_schedules", "?"),
+        ("id_start", "<i8"),
+        ("id_end", "<i8"),
+    ]
+)
+
+## (id, capex, opex, effects, period_months, discount_rate_percent | None, has_schedules)
+InputRow = Tuple[str, float, float, float, int, Optional[float], bool]
+
+
+class ScenarioColumns:
+    """
+    Колонки входных данных сценариев.
+
+    rows — структурированный массив COLUMNS_DTYPE, id_bytes — id подряд (uint8).
+    Массивы могут быть открыты через mmap только для чтения: колонки
+    (capex, opex, ...) — представления (views) без копирования.
+    """
+
+    def __init__(self, rows: np.ndarray, id_bytes: np.ndarray) -> None:
+        self.rows = rows
+        self.id_bytes = id_bytes
+        self._ids: Optional[List[str]] = None
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return int(self.rows.shape[0])
+
+    @property
+    def capex(self) -> np.ndarray:
+        return self.rows["capex"]
+
+    @property
+    def opex(self) -> np.ndarray:
+        return self.rows["opex"]
+
+    @property
+    def effects(self) -> np.ndarray:
+        return self.rows["effects"]
+
+    @property
+    def period_months(self) -> np.ndarray:
+        return self.rows["period_months"]
+
+    @property
+    def discount_rate_percent(self) -> np.ndarray:
+        return self.rows["discount_rate_percent"]
+
+    @property
+    def has_schedules(self) -> np.ndarray:
+        return self.rows["has_schedules"]
+
+    @property
+    def ids(self) -> List[str]:
+        """id сценариев по строкам (декодируются при первом обращении)."""
+        if self._ids is None:
+            raw = self.id_bytes.tobytes()
+            self._ids = [
+                raw[start:end].decode("utf-8")
+                for start, end in zip(self.rows["id_start"].tolist(), self.rows["id_end"].tolist())
+            ]
+        return self._ids
+
+    def position(self, scenario_id: str) -> Optional[int]:
+        """Номер строки сценария или None."""
+        if self._positions is None:
+            self._positions = {scenario_id: idx for idx, scenario_id in enumerate(self.ids)}
+        return self._positions.get(scenario_id)
+
+    def updated(self, records: Iterable[dict]) -> "ScenarioColumns":
+        """
+        Новые колонки с учётом сохранённых записей (upsert по id):
+        строки известных сценариев заменяются, новые добавляются в конец.
+        """
+        rows = np.array(self.rows)
+        appended: List[InputRow] = []
+        for record in records:
+            row = input_row(record)
+            idx = self.position(row[0])
+            if idx is None:
+                appended.append(row)
+            else:
+                rows[idx] = _numeric(row) + (rows[idx]["id_start"], rows[idx]["id_end"])
+        if not appended:
+            return ScenarioColumns(rows, self.id_bytes)
+
+        tail = columns_from_rows(appended)
+        offset = self.id_bytes.shape[0]
+        tail.rows["id_start"] += offset
+        tail.rows["id_end"] += offset
+        return ScenarioColumns(
+            np.concatenate([rows, tail.rows]),
+            np.concatenate([np.asarray(self.id_bytes), tail.id_bytes]),
+        )
+
+
+def _numeric(row: InputRow) -> tuple:
+    _, capex, opex, effects, months, rate, has_schedules = row
+    return (capex, opex, effects, months, math.nan if rate is None else rate, has_schedules)
+
+
+def input_row(record: dict) -> InputRow:
+    """Строка колонок из записи сценария (формат хранилища, см. scenario_to_record)."""
+    data = record["input"]
+    rate = data.get("discount_rate_percent")
+    return (
+        str(record["id"]),
+        float(data["capex"]),
+        float(data["opex"]),
+        float(data["effects"]),
+        int(data["period_months"]),
+        None if rate is None else float(rate),
+        any(data.get(name) is not None for name in SCHEDULE_FIELDS),
+    )
+
+
+def columns_from_rows(rows: Iterable[InputRow]) -> ScenarioColumns:
+    """Колонки из строк (id, capex, opex, effects, period_months, ставка, has_schedules)."""
+    numeric = []
+    id_bytes = bytearray()
+    for row in rows:
+        start = len(id_bytes)
+        id_bytes += row[0].encode("utf-8")
+        numeric.append(_numeric(row) + (start, len(id_bytes)))
+    return ScenarioColumns(
+        np.array(numeric, dtype=COLUMNS_DTYPE),
+        np.frombuffer(bytes(id_bytes), dtype=np.uint8).copy(),
+    )
+
+
+def columns_from_records(records: Iterable[dict]) -> ScenarioColumns:
+    """Колонки из записей сценариев (в порядке записей)."""
+    return columns_from_rows(input_row(record) for record in records)
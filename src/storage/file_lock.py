@@ -0,0 +1,76 @@
+## src/storage/file_lock.py
+"""
+Межпроцессная блокировка через файл (fcntl.flock).
+
+Несколько воркеров uvicorn работают с одними и теми же файлами хранилища,
+поэтому запись и чтение согласуются блокировкой файла-замка:
+
+- exclusive — запись (дозапись журнала, подмена файлов при уплотнении);
+- shared — чтение (снимок + журналы читаются согласованно).
+
+flock действует и между потоками одного процесса (каждый захват открывает
+свой дескриптор), поэтому блокировка не реентерабельна — вложенные захваты
+одного и того же замка в одном потоке недопустимы.
+
+На платформах без fcntl (Windows) используется блокировка внутри процесса.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  ## pragma: no cover - Windows
+    fcntl = None
+
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(path: Path) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(str(path), threading.Lock())
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """
+    Захватывает замок path на время блока with.
+
+    При blocking=False не ждёт: если замок занят, в блок передаётся False
+    (и ничего не захвачено), иначе — True.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if fcntl is None:  ## pragma: no cover - Windows
+        lock = _local_lock(path)
+        acquired = lock.acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            mode |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, mode)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
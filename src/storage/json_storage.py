@@ -0,0 +1,173 @@
+## src/storage/json_storage.py
+"""
+JSON-хранилище сценариев (вариант по умолчанию, без СУБД).
+
+- снимок — data/scenarios.json (список сценариев);
+- журнал сохранений — scenarios.journal.jsonl с групповой фиксацией
+  и межпроцессными замками (см. scenario_journal.py, file_lock.py);
+- индекс в памяти — поиск по id и готовый отсортированный список (см. scenario_index.py);
+- столбцовый снимок входных данных (.npy, открывается через mmap) для аналитики;
+  после сохранений обновляется в памяти, на диск — при уплотнении журнала
+  (см. columnar_snapshot.py).
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Hashable, List, Optional, Tuple
+
+from src.core.config import settings
+from src.models.invest import ScenarioDetail, ScenarioListQuery, ScenarioPage, ScenarioShort
+from src.storage.base import (
+    FilesSignature,
+    ScenarioStorage,
+    files_signature,
+    parse_record,
+    record_matches,
+    scenario_to_record,
+    signature_modified_at,
+    signature_size,
+)
+from src.storage.columnar_snapshot import ColumnarSnapshot
+from src.storage.columns import ScenarioColumns
+from src.storage.scenario_index import ScenarioIndex
+from src.storage.scenario_journal import ScenarioJournal
+
+
+class JsonScenarioStorage(ScenarioStorage):
+    """
+    Сценарии в JSON-файле.
+
+    path — путь к scenarios.json; если не задан, используется
+    settings.SCENARIOS_FILE (читается при каждом обращении).
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self._path = path
+        self.index = ScenarioIndex(
+            load_raw=self.load_raw,
+            parse=parse_record,
+            paths=lambda: self.journal.paths(),
+            settle=lambda: self.journal.settle(),
+        )
+        self.journal = ScenarioJournal(
+            snapshot_path=lambda: self.path,
+            read_snapshot=self.load_snapshot,
+            write_snapshot=self.write_snapshot_file,
+            on_commit=self._on_commit,
+            invalidate=self._invalidate_caches,
+            lookup=self.index.records_at,
+            on_compact=lambda: self.columnar.persist(),
+        )
+        self.columnar = ColumnarSnapshot(
+            snapshot_path=lambda: self.path,
+            paths=lambda: self.journal.paths(),
+            source=self.index.snapshot,
+        )
+
+    @property
+    def path(self) -> Path:
+        return self._path or settings.SCENARIOS_FILE
+
+    def _on_commit(self, records: List[dict], before: FilesSignature, after: FilesSignature) -> None:
+        self.index.apply_commit(records, before, after)
+        self.columnar.apply_commit(records, before, after)
+
+    def _invalidate_caches(self) -> None:
+        self.index.invalidate()
+        self.columnar.invalidate()
+
+    def load_snapshot(self) -> List[dict]:
+        """
+        Считывает снимок сценариев из JSON-файла.
+
+        Формат файла:
+        [
+            {...сценарий 1...},
+            {...сценарий 2...}
+        ]
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            return []
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, list):
+                return []
+            return data
+        except json.JSONDecodeError:
+            return []
+
+    def write_snapshot_file(self, items: List[dict], path: Path) -> None:
+        """Записывает список сценариев в файл path в формате снимка (с fsync)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save_snapshot(self, items: List[dict]) -> None:
+        """
+        Сохраняет список сценариев в JSON-файл (снимок).
+
+        Файл пишется во временный и атомарно подменяется, поэтому
+        читатели никогда не видят частично записанный снимок.
+        """
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.write_snapshot_file(items, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def load_raw(self) -> List[dict]:
+        """Снимок scenarios.json + сохранения из журнала."""
+        return self.journal.load()
+
+    def list_scenarios(self) -> List[ScenarioShort]:
+        return self.index.list_short()
+
+    def list_scenarios_page(self, query: ScenarioListQuery) -> ScenarioPage:
+        return self.index.page(query)
+
+    def get_scenario(self, scenario_id: str) -> Optional[ScenarioDetail]:
+        return self.index.get(scenario_id)
+
+    def save_scenario(self, scenario: ScenarioDetail) -> None:
+        """
+        Дописывает запись в журнал (O(1), групповая фиксация с другими сохранениями);
+        полный файл пересобирается уплотнением.
+        """
+        self.journal.append(scenario_to_record(scenario))
+
+    def save_scenarios(self, scenarios: List[ScenarioDetail]) -> None:
+        """Все сценарии дописываются в журнал одной дозаписью с одним fsync."""
+        self.journal.append_many([scenario_to_record(scenario) for scenario in scenarios])
+
+    def save_scenarios_if_unchanged(self, updates: List[Tuple[ScenarioDetail, ScenarioDetail]]) -> int:
+        """Условие «сценарий не изменился» проверяет писатель журнала под замком записи."""
+        conditions = {
+            scenario.id: functools.partial(record_matches, expected) for expected, scenario in updates
+        }
+        return self.journal.append_many([scenario_to_record(scenario) for _, scenario in updates], conditions)
+
+    def data_version(self) -> Optional[Hashable]:
+        """Подпись файлов хранилища (снимок и журналы)."""
+        return files_signature(self.journal.paths())
+
+    def data_modified_at(self) -> Optional[datetime]:
+        return signature_modified_at(files_signature(self.journal.paths()))
+
+    def data_size_bytes(self) -> Optional[int]:
+        return signature_size(files_signature(self.journal.paths()))
+
+    def count_scenarios(self) -> int:
+        return self.index.count()
+
+    def scenario_columns(self) -> ScenarioColumns:
+        return self.columnar.columns()
+
+    def close(self) -> None:
+        self.journal.wait()
@@ -0,0 +1,215 @@
+## src/storage/scenario_index.py
+"""
+Индекс сценариев в памяти процесса (для JSON-хранилища).
+
+Раньше каждый запрос к сценариям перечитывал и заново валидировал весь
+scenarios.json. Индекс держит:
+
+- записи сценариев (dict, как в файле) по id — поиск за O(1);
+- краткие сведения (ScenarioShort) и отсортированный список ключей
+  (updated_at или created_at, id) — страница списка находится бинарным поиском.
+
+Файлы хранилища (снимок scenarios.json и журнал) перечитываются, только если
+изменились их mtime или размер (например, файл отредактировали вручную, записал
+другой процесс или завершилось уплотнение журнала).
+Собственные сохранения обновляют индекс на месте, без перечитывания (apply_commit).
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.core.tracing import span
+from src.models.invest import ScenarioDetail, ScenarioListQuery, ScenarioPage, ScenarioShort
+from src.storage.base import (
+    FilesSignature,
+    SortKey,
+    decode_cursor,
+    files_signature,
+    matches_query,
+    page_from_matches,
+    sort_key,
+)
+
+
+def _short(scenario: ScenarioDetail) -> ScenarioShort:
+    """Краткие сведения о сценарии для списка."""
+    return ScenarioShort(
+        id=scenario.id,
+        name=scenario.name,
+        created_at=scenario.created_at,
+        updated_at=scenario.updated_at,
+    )
+
+
+class ScenarioIndex:
+    """
+    Кэш содержимого хранилища сценариев.
+
+    load_raw — функция чтения списка записей из хранилища;
+    parse — преобразование записи в ScenarioDetail (None для некорректных записей);
+    paths — файлы хранилища, изменения которых делают индекс устаревшим;
+    settle — ожидание изменения файлов, начатого этим процессом (вместе с его
+    apply_commit): вызывается, когда файлы изменились, до перечитывания.
+    """
+
+    def __init__(
+        self,
+        load_raw: Callable[[], List[dict]],
+        parse: Callable[[dict], Optional[ScenarioDetail]],
+        paths: Callable[[], List[Path]],
+        settle: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._load_raw = load_raw
+        self._parse = parse
+        self._paths = paths
+        self._settle = settle
+        self._lock = threading.RLock()
+        self._signature: Optional[FilesSignature] = None
+        ## Записи в порядке файла (dict сохраняет порядок вставки)
+        self._records: Dict[str, dict] = {}
+        self._shorts: Dict[str, ScenarioShort] = {}
+        ## Ключи сортировки по возрастанию; список сценариев — обход с конца
+        self._order: List[SortKey] = []
+        self.reloads = 0
+
+    def _settle_changes(self) -> None:
+        """
+        Если файлы изменились, сначала дожидается завершения изменения этим процессом:
+        тогда индекс обновится через apply_commit, и перечитывать файлы не придётся.
+
+        Вызывается до захвата self._lock (apply_commit захватывает его сам).
+        """
+        if self._settle is not None and files_signature(self._paths()) != self._signature:
+            self._settle()
+
+    def _ensure_fresh(self) -> None:
+        """Перечитывает хранилище, если mtime/размер (или пути) файлов изменились."""
+        signature = files_signature(self._paths())
+        if signature == self._signature:
+            return
+
+        items = self._load_raw()
+        records: Dict[str, dict] = {}
+        shorts: Dict[str, ScenarioShort] = {}
+        with span("storage.index.parse", records=len(items)):
+            for item in items:
+                scenario = self._parse(item)
+                if scenario is None or scenario.id in records:
+                    continue
+                records[scenario.id] = item
+                shorts[scenario.id] = _short(scenario)
+
+        self._records = records
+        self._shorts = shorts
+        self._order = sorted(sort_key(short) for short in shorts.values())
+        ## Подпись снята до чтения: если файл менялся во время чтения, следующий вызов перечитает его
+        self._signature = signature
+        self.reloads += 1
+
+    def list_short(self) -> List[ScenarioShort]:
+        """Краткие сведения о сценариях, от последних изменённых к давним."""
+        self._settle_changes()
+        with self._lock:
+            self._ensure_fresh()
+            return [self._shorts[key[1]] for key in reversed(self._order)]
+
+    def count(self) -> int:
+        """Число сценариев в индексе."""
+        self._settle_changes()
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._shorts)
+
+    def page(self, query: ScenarioListQuery) -> ScenarioPage:
+        """
+        Страница списка: курсор и диапазон времени изменения задают границы
+        бинарным поиском, остальные фильтры проверяются при обходе этого отрезка.
+        """
+        after = decode_cursor(query.cursor) if query.cursor else None
+        self._settle_changes()
+        with self._lock:
+            self._ensure_fresh()
+            order = self._order
+            high = len(order)
+            if after is not None:
+                high = bisect.bisect_left(order, after)
+            if query.updated_to is not None:
+                high = min(high, bisect.bisect_right(order, query.updated_to, key=itemgetter(0)))
+            low = 0
+            if query.updated_from is not None:
+                low = bisect.bisect_left(order, query.updated_from, key=itemgetter(0))
+
+            matches: List[ScenarioShort] = []
+            for idx in range(high - 1, low - 1, -1):
+                short = self._shorts[order[idx][1]]
+                if matches_query(short, query):
+                    matches.append(short)
+                    if len(matches) > query.limit:
+                        break
+        return page_from_matches(matches, query.limit)
+
+    def get(self, scenario_id: str) -> Optional[ScenarioDetail]:
+        """Сценарий по id (новый объект при каждом вызове) или None."""
+        self._settle_changes()
+        with self._lock:
+            self._ensure_fresh()
+            record = self._records.get(scenario_id)
+        return None if record is None else self._parse(record)
+
+    def snapshot(self) -> Tuple[Optional[FilesSignature], List[dict]]:
+        """Подпись файлов, по которой актуален индекс, и записи всех сценариев (в порядке файла)."""
+        self._settle_changes()
+        with self._lock:
+            self._ensure_fresh()
+            return self._signature, list(self._records.values())
+
+    def records_at(self, signature: FilesSignature, ids: Set[str]) -> Optional[Dict[str, dict]]:
+        """
+        Записи сценариев ids, если индекс актуален на момент signature; иначе None.
+
+        Вызывается писателем журнала под замком записи, поэтому не ждёт ни файлов,
+        ни замка индекса: если индекс сейчас перечитывается, возвращает None.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self._signature != signature:
+                return None
+            return {scenario_id: self._records[scenario_id] for scenario_id in ids if scenario_id in self._records}
+        finally:
+            self._lock.release()
+
+    def apply_commit(self, records: List[dict], before: FilesSignature, after: FilesSignature) -> None:
+        """
+        Учитывает записи, только что зафиксированные в хранилище этим процессом.
+
+        before/after — подписи файлов до и после записи. Если индекс был актуален
+        на момент before, записи применяются на месте и индекс считается актуальным
+        на момент after. Иначе (файлы успел изменить другой процесс) индекс не трогается:
+        при следующем запросе он будет перечитан и так увидит эти записи.
+        """
+        with self._lock:
+            if self._signature != before:
+                return
+            for record in records:
+                scenario = self._parse(record)
+                if scenario is None:
+                    continue
+                previous = self._shorts.get(scenario.id)
+                if previous is not None:
+                    del self._order[bisect.bisect_left(self._order, sort_key(previous))]
+                short = _short(scenario)
+                bisect.insort(self._order, sort_key(short))
+                self._records[scenario.id] = record
+                self._shorts[scenario.id] = short
+            self._signature = after
+
+    def invalidate(self) -> None:
+        """Сбрасывает индекс: следующий запрос перечитает файл."""
+        with self._lock:
+            self._signature = None
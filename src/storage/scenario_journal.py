@@ -0,0 +1,431 @@
+## src/storage/scenario_journal.py
+"""
+Журнальное хранение сценариев (append-only JSONL + снимок).
+
+Раньше каждое сохранение перезаписывало весь scenarios.json (O(N) на запись).
+Теперь:
+
+- снимок — прежний scenarios.json (формат не меняется, старые файлы читаются как раньше);
+- журнал — scenarios.journal.jsonl рядом со снимком: по одной строке JSON
+  на каждое сохранение (upsert по id), запись дописывается и фиксируется fsync;
+- уплотнение (compaction) в фоновом потоке сворачивает журнал в новый снимок,
+  когда журнал превышает settings.SCENARIOS_JOURNAL_COMPACT_BYTES.
+
+Во время уплотнения журнал переименовывается в scenarios.journal.compacting.jsonl,
+а новые сохранения пишутся в свежий журнал; чтение учитывает все три файла.
+
+Несколько процессов (воркеров uvicorn) согласуются через файлы-замки
+(см. file_lock.py): scenarios.lock — запись/чтение, scenarios.compact.lock —
+не более одного уплотнения одновременно.
+
+Групповая фиксация (group commit): сохранения, пришедшие в течение
+settings.SCENARIOS_GROUP_COMMIT_WINDOW_MS, записываются фоновым потоком-писателем
+одной дозаписью с одним fsync; каждое сохранение возвращается только после
+того, как его запись надёжно легла на диск.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from src.core.config import settings
+from src.core.tracing import span
+from src.storage.base import FilesSignature, files_signature
+from src.storage.file_lock import file_lock
+
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+COMPACTING_SUFFIX = ".journal.compacting.jsonl"
+LOCK_SUFFIX = ".lock"
+COMPACT_LOCK_SUFFIX = ".compact.lock"
+
+## Обработчик фиксации: (записи, подпись файлов до записи, подпись после записи)
+CommitCallback = Callable[[List[dict], FilesSignature, FilesSignature], None]
+## Условие записи по id: (текущая запись сценария в хранилище или None) -> дописывать ли запись
+RecordCondition = Callable[[Optional[dict]], bool]
+## Поиск текущих записей по id в кэше, актуальном на момент подписи файлов (None — кэш не актуален)
+RecordsLookup = Callable[[FilesSignature, Set[str]], Optional[Dict[str, dict]]]
+
+
+def read_journal(path: Path) -> List[dict]:
+    """
+    Читает записи журнала.
+
+    Пустые строки пропускаются; оборванная при сбое последняя строка
+    (некорректный JSON) игнорируется.
+    """
+    records: List[dict] = []
+    try:
+        f = path.open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return records
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                records.append(record)
+    return records
+
+
+def apply_upserts(items: List[dict], records: List[dict]) -> List[dict]:
+    """
+    Применяет записи журнала к списку сценариев: запись с известным id
+    заменяет сценарий на его месте, с новым id — добавляется в конец.
+    """
+    positions = {}
+    for idx, item in enumerate(items):
+        positions.setdefault(item.get("id"), idx)
+
+    for record in records:
+        idx = positions.get(record.get("id"))
+        if idx is None:
+            positions[record.get("id")] = len(items)
+            items.append(record)
+        else:
+            items[idx] = record
+    return items
+
+
+class _Paths(NamedTuple):
+    """Файлы хранилища для одного снимка (фиксируются в момент сохранения)."""
+
+    snapshot: Path
+    compacting: Path
+    journal: Path
+    lock: Path
+    compact_lock: Path
+
+    @classmethod
+    def of(cls, snapshot: Path) -> "_Paths":
+        stem = snapshot.stem
+        return cls(
+            snapshot=snapshot,
+            compacting=snapshot.with_name(stem + COMPACTING_SUFFIX),
+            journal=snapshot.with_name(stem + JOURNAL_SUFFIX),
+            lock=snapshot.with_name(stem + LOCK_SUFFIX),
+            compact_lock=snapshot.with_name(stem + COMPACT_LOCK_SUFFIX),
+        )
+
+    @property
+    def data_files(self) -> List[Path]:
+        return [self.snapshot, self.compacting, self.journal]
+
+
+class ScenarioJournal:
+    """
+    Журнал сохранений сценариев рядом со снимком (scenarios.json).
+
+    snapshot_path — путь к снимку (вычисляется при каждом обращении);
+    read_snapshot — чтение снимка; write_snapshot — запись списка сценариев
+    в указанный файл (с fsync; подмену снимка выполняет уплотнение);
+    on_commit — вызывается после каждой фиксации группы записей, а также
+    (с пустым списком записей) после смены файлов при уплотнении;
+    invalidate — сброс кэшей в памяти, если on_commit завершился ошибкой
+    (данные к этому моменту уже записаны, поэтому сохранение считается успешным);
+    lookup — текущие записи по id из кэша в памяти для проверки условий записи
+    (см. append_many); если не задан или кэш устарел, файлы читаются под замком;
+    on_compact — вызывается после подмены снимка при уплотнении (в потоке уплотнения),
+    например чтобы сохранить производные снимки.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Callable[[], Path],
+        read_snapshot: Callable[[], List[dict]],
+        write_snapshot: Callable[[List[dict], Path], None],
+        on_commit: Optional[CommitCallback] = None,
+        invalidate: Optional[Callable[[], None]] = None,
+        lookup: Optional[RecordsLookup] = None,
+        on_compact: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._snapshot_path = snapshot_path
+        self._read_snapshot = read_snapshot
+        self._write_snapshot = write_snapshot
+        self._on_commit = on_commit
+        self._invalidate = invalidate
+        self._lookup = lookup
+        self._on_compact = on_compact
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[_Paths, List[dict], Optional[Dict[str, RecordCondition]], Future]]" = (
+            queue.Queue()
+        )
+        self._writer: Optional[threading.Thread] = None
+        ## Изменение файлов и уведомление о нём (on_commit) выполняются под этим замком,
+        ## чтобы уведомления приходили в порядке изменений
+        self._notify_order = threading.Lock()
+        ## Статистика групповой фиксации: число дозаписей (fsync) и записанных сохранений
+        self.commits = 0
+        self.committed_records = 0
+
+    def _paths(self) -> _Paths:
+        return _Paths.of(self._snapshot_path())
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self._paths().snapshot
+
+    @property
+    def journal_path(self) -> Path:
+        return self._paths().journal
+
+    @property
+    def compacting_path(self) -> Path:
+        return self._paths().compacting
+
+    def paths(self) -> List[Path]:
+        """Файлы данных хранилища (для отслеживания изменений индексом)."""
+        return self._paths().data_files
+
+    def load(self) -> List[dict]:
+        """Снимок + записи журнала (в том числе уплотняемого в данный момент)."""
+        paths = self._paths()
+        with span("storage.json.read", **{"file.path": str(paths.snapshot)}):
+            with file_lock(paths.lock, shared=True):
+                items = self._read_snapshot()
+                records = read_journal(paths.compacting) + read_journal(paths.journal)
+            return apply_upserts(items, records)
+
+    ## --- Запись (групповая фиксация) ---
+
+    def append(self, record: dict) -> None:
+        """
+        Сохраняет запись: ставит её в очередь потока-писателя и ждёт,
+        пока группа с этой записью будет дописана в журнал и зафиксирована fsync.
+        """
+        self.append_many([record])
+
+    def append_many(self, records: List[dict], conditions: Optional[Dict[str, RecordCondition]] = None) -> int:
+        """
+        Сохраняет несколько записей вместе: они попадают в одну группу
+        и дописываются в журнал одной дозаписью с одним fsync.
+
+        conditions — условия по id сценария: запись с условием дописывается, только
+        если условие выполняется для текущей записи сценария в хранилище; проверка
+        идёт под замком записи, с учётом записей, стоящих в группе раньше.
+        Возвращает число дописанных записей.
+        """
+        if not records:
+            return 0
+        with span("storage.json.append", records=len(records)):
+            done: Future = Future()
+            self._ensure_writer()
+            self._queue.put((self._paths(), list(records), conditions, done))
+            return done.result()
+
+    def _ensure_writer(self) -> None:
+        with self._thread_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_loop,
+                    name="scenario-journal-writer",
+                    daemon=True,
+                )
+                self._writer.start()
+
+    def _next_batch(self) -> List[Tuple[_Paths, List[dict], Future]]:
+        """Первая запись из очереди и все, что успели прийти за окно группировки."""
+        batch = [self._queue.get()]
+        window = settings.SCENARIOS_GROUP_COMMIT_WINDOW_MS / 1000.0
+        deadline = time.monotonic() + window
+        while len(batch) < settings.SCENARIOS_GROUP_COMMIT_MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _writer_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            groups: Dict[_Paths, List[Tuple[List[dict], Optional[Dict[str, RecordCondition]], Future]]] = {}
+            for paths, records, conditions, done in batch:
+                groups.setdefault(paths, []).append((records, conditions, done))
+
+            for paths, items in groups.items():
+                try:
+                    written = self._commit(paths, [(records, conditions) for records, conditions, _ in items])
+                except Exception as exc:
+                    for _, _, done in items:
+                        done.set_exception(exc)
+                else:
+                    for (_, _, done), count in zip(items, written):
+                        done.set_result(count)
+
+    def _commit(
+        self,
+        paths: _Paths,
+        items: List[Tuple[List[dict], Optional[Dict[str, RecordCondition]]]],
+    ) -> List[int]:
+        """
+        Одна дозапись с одним fsync для группы записей (под межпроцессным замком);
+        возвращает число дописанных записей каждого элемента группы.
+        """
+        with self._notify_order:
+            with file_lock(paths.lock):
+                before = files_signature(paths.data_files)
+                accepted = self._check_conditions(paths, before, items)
+                records = [record for batch in accepted for record in batch]
+                if not records:
+                    return [0] * len(items)
+                data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+                with paths.journal.open("ab+") as f:
+                    ## Если предыдущая запись оборвана сбоем, начинаем с новой строки,
+                    ## чтобы не склеить с ней новую запись
+                    if f.tell() > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            data = b"\n" + data
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    size = f.tell()
+                after = files_signature(paths.data_files)
+
+            self.commits += 1
+            self.committed_records += len(records)
+            ## Обработчик вызывается после снятия замка: индекс сам берёт замок на чтение
+            self._notify(records, before, after)
+
+        if size >= settings.SCENARIOS_JOURNAL_COMPACT_BYTES:
+            self.compact_in_background()
+        return [len(batch) for batch in accepted]
+
+    def _check_conditions(
+        self,
+        paths: _Paths,
+        before: FilesSignature,
+        items: List[Tuple[List[dict], Optional[Dict[str, RecordCondition]]]],
+    ) -> List[List[dict]]:
+        """Записи каждого элемента группы, прошедшие условия (вызывается под замком записи)."""
+        ids = {scenario_id for _, conditions in items if conditions for scenario_id in conditions}
+        if not ids:
+            return [records for records, _ in items]
+
+        current = self._current_records(paths, before, ids)
+        accepted = []
+        for records, conditions in items:
+            if conditions:
+                records = [
+                    record
+                    for record in records
+                    if record.get("id") not in conditions or conditions[record["id"]](current.get(record["id"]))
+                ]
+            ## Условия следующих элементов проверяются с учётом записей, стоящих раньше
+            for record in records:
+                if record.get("id") in ids:
+                    current[record["id"]] = record
+            accepted.append(records)
+        return accepted
+
+    def _current_records(self, paths: _Paths, before: FilesSignature, ids: Set[str]) -> Dict[str, dict]:
+        """Текущие записи сценариев ids: из кэша, если он актуален, иначе чтением файлов (замок уже взят)."""
+        if self._lookup is not None:
+            found = self._lookup(before, ids)
+            if found is not None:
+                return found
+        items = apply_upserts(self._read_snapshot(), read_journal(paths.compacting) + read_journal(paths.journal))
+        current: Dict[str, dict] = {}
+        for item in items:
+            if item.get("id") in ids:
+                current.setdefault(item["id"], item)
+        return current
+
+    ## --- Уплотнение ---
+
+    def compact(self) -> None:
+        """Сворачивает журнал в новый снимок (синхронно); пропускается, если уже идёт в другом процессе."""
+        paths = self._paths()
+        with file_lock(paths.compact_lock, blocking=False) as acquired:
+            if not acquired:
+                return
+            with self._notify_order:
+                with file_lock(paths.lock):
+                    before = files_signature(paths.data_files)
+                    if not paths.compacting.exists():
+                        if not paths.journal.exists():
+                            return
+                        paths.journal.replace(paths.compacting)
+                    after = files_signature(paths.data_files)
+                self._notify([], before, after)
+
+            ## Новый снимок пишется во временный файл вне замка, а подменяет старый
+            ## под замком вместе с удалением уплотняемого журнала: читатели видят
+            ## либо старый снимок с уплотняемым журналом, либо только новый снимок.
+            items = apply_upserts(self._read_snapshot(), read_journal(paths.compacting))
+            tmp_path = paths.snapshot.with_name(paths.snapshot.name + ".tmp")
+            self._write_snapshot(items, tmp_path)
+
+            with self._notify_order:
+                with file_lock(paths.lock):
+                    before = files_signature(paths.data_files)
+                    os.replace(tmp_path, paths.snapshot)
+                    paths.compacting.unlink(missing_ok=True)
+                    after = files_signature(paths.data_files)
+                ## Содержимое хранилища не изменилось: актуальный индекс остаётся актуальным
+                self._notify([], before, after)
+
+        if self._on_compact is not None:
+            try:
+                self._on_compact()
+            except Exception:
+                logger.exception("Ошибка обработчика уплотнения журнала сценариев")
+
+    def settle(self) -> None:
+        """Дожидается завершения начатого изменения файлов и уведомления о нём (on_commit)."""
+        with self._notify_order:
+            pass
+
+    def _notify(self, records: List[dict], before: FilesSignature, after: FilesSignature) -> None:
+        if self._on_commit is None:
+            return
+        try:
+            self._on_commit(records, before, after)
+        except Exception:
+            ## Файлы уже изменены (после fsync): ошибку обработчика не выдаём вызывающему
+            ## как ошибку сохранения, а сбрасываем кэши — они перечитают файлы
+            logger.exception("Ошибка обработчика фиксации журнала сценариев; кэши в памяти сброшены")
+            if self._invalidate is not None:
+                self._invalidate()
+
+    def _compact_safely(self) -> None:
+        try:
+            self.compact()
+        except OSError:
+            logger.exception("Не удалось уплотнить журнал сценариев")
+
+    def compact_in_background(self) -> None:
+        """Запускает уплотнение в фоновом потоке (если оно ещё не идёт)."""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._compact_safely,
+                name="scenario-journal-compaction",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Ожидает завершения фонового уплотнения (для тестов и остановки сервиса)."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
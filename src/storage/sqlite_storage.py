@@ -0,0 +1,296 @@
+## src/storage/sqlite_storage.py
+"""
+SQLite-хранилище сценариев (стандартный модуль sqlite3).
+
+Рассчитано на миллионы сценариев: в память ничего не загружается целиком.
+
+- режим WAL: чтение не блокируется записью;
+- версия хранилища — счётчик в таблице store_meta, увеличивается в транзакции
+  каждого сохранения (по нему строятся ETag и кэши производных данных);
+- индексы по id (первичный ключ), updated_at и ключу сортировки списка
+  (sort_at, id) — страница списка читается по индексу, без полного просмотра;
+- своё соединение на каждый поток (threading.local);
+- SQL-запросы — постоянные строки с параметрами, поэтому sqlite3
+  компилирует их один раз и берёт из кэша подготовленных выражений соединения.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Hashable, Iterator, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.tracing import span
+from src.models.invest import (
+    SCENARIOS_PAGE_MAX_LIMIT,
+    SCHEDULE_FIELDS,
+    ScenarioDetail,
+    ScenarioListQuery,
+    ScenarioPage,
+    ScenarioShort,
+)
+from src.storage.base import (
+    ScenarioStorage,
+    SortKey,
+    decode_cursor,
+    files_signature,
+    signature_modified_at,
+    signature_size,
+    page_from_matches,
+    parse_record,
+    record_matches,
+    scenario_to_record,
+)
+from src.storage.columns import ScenarioColumns, columns_from_rows
+
+
+## sort_at = COALESCE(updated_at, created_at) — ключ сортировки списка сценариев.
+## Даты хранятся строками ISO 8601 и сравниваются лексикографически.
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS scenarios (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT,
+        sort_at TEXT NOT NULL,
+        data TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_scenarios_updated_at ON scenarios (updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_scenarios_sort_at ON scenarios (sort_at, id)",
+    ## Одна строка: версия содержимого (см. data_version)
+    "CREATE TABLE IF NOT EXISTS store_meta (id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO store_meta (id, version) VALUES (0, 0)",
+)
+
+_SQL_LIST = "SELECT id, name, created_at, updated_at FROM scenarios ORDER BY sort_at DESC, id DESC"
+
+## Условия страницы списка (добавляются в WHERE только для заданных фильтров)
+_PAGE_CONDITIONS = (
+    ("cursor", "(sort_at, id) < (?, ?)"),
+    ("name_prefix", "substr(name, 1, ?) = ?"),
+    ("created_from", "created_at >= ?"),
+    ("created_to", "created_at <= ?"),
+    ("updated_from", "sort_at >= ?"),
+    ("updated_to", "sort_at <= ?"),
+)
+_SQL_GET = "SELECT data FROM scenarios WHERE id = ?"
+_SQL_COUNT = "SELECT COUNT(*) FROM scenarios"
+_SQL_VERSION = "SELECT version FROM store_meta WHERE id = 0"
+_SQL_BUMP_VERSION = "UPDATE store_meta SET version = version + 1 WHERE id = 0"
+## Колонки входных данных всех сценариев (json_extract выполняется внутри SQLite)
+_SQL_COLUMNS = (
+    "SELECT id, "
+    + ", ".join(
+        f"json_extract(data, '$.input.{name}')"
+        for name in ("capex", "opex", "effects", "period_months", "discount_rate_percent")
+    )
+    + ", "
+    + " OR ".join(f"json_extract(data, '$.input.{name}') IS NOT NULL" for name in SCHEDULE_FIELDS)
+    + " FROM scenarios ORDER BY rowid"
+)
+_SQL_UPSERT = """
+    INSERT INTO scenarios (id, name, created_at, updated_at, sort_at, data)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        created_at = excluded.created_at,
+        updated_at = excluded.updated_at,
+        sort_at = excluded.sort_at,
+        data = excluded.data
+"""
+
+## Размер кэша подготовленных выражений на соединение
+_STATEMENT_CACHE_SIZE = 128
+
+
+def _row(scenario: ScenarioDetail) -> tuple:
+    """Параметры _SQL_UPSERT для сценария."""
+    record = scenario_to_record(scenario)
+    return (
+        record["id"],
+        record["name"],
+        record["created_at"],
+        record["updated_at"],
+        record["updated_at"] or record["created_at"],
+        json.dumps(record, ensure_ascii=False),
+    )
+
+
+class SqliteScenarioStorage(ScenarioStorage):
+    """
+    Сценарии в базе SQLite.
+
+    path — путь к файлу базы; если не задан, используется settings.SCENARIOS_DB_FILE.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path or settings.SCENARIOS_DB_FILE)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = self._connection()
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (создаётся при первом обращении)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            ## check_same_thread=False только ради close() из другого потока:
+            ## запросы каждое соединение выполняет лишь в своём потоке
+            connection = sqlite3.connect(
+                self.path,
+                cached_statements=_STATEMENT_CACHE_SIZE,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def list_scenarios(self) -> List[ScenarioShort]:
+        rows = self._connection().execute(_SQL_LIST).fetchall()
+        return [
+            ScenarioShort(id=row[0], name=row[1], created_at=row[2], updated_at=row[3])
+            for row in rows
+        ]
+
+    def _page_rows(self, query: ScenarioListQuery, columns: str, after: Optional[SortKey] = None) -> list:
+        """
+        Строки страницы: диапазон по индексу (sort_at, id) и LIMIT limit + 1.
+
+        after — ключ, с которого продолжить (вместо query.cursor).
+        """
+        conditions: List[str] = []
+        params: list = []
+        for name, condition in _PAGE_CONDITIONS:
+            value = getattr(query, name)
+            if name == "cursor":
+                value = after or (decode_cursor(value) if value else None)
+            if not value:
+                continue
+            conditions.append(condition)
+            if name == "cursor":
+                params.extend((value[0].isoformat(), value[1]))
+            elif name == "name_prefix":
+                params.extend((len(value), value))
+            else:
+                params.append(value.isoformat())
+
+        sql = f"SELECT {columns} FROM scenarios"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY sort_at DESC, id DESC LIMIT ?"
+        params.append(query.limit + 1)
+        return self._connection().execute(sql, params).fetchall()
+
+    def list_scenarios_page(self, query: ScenarioListQuery) -> ScenarioPage:
+        with span("storage.sqlite.read", limit=query.limit):
+            rows = self._page_rows(query, "id, name, created_at, updated_at")
+        matches = [
+            ScenarioShort(id=row[0], name=row[1], created_at=row[2], updated_at=row[3])
+            for row in rows
+        ]
+        return page_from_matches(matches, query.limit)
+
+    def iter_scenario_details(self, query: Optional[ScenarioListQuery] = None) -> Iterator[ScenarioDetail]:
+        """Полные сценарии по одному: каждая страница — один запрос (sort_at, id, data)."""
+        query = query or ScenarioListQuery(limit=SCENARIOS_PAGE_MAX_LIMIT)
+        after: Optional[SortKey] = None
+        while True:
+            rows = self._page_rows(query, "sort_at, id, data", after)
+            for row in rows[: query.limit]:
+                scenario = parse_record(json.loads(row[2]))
+                if scenario is not None:
+                    yield scenario
+            if len(rows) <= query.limit:
+                return
+            last = rows[query.limit - 1]
+            after = (datetime.fromisoformat(last[0]), last[1])
+
+    def get_scenario(self, scenario_id: str) -> Optional[ScenarioDetail]:
+        with span("storage.sqlite.read"):
+            row = self._connection().execute(_SQL_GET, (scenario_id,)).fetchone()
+        if row is None:
+            return None
+        with span("storage.sqlite.parse"):
+            return parse_record(json.loads(row[0]))
+
+    def save_scenario(self, scenario: ScenarioDetail) -> None:
+        self.save_scenarios([scenario])
+
+    def save_scenarios(self, scenarios: List[ScenarioDetail]) -> None:
+        """Все сценарии сохраняются одной транзакцией (executemany) вместе с увеличением версии."""
+        rows = [_row(scenario) for scenario in scenarios]
+        if not rows:
+            return
+        connection = self._connection()
+        with span("storage.sqlite.write", records=len(rows)), connection:
+            connection.executemany(_SQL_UPSERT, rows)
+            connection.execute(_SQL_BUMP_VERSION)
+
+    def save_scenarios_if_unchanged(self, updates: List[Tuple[ScenarioDetail, ScenarioDetail]]) -> int:
+        """
+        Сверка и запись — в одной транзакции BEGIN IMMEDIATE: замок записи базы
+        берётся до чтения строк, поэтому между сверкой и записью сценарий
+        не может изменить ни другой поток, ни другой процесс.
+        """
+        connection = self._connection()
+        with span("storage.sqlite.write", records=len(updates)), connection:
+            connection.execute("BEGIN IMMEDIATE")
+            rows = []
+            for expected, scenario in updates:
+                row = connection.execute(_SQL_GET, (expected.id,)).fetchone()
+                if row is not None and record_matches(expected, json.loads(row[0])):
+                    rows.append(_row(scenario))
+            if rows:
+                connection.executemany(_SQL_UPSERT, rows)
+                connection.execute(_SQL_BUMP_VERSION)
+        return len(rows)
+
+    def data_version(self) -> Optional[Hashable]:
+        """
+        Счётчик store_meta.version: увеличивается в транзакции каждого сохранения
+        (в том числе другим процессом). Подпись файлов (mtime, размер) для версии
+        не годится: после контрольной точки WAL переписывается с начала, размеры
+        не меняются, и два сохранения в пределах разрешения mtime неразличимы.
+        """
+        return self._connection().execute(_SQL_VERSION).fetchone()[0]
+
+    def data_modified_at(self) -> Optional[datetime]:
+        return signature_modified_at(files_signature(self._data_files()))
+
+    def data_size_bytes(self) -> Optional[int]:
+        return signature_size(files_signature(self._data_files()))
+
+    def count_scenarios(self) -> int:
+        return self._connection().execute(_SQL_COUNT).fetchone()[0]
+
+    def _data_files(self) -> List[Path]:
+        return [self.path, self.path.with_name(self.path.name + "-wal")]
+
+    def scenario_columns(self) -> ScenarioColumns:
+        """Колонки читаются одним запросом: JSON разбирает SQLite, модели не создаются."""
+        rows = self._connection().execute(_SQL_COLUMNS)
+        return columns_from_rows(
+            (row[0], row[1], row[2], row[3], row[4], row[5], bool(row[6])) for row in rows
+        )
+
+    def close(self) -> None:
+        """Закрывает соединения всех потоков."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
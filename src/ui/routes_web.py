@@ -234,6 +234,12 @@ async def investcalc_form() -> str:
                 "ROI, %: <strong>" + (data.roi_percent ?? data.roi ?? "—") + "</strong><br>" +
                 "Срок окупаемости (мес.): <strong>" + (data.payback_months ?? "—") + "</strong><br>" +
                 "Срок окупаемости (лет): <strong>" + (data.payback_years ?? "—") + "</strong><br>" +
+                (data.npv !== null && data.npv !== undefined
+                    ? "NPV: <strong>" + data.npv + "</strong><br>" +
+                      "IRR, % годовых: <strong>" + (data.irr_percent ?? "—") + "</strong><br>" +
+                      "Дисконтированный срок окупаемости (мес.): <strong>" +
+                      (data.discounted_payback_months ?? "—") + "</strong><br>"
+                    : "") +
                 (data.note ? ("Комментарий: " + data.note) : "");
 
             setStatus("Расчёт выполнен успешно.");
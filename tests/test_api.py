@@ -1,12 +1,48 @@
 """Тесты HTTP-API InvestCalc (уровень FastAPI)."""
 
+import asyncio
+import email.utils
+import json
+import os
+import pstats
+import sqlite3
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 
-from src.main import app
+from src.api.v1 import routes_invest
+from src.core.config import settings
+from src.core.tracing import jsonl_exporter, trace_buffer
+from src.main import app, create_app
+from src.models.invest import InvestInput, MonteCarloRequest, ScenarioDetail, SensitivityGridRequest
 
 
 client = TestClient(app)
 
+BASE_INPUT = {"capex": 100_000, "opex": 20_000, "effects": 180_000, "period_months": 24}
+
+
+@pytest.fixture
+def save_scenario(tmp_data_dir):
+    """
+    Сохраняет сценарий через POST /api/v1/scenarios во временное хранилище (tmp_data_dir)
+    и возвращает отправленный payload; поля input можно переопределить.
+    """
+
+    def save(scenario_id: str, name: str, **input_data) -> dict:
+        payload = {
+            "id": scenario_id,
+            "name": name,
+            "created_at": "2025-12-02T12:00:00",
+            "input": {**BASE_INPUT, **input_data},
+        }
+        resp = client.post("/api/v1/scenarios", json=payload)
+        assert resp.status_code == 201, resp.text
+        return payload
+
+    return save
+
 
 def test_health_ok():
     """Эндпоинт /health должен возвращать статус ok."""
@@ -37,3 +73,452 @@ def test_calc_basic_endpoint():
     assert "payback_months" in data
     assert "payback_years" in data
     assert "note" in data
+
+
+def test_calc_batch_endpoint():
+    """Пакетный расчёт через POST /api/v1/calc/batch."""
+    payload = {
+        "capex": [100_000, 50_000],
+        "opex": [20_000, 60_000],
+        "effects": [180_000, 40_000],
+        "period_months": [24, 12],
+    }
+
+    resp = client.post("/api/v1/calc/batch", json=payload)
+    assert resp.status_code == 200, resp.text
+
+    data = resp.json()
+    assert data["count"] == 2
+    assert data["tco"] == [120_000.0, 110_000.0]
+    assert data["payback_months"][0] is not None
+    assert data["payback_months"][1] is None
+
+    single = client.post(
+        "/api/v1/calc",
+        json={"capex": 100_000, "opex": 20_000, "effects": 180_000, "period_months": 24},
+    ).json()
+    assert data["roi_percent"][0] == single["roi_percent"]
+    assert data["note"][0] == single["note"]
+
+
+def test_sensitivity_sweep_endpoint():
+    """Режим sweep через POST /api/v1/sensitivity возвращает колоночный ответ."""
+    payload = {
+        "base_input": {"capex": 100_000, "opex": 20_000, "effects": 180_000, "period_months": 24},
+        "parameters": ["capex", "effects"],
+        "deltas": [-20, 0, 20],
+    }
+
+    resp = client.post("/api/v1/sensitivity", json=payload)
+    assert resp.status_code == 200, resp.text
+
+    data = resp.json()
+    assert data["deltas"] == [-20.0, 0.0, 20.0]
+    assert [s["parameter"] for s in data["series"]] == ["capex", "effects"]
+    assert data["series"][0]["values"] == [80_000.0, 100_000.0, 120_000.0]
+    assert data["series"][0]["roi_percent"][1] == data["base_result"]["roi_percent"]
+
+
+def test_sensitivity_grid_endpoint():
+    """Двумерная таблица через POST /api/v1/sensitivity/grid (row-major)."""
+    payload = {
+        "base_input": {"capex": 100_000, "opex": 20_000, "effects": 180_000, "period_months": 24},
+        "rows": {"parameter": "capex", "values": [50_000, 100_000]},
+        "columns": {"parameter": "effects", "values": [0, 180_000, 360_000]},
+        "metric": "roi_percent",
+    }
+
+    resp = client.post("/api/v1/sensitivity/grid", json=payload)
+    assert resp.status_code == 200, resp.text
+
+    data = resp.json()
+    assert data["shape"] == [2, 3]
+    assert len(data["values"]) == 6
+    ## ячейка (1, 1) — базовый сценарий
+    base = client.post("/api/v1/calc", json=payload["base_input"]).json()
+    assert data["values"][1 * 3 + 1] == base["roi_percent"]
+
+
+def test_goal_seek_endpoint():
+    """POST /api/v1/goal-seek подбирает максимальный CAPEX под срок окупаемости."""
+    payload = {
+        "base_input": {
+            "project_name": "Goal seek",
+            "capex": 100_000,
+            "opex": 20_000,
+            "effects": 180_000,
+            "period_months": 24,
+        },
+        "solve_for": "capex",
+        "metric": "payback_months",
+        "target": 12,
+    }
+    resp = client.post("/api/v1/goal-seek", json=payload)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["status"] == "solved"
+    assert data["value"] == 80_000.0
+    assert data["result"]["payback_months"] == 12.0
+
+    resp = client.post("/api/v1/goal-seek/batch", json={"goals": [payload, payload]})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["value"] == [80_000.0, 80_000.0]
+
+
+def test_cache_stats_endpoint():
+    """GET /api/v1/cache/stats возвращает счётчики кэша."""
+    resp = client.get("/api/v1/cache/stats")
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    for key in ("enabled", "size", "max_size", "hits", "misses", "evictions", "hit_rate"):
+        assert key in data
+
+
+def test_scenarios_pagination_endpoint(save_scenario):
+    """GET /api/v1/scenarios отдаёт страницы и курсор следующей в X-Next-Cursor."""
+    for i in range(3):
+        save_scenario(f"page-{i}", f"Page {i}")
+
+    first = client.get("/api/v1/scenarios", params={"limit": 2})
+    assert first.status_code == 200, first.text
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/api/v1/scenarios", params={"limit": 2, "cursor": cursor})
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    ids = {item["id"] for item in first.json() + second.json()}
+    assert ids == {"page-0", "page-1", "page-2"}
+
+    assert client.get("/api/v1/scenarios", params={"cursor": "broken"}).status_code == 422
+    assert client.get("/api/v1/scenarios", params={"limit": 0}).status_code == 422
+
+
+def _max_loop_lag(make_call) -> float:
+    """Наибольшая задержка тиков цикла событий, пока выполняется корутина make_call()."""
+
+    async def measure() -> float:
+        loop = asyncio.get_running_loop()
+        lags = []
+        done = asyncio.Event()
+
+        async def ticker():
+            while not done.is_set():
+                started = loop.time()
+                await asyncio.sleep(0.01)
+                lags.append(loop.time() - started - 0.01)
+
+        task = asyncio.create_task(ticker())
+        await make_call()
+        done.set()
+        await task
+        return max(lags)
+
+    return asyncio.run(measure())
+
+
+def test_storage_calls_do_not_block_event_loop(monkeypatch):
+    """Медленное сохранение сценария выполняется в пуле потоков: цикл событий не простаивает."""
+
+    def slow_save(scenario):
+        time.sleep(0.3)
+        return scenario
+
+    monkeypatch.setattr(routes_invest, "save_scenario", slow_save)
+    scenario = ScenarioDetail(
+        id="slow",
+        name="Slow",
+        created_at="2025-12-02T12:00:00",
+        input=InvestInput(**BASE_INPUT),
+    )
+
+    assert _max_loop_lag(lambda: routes_invest.create_or_update_scenario(scenario)) < 0.1
+
+
+@pytest.mark.parametrize(
+    "service_name, handler_name",
+    [("run_monte_carlo", "monte_carlo_simulation"), ("run_sensitivity_grid", "sensitivity_grid")],
+)
+def test_heavy_calculations_do_not_block_event_loop(monkeypatch, service_name, handler_name):
+    """Monte Carlo и таблица чувствительности считаются в пуле расчётов, а не в цикле событий."""
+    real = getattr(routes_invest, service_name)
+
+    def slow(payload):
+        time.sleep(0.3)
+        return real(payload)
+
+    monkeypatch.setattr(routes_invest, service_name, slow)
+    if service_name == "run_monte_carlo":
+        payload = MonteCarloRequest(
+            base_input=BASE_INPUT,
+            distributions={"capex": {"kind": "uniform", "low": 80_000, "high": 120_000}},
+            n_samples=1000,
+            seed=1,
+        )
+    else:
+        payload = SensitivityGridRequest(
+            base_input=BASE_INPUT,
+            rows={"parameter": "capex", "values": [50_000, 100_000]},
+            columns={"parameter": "effects", "values": [0, 180_000]},
+        )
+    handler = getattr(routes_invest, handler_name)
+    assert _max_loop_lag(lambda: handler(payload)) < 0.1
+
+
+def test_scenarios_ndjson_stream_and_export(save_scenario):
+    """Accept: application/x-ndjson отдаёт список потоком; /scenarios/export — полные сценарии."""
+    for i in range(5):
+        save_scenario(f"stream-{i}", f"Stream {i}")
+
+    resp = client.get(
+        "/api/v1/scenarios",
+        params={"limit": 2},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert {item["id"] for item in lines} == {f"stream-{i}" for i in range(5)}
+    assert "input" not in lines[0]
+
+    resp = client.get("/api/v1/scenarios/export", params={"name_prefix": "Stream 3"})
+    assert resp.status_code == 200, resp.text
+    exported = [json.loads(line) for line in resp.text.splitlines()]
+    assert [item["id"] for item in exported] == ["stream-3"]
+    assert exported[0]["input"]["capex"] == 100_000
+
+    resp = client.get("/api/v1/scenarios/export", params={"cursor": "broken"})
+    assert resp.status_code == 422
+
+
+def test_scenarios_import_endpoint(tmp_data_dir):
+    """POST /scenarios/import: JSON-массив и NDJSON, ошибки по записям без прерывания импорта."""
+    valid = {"name": "Import 1", "input": BASE_INPUT}
+    invalid = {"id": "bad", "name": "Bad", "input": {"capex": -1, "opex": 0, "effects": 0, "period_months": 12}}
+
+    resp = client.post("/api/v1/scenarios/import", json=[valid, invalid])
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert (data["imported"], data["failed"]) == (1, 1)
+    assert data["errors"][0]["id"] == "bad"
+    assert client.get(f"/api/v1/scenarios/{data['ids'][0]}").json()["name"] == "Import 1"
+
+    body = "\n".join(json.dumps({**valid, "id": f"nd-{i}"}) for i in range(3)) + "\n"
+    resp = client.post(
+        "/api/v1/scenarios/import",
+        content=body.encode("utf-8"),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["ids"] == ["nd-0", "nd-1", "nd-2"]
+
+    resp = client.post("/api/v1/scenarios/import", json=42)
+    assert resp.status_code == 422
+
+
+def test_scenarios_recompute_endpoint(save_scenario):
+    """POST /scenarios/recompute: итог и потоковый ход пересчёта (NDJSON)."""
+    save_scenario("recompute-1", "Recompute")
+
+    resp = client.post("/api/v1/scenarios/recompute")
+    assert resp.status_code == 200, resp.text
+    assert (resp.json()["recomputed"], resp.json()["done"]) == (1, True)
+    last_result = client.get("/api/v1/scenarios/recompute-1").json()["last_result"]
+    assert last_result["formula_version"] == resp.json()["formula_version"]
+
+    resp = client.post("/api/v1/scenarios/recompute", headers={"Accept": "application/x-ndjson"})
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines[-1]["done"] and lines[-1]["skipped"] == 1
+
+
+def test_scenarios_analytics_endpoint(save_scenario):
+    """GET /analytics/scenarios: сводные показатели по хранилищу, параметры из query-строки."""
+    for i, (capex, effects) in enumerate(((100_000, 180_000), (300_000, 10_000))):
+        save_scenario(f"analytics-{i}", f"Analytics {i}", capex=capex, effects=effects)
+
+    resp = client.get("/api/v1/analytics/scenarios", params={"percentiles": [10, 90], "histogram_bins": 4})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert (data["count"], data["total_capex"], data["never_pay_back"]) == (2, 400_000, 1)
+    assert data["percentiles"] == [10, 90] and len(data["roi_percent"]["percentiles"]) == 2
+    assert len(data["payback_histogram"]["counts"]) == 4
+
+    assert client.get("/api/v1/analytics/scenarios", params={"percentiles": [120]}).status_code == 422
+
+
+def _set_store_mtime(data_dir, mtime: float) -> None:
+    """Время изменения всех файлов хранилища (для проверки Last-Modified без ожидания)."""
+    for path in data_dir.iterdir():
+        os.utime(path, (mtime, mtime))
+
+
+def test_scenarios_conditional_get(tmp_data_dir, save_scenario):
+    """ETag/Last-Modified: 304 на неизменённое хранилище, новый ETag после сохранения."""
+    payload = save_scenario("etag-1", "ETag")
+    _set_store_mtime(tmp_data_dir, time.time() - 60)
+
+    resp = client.get("/api/v1/scenarios/etag-1")
+    assert resp.status_code == 200, resp.text
+    etag, last_modified = resp.headers["etag"], resp.headers["last-modified"]
+
+    resp = client.get("/api/v1/scenarios/etag-1", headers={"If-None-Match": etag})
+    assert resp.status_code == 304 and resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert client.get("/api/v1/scenarios/etag-1", headers={"If-Modified-Since": last_modified}).status_code == 304
+    ## ETag зависит от запроса: другой ресурс с тем же ETag не совпадает
+    assert client.get("/api/v1/scenarios", headers={"If-None-Match": etag}).status_code == 200
+    ## If-None-Match: * совпадает только с существующим сценарием
+    assert client.get("/api/v1/scenarios/etag-1", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/api/v1/scenarios/missing", headers={"If-None-Match": "*"}).status_code == 404
+
+    list_etag = client.get("/api/v1/scenarios").headers["etag"]
+    assert client.get("/api/v1/scenarios", headers={"If-None-Match": list_etag}).status_code == 304
+    assert client.get("/api/v1/scenarios/export", headers={"If-None-Match": list_etag}).status_code == 200
+
+    assert client.post("/api/v1/scenarios", json={**payload, "name": "ETag changed"}).status_code == 201
+    resp = client.get("/api/v1/scenarios/etag-1", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["name"] == "ETag changed"
+    assert resp.headers["etag"] != etag
+    assert client.get("/api/v1/scenarios", headers={"If-None-Match": list_etag}).status_code == 200
+
+    ## Секунда изменения ещё не закончилась: следующее изменение в ту же секунду
+    ## неотличимо по Last-Modified, поэтому он не выдаётся, а If-Modified-Since не учитывается
+    modified = time.time() + 30
+    _set_store_mtime(tmp_data_dir, modified)
+    resp = client.get("/api/v1/scenarios/etag-1", headers={"If-Modified-Since": email.utils.formatdate(modified, usegmt=True)})
+    assert resp.status_code == 200 and "last-modified" not in resp.headers
+    assert client.get("/api/v1/scenarios/etag-1", headers={"If-None-Match": resp.headers["etag"]}).status_code == 304
+
+
+def test_sqlite_etag_changes_with_pinned_file_signature(tmp_data_dir, save_scenario, monkeypatch):
+    """SQLite: ETag строится по счётчику версий, а не по mtime/размеру файлов базы."""
+    db_file = tmp_data_dir / "scenarios.sqlite3"
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "SCENARIOS_DB_FILE", db_file)
+    pinned = time.time() - 60
+
+    def save_with_same_signature(name: str) -> str:
+        ## После контрольной точки WAL пуст, размер базы прежний, mtime закреплён —
+        ## подпись файлов у двух сохранений одинаковая
+        save_scenario("sqlite-etag", name)
+        with sqlite3.connect(db_file) as connection:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        _set_store_mtime(tmp_data_dir, pinned)
+        return client.get("/api/v1/scenarios/sqlite-etag").headers["etag"]
+
+    first = save_with_same_signature("Name A")
+    second = save_with_same_signature("Name B")
+    assert first != second
+    assert client.get("/api/v1/scenarios/sqlite-etag", headers={"If-None-Match": first}).status_code == 200
+    assert client.get("/api/v1/scenarios/sqlite-etag", headers={"If-None-Match": second}).status_code == 304
+
+
+def test_fast_responses_match_default(tmp_data_dir):
+    """create_app(fast_responses=True): тот же JSON и заголовки, gzip для больших ответов."""
+    fast = TestClient(create_app(fast_responses=True))
+    payload = {"id": "fast-1", "name": "Fast", "created_at": "2025-12-02T12:00:00", "input": BASE_INPUT}
+    resp = fast.post("/api/v1/scenarios", json=payload)
+    assert resp.status_code == 201 and resp.json() == client.get("/api/v1/scenarios/fast-1").json()
+    assert fast.post("/api/v1/scenarios", json={**payload, "id": "fast-2"}).status_code == 201
+
+    resp = fast.get("/api/v1/scenarios", params={"limit": 1})
+    default = client.get("/api/v1/scenarios", params={"limit": 1})
+    assert resp.json() == default.json()
+    assert resp.headers["X-Next-Cursor"] == default.headers["X-Next-Cursor"]
+    assert resp.headers["etag"] == default.headers["etag"]
+    assert fast.get("/api/v1/scenarios/missing").status_code == 404
+
+    sensitivity = {
+        "base_input": payload["input"],
+        "parameters": ["capex", "opex", "effects"],
+        "delta_range": {"start": -50, "stop": 50, "step": 1},
+    }
+    resp = fast.post("/api/v1/sensitivity", json=sensitivity)
+    assert resp.status_code == 200 and resp.json() == client.post("/api/v1/sensitivity", json=sensitivity).json()
+    assert resp.headers["content-encoding"] == "gzip"
+    assert fast.post("/api/v1/sensitivity", json={**sensitivity, "parameters": []}).status_code == 422
+
+
+def test_metrics_endpoint(save_scenario):
+    """GET /metrics: гистограммы по шаблону маршрута и классу статуса, счётчики операций и хранилища."""
+    save_scenario("metrics-1", "Metrics")
+    assert client.get("/api/v1/scenarios/metrics-1").status_code == 200
+    assert client.get("/api/v1/scenarios/missing").status_code == 404
+    assert client.post("/api/v1/calc", json=BASE_INPUT).status_code == 200
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = resp.text.splitlines()
+    route = 'method="GET",route="/api/v1/scenarios/{scenario_id}"'
+    assert any(line.startswith("investcalc_http_request_duration_seconds_count{" + route + ',status="2xx"}') for line in lines)
+    assert any(line.startswith("investcalc_http_request_duration_seconds_count{" + route + ',status="4xx"}') for line in lines)
+    assert any('le="+Inf"' in line and route in line for line in lines)
+    for operation in ("calculate_metrics", "storage_load", "storage_save"):
+        assert any(f'operation_duration_seconds_count{{operation="{operation}"}}' in line for line in lines)
+    assert 'investcalc_scenarios{backend="json"} 1' in lines
+    assert any(line.startswith("investcalc_storage_size_bytes") for line in lines)
+
+
+def test_request_profiling(tmp_data_dir, monkeypatch):
+    """Заголовок X-Profile при PROFILING_ENABLED: pstats + collapsed stacks в DATA_DIR/profiles."""
+    sensitivity = {"base_input": BASE_INPUT}
+    resp = client.post("/api/v1/sensitivity", json=sensitivity, headers={"X-Profile": "1"})
+    assert resp.status_code == 200 and "x-profile-id" not in resp.headers
+    assert client.get("/api/v1/debug/profiles").status_code == 404
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    assert "x-profile-id" not in client.post("/api/v1/sensitivity", json=sensitivity).headers
+    resp = client.get("/api/v1/scenarios", headers={"X-Profile": "1"})
+    assert resp.status_code == 200
+    profile_id = resp.headers["x-profile-id"]
+
+    profiles = client.get("/api/v1/debug/profiles").json()
+    assert [(p["id"], p["path"], p["status"]) for p in profiles] == [(profile_id, "/api/v1/scenarios", 200)]
+
+    resp = client.get(f"/api/v1/debug/profiles/{profile_id}/pstats")
+    assert resp.status_code == 200
+    path = tmp_data_dir / "profiles" / f"{profile_id}.pstats"
+    assert path.read_bytes() == resp.content
+    ## Операция хранилища из пула потоков попадает в общий профиль
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "list_scenarios_page" in functions
+
+    resp = client.get(f"/api/v1/debug/profiles/{profile_id}/collapsed")
+    assert resp.status_code == 200
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in resp.text.splitlines())
+
+    assert client.get(f"/api/v1/debug/profiles/{profile_id}/meta").status_code == 404
+    assert client.get("/api/v1/debug/profiles/..%2F..%2Fsecret/pstats").status_code == 404
+
+
+def test_request_tracing(tmp_data_dir, save_scenario, monkeypatch):
+    """Спаны API → сервис → хранилище, самые долгие трассы и экспорт спанов в JSONL."""
+    ## По умолчанию эндпоинт трасс выключен
+    assert client.get("/api/v1/debug/traces/slowest").status_code == 404
+    monkeypatch.setattr(settings, "TRACING_DEBUG_ENDPOINT_ENABLED", True)
+    trace_buffer.clear()
+    export_file = tmp_data_dir / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACING_EXPORT_FILE", export_file)
+
+    save_scenario("trace-1", "Trace")
+    assert client.get("/api/v1/scenarios/trace-1").status_code == 200
+
+    traces = client.get("/api/v1/debug/traces/slowest", params={"limit": 5}).json()
+    assert {trace["name"] for trace in traces} == {"POST /api/v1/scenarios", "GET /api/v1/scenarios/{scenario_id}"}
+    assert traces[0]["duration_ms"] >= traces[1]["duration_ms"]
+
+    save = next(trace for trace in traces if trace["name"] == "POST /api/v1/scenarios")
+    spans = {span["name"]: span for span in save["spans"]}
+    for name in ("api.validate", "api.handler", "service.save_scenario", "storage.json.append", "api.serialize"):
+        assert name in spans
+    ## Вложенность: хранилище → сервис → обработчик → корень
+    assert spans["storage.json.append"]["parent_span_id"] == spans["service.save_scenario"]["span_id"]
+    assert spans["service.save_scenario"]["parent_span_id"] == spans["api.handler"]["span_id"]
+    assert spans["api.handler"]["parent_span_id"] == save["spans"][0]["span_id"]
+
+    jsonl_exporter.flush()
+    exported = [json.loads(line) for line in export_file.read_text(encoding="utf-8").splitlines()]
+    ## В файле есть и трасса самого запроса /debug/traces/slowest
+    assert {trace["trace_id"] for trace in traces} <= {item["traceId"] for item in exported}
+    assert all(item["endTimeUnixNano"] >= item["startTimeUnixNano"] for item in exported)
@@ -0,0 +1,81 @@
+"""Тесты кэша результатов расчётов (LRU + TTL)."""
+
+import pytest
+
+from src.core.config import settings
+from src.models.invest import GoalSeekRequest, InvestInput, SensitivityRequest
+from src.services import invest_service
+from src.services.cache import ResultCache, result_cache
+from src.services.invest_service import calculate_metrics, run_goal_seek, run_sensitivity
+
+
+BASE = dict(project_name="Cache", capex=100_000, opex=20_000, effects=180_000, period_months=24)
+
+
+@pytest.fixture
+def clean_cache(monkeypatch):
+    """Пустой включённый кэш на время теста."""
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    result_cache.clear()
+    yield result_cache
+    result_cache.clear()
+
+
+def test_cached_result_is_byte_identical(clean_cache):
+    """Повторный расчёт берётся из кэша и совпадает со свежим побайтно."""
+    first = calculate_metrics(InvestInput(**BASE))
+    second = calculate_metrics(InvestInput(**BASE))
+    assert clean_cache.hits == 1 and clean_cache.misses == 1
+    assert second.model_dump_json() == first.model_dump_json()
+
+    ## Изменение возвращённого объекта не портит кэш
+    second.note = "changed"
+    assert calculate_metrics(InvestInput(**BASE)).model_dump_json() == first.model_dump_json()
+
+    request = SensitivityRequest(base_input=InvestInput(**BASE))
+    assert run_sensitivity(request).model_dump_json() == run_sensitivity(request).model_dump_json()
+    assert clean_cache.hits == 3
+
+
+def test_cache_disabled(clean_cache, monkeypatch):
+    """При выключенном кэше расчёт выполняется всегда, счётчики не меняются."""
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+    calls = []
+    original = invest_service._calculate_tco
+    monkeypatch.setattr(invest_service, "_calculate_tco", lambda data: calls.append(1) or original(data))
+
+    calculate_metrics(InvestInput(**BASE))
+    calculate_metrics(InvestInput(**BASE))
+    assert len(calls) == 2
+    assert clean_cache.stats()["size"] == 0
+    assert clean_cache.hits == clean_cache.misses == 0
+
+
+def test_internal_bulk_paths_bypass_cache(clean_cache):
+    """Пересчёт сценариев и подбор параметра не заполняют пользовательский кэш calculate_metrics()."""
+    scheduled = InvestInput(**{**BASE, "period_months": 2}, capex_schedule=[60_000, 40_000])
+    results = invest_service._recompute_results([InvestInput(**BASE), scheduled])
+    assert results == [invest_service._calculate_metrics(InvestInput(**BASE)), invest_service._calculate_metrics(scheduled)]
+
+    run_goal_seek(GoalSeekRequest(base_input=InvestInput(**BASE), solve_for="capex", metric="payback_months", target=12))
+    assert clean_cache.stats()["size"] == 0
+    assert clean_cache.hits == clean_cache.misses == 0
+
+
+def test_lru_and_ttl_eviction():
+    """Вытеснение самых давних записей и истечение TTL."""
+    now = [0.0]
+    cache = ResultCache(max_size=2, ttl_seconds=10, clock=lambda: now[0])
+    a, b, c = (InvestInput(**{**BASE, "capex": v}) for v in (1, 2, 3))
+
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.get("a") == a  ## "a" становится самой свежей
+    cache.put("c", c)
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+
+    now[0] = 10.0
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.stats()["size"] == 1
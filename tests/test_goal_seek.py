@@ -0,0 +1,84 @@
+"""Тесты подбора параметра под целевое значение показателя (goal seek)."""
+
+from src.models.invest import GoalSeekBatchRequest, GoalSeekRequest, InvestInput
+from src.services.invest_service import GOAL_NOT_DEPENDENT, run_goal_seek, run_goal_seek_batch
+
+
+BASE = InvestInput(
+    project_name="Goal seek",
+    capex=100_000,
+    opex=20_000,
+    effects=180_000,
+    period_months=24,
+    discount_rate_percent=10,
+)
+
+
+def test_goal_seek_max_capex_for_payback():
+    """Максимальный CAPEX, при котором проект окупается за 12 месяцев."""
+    result = run_goal_seek(
+        GoalSeekRequest(base_input=BASE, solve_for="capex", metric="payback_months", target=12)
+    )
+    assert result.status == "solved"
+    assert result.method == "closed_form"
+    assert result.value == 80_000.0
+    assert result.achieved == 12.0
+    assert result.result is not None
+    assert result.result.payback_months == 12.0
+
+
+def test_goal_seek_closed_form_hits_target():
+    """Аналитическое решение даёт цель с точностью до округления до копеек."""
+    for solve_for in ("capex", "opex", "effects"):
+        for metric, target in (("roi_percent", 30.0), ("npv", 10_000.0)):
+            result = run_goal_seek(
+                GoalSeekRequest(base_input=BASE, solve_for=solve_for, metric=metric, target=target)
+            )
+            assert result.status == "solved", (solve_for, metric, result.message)
+            assert abs(result.achieved - target) <= 0.02
+
+
+def test_goal_seek_period_for_npv_uses_bisection():
+    """Максимальный период растягивания эффектов, при котором NPV ещё достигает цели."""
+    result = run_goal_seek(
+        GoalSeekRequest(base_input=BASE, solve_for="period_months", metric="npv", target=10_000)
+    )
+    assert result.status == "solved"
+    assert result.method == "bisection"
+
+    months = int(result.value)
+    assert result.achieved >= 10_000
+    longer = run_goal_seek(
+        GoalSeekRequest(
+            base_input=BASE.model_copy(update={"period_months": months + 1}),
+            solve_for="capex",
+            metric="npv",
+            target=10_000,
+        )
+    )
+    ## На месяц дольше найденного периода тот же CAPEX уже не обеспечивает цель
+    assert longer.value < BASE.capex
+
+
+def test_goal_seek_infeasible():
+    """Недостижимые цели возвращаются со статусом infeasible и пояснением."""
+    batch = run_goal_seek_batch(
+        GoalSeekBatchRequest(
+            goals=[
+                GoalSeekRequest(base_input=BASE, solve_for="period_months", metric="roi_percent", target=30),
+                GoalSeekRequest(base_input=BASE, solve_for="opex", metric="payback_months", target=12),
+                GoalSeekRequest(
+                    base_input=BASE.model_copy(update={"discount_rate_percent": None}),
+                    solve_for="capex",
+                    metric="npv",
+                    target=0,
+                ),
+                GoalSeekRequest(base_input=BASE, solve_for="effects", metric="roi_percent", target=30),
+            ]
+        )
+    )
+    assert batch.count == 4
+    assert batch.status == ["infeasible", "infeasible", "infeasible", "solved"]
+    assert batch.message[0] == GOAL_NOT_DEPENDENT
+    assert batch.value[:3] == [None, None, None]
+    assert batch.value[3] == 156_000.0
@@ -0,0 +1,98 @@
+"""Тесты имитационного моделирования (Monte Carlo)."""
+
+import pytest
+from pydantic import ValidationError
+
+from src.core.config import settings
+from src.models.invest import InvestInput, MonteCarloRequest
+from src.services import invest_service
+from src.services.invest_service import calculate_metrics, run_monte_carlo, shutdown_monte_carlo_pool
+
+
+def _make_base_input() -> InvestInput:
+    return InvestInput(
+        project_name="Monte Carlo base",
+        capex=100_000,
+        opex=20_000,
+        effects=180_000,
+        period_months=24,
+        discount_rate_percent=None,
+    )
+
+
+def test_monte_carlo_is_reproducible_with_seed():
+    """При одинаковом seed результат полностью повторяется."""
+    req = MonteCarloRequest(
+        base_input=_make_base_input(),
+        distributions={
+            "effects": {"kind": "triangular", "low": 100_000, "mode": 180_000, "high": 220_000},
+            "capex": {"kind": "lognormal", "mean": 100_000, "std": 20_000},
+            "period_months": {"kind": "uniform", "low": 12, "high": 36},
+        },
+        n_samples=20_000,
+        seed=123,
+        histogram_bins=20,
+    )
+
+    first = run_monte_carlo(req)
+    second = run_monte_carlo(req)
+
+    assert first == second
+    assert first.seed == 123
+    assert len(first.roi_percent.percentiles) == len(req.percentiles)
+    assert sum(first.roi_histogram.counts) == req.n_samples
+    assert 0.0 <= first.probability_payback_within_period <= 1.0
+
+
+def test_monte_carlo_degenerate_distribution_matches_point_estimate(monkeypatch):
+    """Распределение с нулевым разбросом даёт точечную оценку calculate_metrics()."""
+    monkeypatch.setattr(settings, "MONTE_CARLO_CHUNK_SIZE", 300)
+    base = _make_base_input()
+    req = MonteCarloRequest(
+        base_input=base,
+        distributions={"opex": {"kind": "normal", "mean": 20_000, "std": 0}},
+        n_samples=1_000,
+        seed=1,
+    )
+
+    result = run_monte_carlo(req)
+    expected = calculate_metrics(base)
+
+    assert result.tco.mean == expected.tco
+    assert result.roi_percent.percentiles[3] == expected.roi_percent
+    assert result.payback_months.min == expected.payback_months
+    assert result.probability_payback_within_period == 1.0
+
+
+def test_monte_carlo_process_pool_matches_single_process(monkeypatch):
+    """При MONTE_CARLO_WORKERS = 2 (пул процессов) результат с тем же seed совпадает с расчётом в одном процессе."""
+    monkeypatch.setattr(settings, "MONTE_CARLO_CHUNK_SIZE", 2_500)
+    req = MonteCarloRequest(
+        base_input=_make_base_input(),
+        distributions={
+            "effects": {"kind": "normal", "mean": 180_000, "std": 30_000},
+            "period_months": {"kind": "triangular", "low": 12, "mode": 24, "high": 48},
+        },
+        n_samples=10_000,
+        seed=7,
+    )
+    single = run_monte_carlo(req)
+
+    monkeypatch.setattr(settings, "MONTE_CARLO_WORKERS", 2)
+    try:
+        pooled = run_monte_carlo(req)
+        assert invest_service._monte_carlo_pool is not None
+    finally:
+        shutdown_monte_carlo_pool()
+
+    assert invest_service._monte_carlo_pool is None
+    assert pooled == single
+
+
+def test_distribution_validation():
+    """Для распределения обязательны его параметры."""
+    with pytest.raises(ValidationError):
+        MonteCarloRequest(
+            base_input=_make_base_input(),
+            distributions={"capex": {"kind": "triangular", "low": 1, "high": 2}},
+        )
@@ -1,9 +1,31 @@
 """Тесты работы со сценариями InvestCalc (JSON-хранилище)."""
 
-from datetime import datetime
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
 
-from src.models.invest import InvestInput, ScenarioDetail
+import numpy as np
+import pytest
+
+from src import cli
+from src.core.config import settings
+from src.models.invest import InvestInput, ScenarioDetail, ScenarioListQuery
+from src.services import invest_service
 from src.services.invest_service import InvestService
+from src.storage import JsonScenarioStorage, ScenarioStorage, SqliteScenarioStorage, get_storage
+
+
+@pytest.fixture(params=[JsonScenarioStorage, SqliteScenarioStorage], ids=["json", "sqlite"])
+def storage(request, tmp_path):
+    """Пустое хранилище сценариев каждого вида во временной папке (закрывается после теста)."""
+    backend = request.param
+    instance = backend(tmp_path / ("scenarios.json" if backend is JsonScenarioStorage else "scenarios.sqlite3"))
+    yield instance
+    instance.close()
 
 
 def test_scenario_crud_in_tmp_dir(tmp_data_dir):
@@ -51,3 +73,482 @@ def test_scenario_crud_in_tmp_dir(tmp_data_dir):
     assert loaded is not None
     assert loaded.name == "Первый сценарий"
     assert loaded.input.project_name == "Scenario 1"
+
+
+def test_scenario_schedules_are_stored_packed(tmp_data_dir):
+    """Помесячные графики хранятся в scenarios.json упакованными и читаются обратно."""
+    service = InvestService()
+    schedule = [0.0] * 6 + [10_000.0] * 18
+    scenario = ScenarioDetail(
+        id="with-schedule",
+        name="График эффектов",
+        created_at=datetime.utcnow(),
+        input=InvestInput(
+            capex=100_000,
+            opex=24_000,
+            effects=180_000,
+            period_months=24,
+            effects_schedule=schedule,
+        ),
+    )
+
+    service.save_scenario(scenario)
+    get_storage().journal.compact()
+
+    raw = json.loads((tmp_data_dir / "scenarios.json").read_text(encoding="utf-8"))
+    assert isinstance(raw[0]["input"]["effects_schedule"], str)
+    assert "capex_schedule" not in raw[0]["input"]
+
+    loaded = service.get_scenario("with-schedule")
+    assert loaded.input.effects_schedule == schedule
+
+
+def test_scenario_index_reloads_only_on_file_change(tmp_data_dir):
+    """Индекс не перечитывает файл без изменений и подхватывает внешние правки."""
+    service = InvestService()
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    for i in range(3):
+        service.save_scenario(
+            ScenarioDetail(id=f"s{i}", name=f"Сценарий {i}", created_at=datetime.utcnow(), input=input_data)
+        )
+
+    get_storage().journal.compact()
+    reloads = get_storage().index.reloads
+    listed = service.list_scenarios()
+    assert sorted(s.id for s in listed) == ["s0", "s1", "s2"]
+    reloads = get_storage().index.reloads
+    for _ in range(5):
+        assert service.list_scenarios() == listed
+        assert service.get_scenario("s1").name == "Сценарий 1"
+    assert get_storage().index.reloads == reloads
+
+    ## Внешняя правка файла (другой процесс или вручную)
+    scenarios_file = tmp_data_dir / "scenarios.json"
+    raw = json.loads(scenarios_file.read_text(encoding="utf-8"))
+    raw[1]["name"] = "Изменён вне сервиса"
+    scenarios_file.write_text(json.dumps(raw, ensure_ascii=False), encoding="utf-8")
+
+    assert service.get_scenario("s1").name == "Изменён вне сервиса"
+    assert get_storage().index.reloads == reloads + 1
+
+
+def test_save_appends_to_journal_and_compacts(tmp_data_dir, monkeypatch):
+    """Сохранение дописывает строку в журнал; уплотнение сворачивает его в scenarios.json."""
+    service = InvestService()
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+
+    ## Старый файл scenarios.json (без журнала) читается как раньше
+    legacy = ScenarioDetail(id="legacy", name="Старый", created_at=datetime.utcnow(), input=input_data)
+    (tmp_data_dir / "scenarios.json").write_text(
+        json.dumps([legacy.model_dump(mode="json")], ensure_ascii=False), encoding="utf-8"
+    )
+    assert service.get_scenario("legacy").name == "Старый"
+
+    for name in ("v1", "v2"):
+        service.save_scenario(ScenarioDetail(id="legacy", name=name, created_at=datetime.utcnow(), input=input_data))
+    service.save_scenario(ScenarioDetail(id="new", name="Новый", created_at=datetime.utcnow(), input=input_data))
+
+    journal = tmp_data_dir / "scenarios.journal.jsonl"
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 3
+    assert json.loads((tmp_data_dir / "scenarios.json").read_text(encoding="utf-8"))[0]["name"] == "Старый"
+    assert service.get_scenario("legacy").name == "v2"
+
+    ## Оборванная при сбое строка журнала игнорируется
+    with journal.open("a", encoding="utf-8") as f:
+        f.write('{"id": "broken", "na')
+    assert service.get_scenario("broken") is None
+
+    ## Уплотнение в фоне запускается по размеру журнала; индекс при этом не перечитывается
+    reloads = get_storage().index.reloads
+    monkeypatch.setattr(settings, "SCENARIOS_JOURNAL_COMPACT_BYTES", 1)
+    service.save_scenario(ScenarioDetail(id="new", name="Новый 2", created_at=datetime.utcnow(), input=input_data))
+    get_storage().journal.wait(timeout=10)
+
+    assert not journal.exists()
+    raw = json.loads((tmp_data_dir / "scenarios.json").read_text(encoding="utf-8"))
+    assert [(item["id"], item["name"]) for item in raw] == [("legacy", "v2"), ("new", "Новый 2")]
+    assert service.get_scenario("new").name == "Новый 2"
+    assert get_storage().index.reloads == reloads
+
+
+def test_sqlite_storage(tmp_path):
+    """SQLite-хранилище: WAL, индексы, upsert и сортировка списка; сервис работает через него."""
+    storage = SqliteScenarioStorage(tmp_path / "scenarios.sqlite3")
+    service = InvestService(storage=storage)
+    schedule = [0.0] * 6 + [10_000.0] * 18
+    input_data = InvestInput(
+        capex=100_000, opex=24_000, effects=180_000, period_months=24, effects_schedule=schedule
+    )
+
+    for i in range(3):
+        service.save_scenario(
+            ScenarioDetail(id=f"s{i}", name=f"Сценарий {i}", created_at=datetime.utcnow(), input=input_data)
+        )
+    service.save_scenario(
+        ScenarioDetail(id="s0", name="Обновлён", created_at=datetime.utcnow(), input=input_data)
+    )
+
+    assert [s.id for s in service.list_scenarios()][0] == "s0"
+    assert len(service.list_scenarios()) == 3
+    loaded = service.get_scenario("s0")
+    assert loaded.name == "Обновлён"
+    assert loaded.input.effects_schedule == schedule
+    assert service.get_scenario("missing") is None
+
+    connection = storage._connection()
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(scenarios)")}
+    assert {"idx_scenarios_updated_at", "idx_scenarios_sort_at"} <= indexes
+    storage.close()
+
+
+def test_scenario_pages(storage):
+    """Курсорная пагинация и фильтры совпадают с фильтрацией полного списка."""
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    start = datetime(2025, 1, 1)
+    for i in range(25):
+        storage.save_scenario(
+            ScenarioDetail(
+                id=f"id-{i:02d}",
+                name=("CRM " if i % 3 else "ERP ") + str(i),
+                created_at=start + timedelta(days=i),
+                ## Несколько сценариев с одинаковым временем изменения — порядок по id
+                updated_at=None if i % 4 == 0 else start + timedelta(days=30 + i // 2),
+                input=input_data,
+            )
+        )
+
+    queries = [
+        ScenarioListQuery(limit=4),
+        ScenarioListQuery(limit=3, name_prefix="CRM"),
+        ScenarioListQuery(limit=5, created_from=start + timedelta(days=5), created_to=start + timedelta(days=20)),
+        ScenarioListQuery(limit=2, updated_from=start + timedelta(days=33), updated_to=start + timedelta(days=38)),
+    ]
+    for query in queries:
+        pages, cursor = [], None
+        while True:
+            page = storage.list_scenarios_page(query.model_copy(update={"cursor": cursor}))
+            assert len(page.items) <= query.limit
+            pages.extend(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        ## Эталон — фильтрация полного списка базовой реализацией интерфейса
+        expected = ScenarioStorage.list_scenarios_page(storage, query.model_copy(update={"limit": 1000}))
+        assert [s.id for s in pages] == [s.id for s in expected.items]
+        assert pages
+
+    with pytest.raises(ValueError):
+        storage.list_scenarios_page(ScenarioListQuery(cursor="not-a-cursor"))
+
+
+def _save_many(path: str, prefix: str, count: int) -> None:
+    """Сохраняет count сценариев в отдельном процессе (для теста нескольких воркеров)."""
+    storage = JsonScenarioStorage(Path(path))
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(
+            pool.map(
+                lambda i: storage.save_scenario(
+                    ScenarioDetail(id=f"{prefix}-{i}", name=prefix, created_at=datetime.utcnow(), input=input_data)
+                ),
+                range(count),
+            )
+        )
+
+
+def test_concurrent_saves_from_several_processes(tmp_path, monkeypatch):
+    """Параллельные сохранения из нескольких процессов не теряются; потоки одного процесса группируются."""
+    path = tmp_path / "scenarios.json"
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_save_many, args=(str(path), f"p{n}", 40)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    storage = JsonScenarioStorage(path)
+    ids = {s.id for s in storage.list_scenarios()}
+    assert ids == {f"p{n}-{i}" for n in range(4) for i in range(40)}
+
+    ## В одном процессе одновременные сохранения фиксируются группами (меньше fsync, чем сохранений).
+    ## Первая фиксация ждёт, пока все 16 потоков поставят записи в очередь (в эту группу
+    ## или следующую), — группировка не зависит от окна SCENARIOS_GROUP_COMMIT_WINDOW_MS
+    journal = storage.journal
+    commit = journal._commit
+    queued = threading.Event()
+
+    def held_commit(paths, items):
+        if not queued.is_set():
+            deadline = time.monotonic() + 30
+            while len(items) + journal._queue.qsize() < 16 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            queued.set()
+        return commit(paths, items)
+
+    monkeypatch.setattr(journal, "_commit", held_commit)
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(
+            pool.map(
+                lambda i: storage.save_scenario(
+                    ScenarioDetail(id=f"t-{i}", name="t", created_at=datetime.utcnow(), input=input_data)
+                ),
+                range(64),
+            )
+        )
+    assert journal.committed_records == 64
+    ## 16 первых сохранений — не больше двух групп
+    assert journal.commits <= 64 - 14
+    assert len(storage.list_scenarios()) == 4 * 40 + 64
+
+
+def test_commit_callback_error_does_not_fail_save(tmp_path, monkeypatch):
+    """Ошибка обработчика после фиксации не превращается в ошибку сохранения: индекс сбрасывается и перечитывается."""
+    storage = JsonScenarioStorage(tmp_path / "scenarios.json")
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    storage.save_scenario(ScenarioDetail(id="a", name="a", created_at=datetime(2025, 1, 1), input=input_data))
+    assert [s.id for s in storage.list_scenarios()] == ["a"]
+
+    def broken_apply(records, before, after):
+        raise RuntimeError("обработчик упал")
+
+    monkeypatch.setattr(storage.index, "apply_commit", broken_apply)
+    storage.save_scenario(ScenarioDetail(id="b", name="b", created_at=datetime(2025, 1, 2), input=input_data))
+    assert {s.id for s in storage.list_scenarios()} == {"a", "b"}
+    assert storage.get_scenario("b") is not None
+
+
+def test_iter_scenarios_reads_page_by_page(tmp_path, monkeypatch):
+    """Потоковое чтение идёт страницами хранилища и не собирает полный список."""
+    storage = SqliteScenarioStorage(tmp_path / "scenarios.sqlite3")
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    for i in range(7):
+        storage.save_scenario(
+            ScenarioDetail(id=f"s{i}", name="s", created_at=datetime(2025, 1, 1 + i), input=input_data)
+        )
+
+    def full_list():
+        raise AssertionError("полный список не должен загружаться")
+
+    monkeypatch.setattr(storage, "list_scenarios", full_list)
+    query = ScenarioListQuery(limit=3)
+    assert [s.id for s in storage.iter_scenarios(query)] == [f"s{i}" for i in range(6, -1, -1)]
+    assert [s.id for s in storage.iter_scenario_details(query)] == [f"s{i}" for i in range(6, -1, -1)]
+    storage.close()
+
+
+def test_import_scenarios_reports_errors_and_commits_once(storage, monkeypatch):
+    """Массовый импорт: ошибки negative-scenarios.json по записям, корректные записи — одной фиксацией."""
+    monkeypatch.setattr(settings, "SCENARIOS_IMPORT_BATCH", 3)
+    data_dir = Path(__file__).resolve().parents[1] / "data"
+    negative = json.loads((data_dir / "negative-scenarios.json").read_text(encoding="utf-8"))
+    inputs = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(data_dir.glob("input-*.json"))]
+    records = negative + inputs + [{"id": "keep", "name": "С id", "input": inputs[0]}, 42]
+
+    saves = []
+    original = storage.save_scenarios
+    monkeypatch.setattr(storage, "save_scenarios", lambda items: (saves.append(len(items)), original(items)))
+    result = InvestService(storage=storage).import_scenarios(records)
+
+    assert saves == [len(inputs) + 1]
+    assert result.imported == len(inputs) + 1
+    assert result.failed == len(negative) + 1
+    errors = {error.id or error.index: error.errors for error in result.errors}
+    assert errors["neg-001"] == ["input.capex: Input should be greater than or equal to 0"]
+    assert errors["neg-002"] == ["input.period_months: Input should be greater than 0"]
+    assert errors["neg-003"] == ["input: Field required"]
+    assert errors["neg-004"][0].startswith("input.effects:")
+    assert any(message.startswith("last_result.") for message in errors["neg-005"])
+    assert errors[len(records) - 1][0].startswith("record:")
+
+    listed = {s.id: s.name for s in storage.list_scenarios()}
+    assert len(listed) == len(inputs) + 1
+    assert listed["keep"] == "С id"
+    assert inputs[0]["project_name"] in listed.values()
+    if isinstance(storage, JsonScenarioStorage):
+        assert storage.journal.commits == 1
+
+
+def test_import_cli_reads_json_and_ndjson(tmp_data_dir, capsys):
+    """python -m src.cli import: JSON-массив и NDJSON (в том числе с битой строкой)."""
+    array_file = tmp_data_dir / "array.json"
+    array_file.write_text(
+        json.dumps([{"capex": 1_000, "opex": 100, "effects": 5_000, "period_months": 12, "project_name": "A"}]),
+        encoding="utf-8",
+    )
+    ndjson_file = tmp_data_dir / "export.ndjson"
+    ndjson_file.write_text(
+        json.dumps({"id": "n1", "name": "N1", "input": {"capex": 1, "opex": 1, "effects": 1, "period_months": 1}})
+        + "\n{broken\n",
+        encoding="utf-8",
+    )
+
+    assert cli.main(["import", str(array_file), str(ndjson_file)]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert (report["imported"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["index"] == 2
+    assert report["errors"][0]["errors"][0].startswith("Некорректный JSON")
+    assert cli.main(["import", "--strict", str(ndjson_file)]) == 1
+    assert {s.name for s in InvestService().list_scenarios()} == {"A", "N1"}
+
+
+def test_recompute_scenarios_stamps_formula_version(storage, monkeypatch):
+    """Пересчёт last_result: векторный результат совпадает с calculate_metrics, повторно — только устаревшие."""
+    schedule = [0.0] * 6 + [10_000.0] * 18
+    inputs = [
+        InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24),
+        InvestInput(capex=50_000, opex=60_000, effects=10_000, period_months=12, discount_rate_percent=12),
+        InvestInput(capex=100_000, opex=24_000, effects=180_000, period_months=24, effects_schedule=schedule),
+        InvestInput(capex=0, opex=0, effects=5_000, period_months=6, discount_rate_percent=0),
+    ]
+    created = datetime(2025, 1, 1)
+    stale = invest_service.calculate_metrics(inputs[0]).model_copy(update={"formula_version": None})
+    storage.save_scenarios(
+        [
+            ScenarioDetail(id=f"r{i}", name=f"R{i}", created_at=created, input=data, last_result=stale)
+            for i, data in enumerate(inputs)
+        ]
+    )
+
+    progress = []
+    report = invest_service.recompute_scenarios(storage, chunk_size=3, on_progress=progress.append)
+    assert (report.scanned, report.recomputed, report.skipped, report.failed) == (4, 4, 0, 0)
+    assert report.done and [p.done for p in progress] == [False, True]
+    for i, data in enumerate(inputs):
+        scenario = storage.get_scenario(f"r{i}")
+        assert scenario.last_result == invest_service.calculate_metrics(data)
+        assert scenario.last_result.formula_version == invest_service.FORMULA_VERSION
+        assert scenario.updated_at is None
+
+    assert invest_service.recompute_scenarios(storage).skipped == 4
+    monkeypatch.setattr(invest_service, "FORMULA_VERSION", invest_service.FORMULA_VERSION + 1)
+    assert invest_service.recompute_scenarios(storage).recomputed == 4
+
+
+@pytest.mark.parametrize("same_instance", [False, True], ids=["other-instance", "same-instance"])
+def test_recompute_does_not_overwrite_concurrent_update(storage, monkeypatch, same_instance):
+    """Сценарий, изменённый во время пересчёта (этим или другим экземпляром хранилища), не затирается старой версией."""
+    input_data = InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24)
+    created = datetime(2025, 1, 1)
+    storage.save_scenarios(
+        [ScenarioDetail(id=f"c{i}", name=f"C{i}", created_at=created, input=input_data) for i in range(3)]
+    )
+    other = storage if same_instance else type(storage)(storage.path)
+    changed = ScenarioDetail(
+        id="c1",
+        name="C1 changed",
+        created_at=created,
+        updated_at=datetime(2025, 6, 1),
+        input=input_data.model_copy(update={"capex": 50_000}),
+    )
+    original = invest_service._recompute_results
+
+    def recompute_with_concurrent_save(inputs):
+        other.save_scenario(changed)
+        return original(inputs)
+
+    monkeypatch.setattr(invest_service, "_recompute_results", recompute_with_concurrent_save)
+    report = invest_service.recompute_scenarios(storage)
+    assert (report.recomputed, report.skipped) == (2, 1)
+
+    stored = storage.get_scenario("c1")
+    assert stored == changed and stored.last_result is None
+    assert storage.get_scenario("c0").last_result is not None
+    if not same_instance:
+        other.close()
+
+
+def test_columnar_snapshot_is_mmapped_and_updated_incrementally(tmp_path):
+    """Столбцовый снимок: mmap в новом экземпляре, инкрементальное обновление, пересборка при внешнем изменении."""
+    path = tmp_path / "scenarios.json"
+    storage = JsonScenarioStorage(path)
+    schedule = [0.0] * 6 + [10_000.0] * 18
+    inputs = [
+        InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24),
+        InvestInput(capex=50_000, opex=6_000, effects=90_000, period_months=12, discount_rate_percent=12),
+        InvestInput(capex=100_000, opex=24_000, effects=180_000, period_months=24, effects_schedule=schedule),
+    ]
+    created = datetime(2025, 1, 1)
+    storage.save_scenarios(
+        [ScenarioDetail(id=f"c{i}", name=f"C{i}", created_at=created, input=data) for i, data in enumerate(inputs)]
+    )
+
+    columns = storage.scenario_columns()
+    assert columns.ids == ["c0", "c1", "c2"]
+    assert columns.capex.tolist() == [100_000, 50_000, 100_000]
+    assert columns.period_months.dtype == np.int64
+    assert np.isnan(columns.discount_rate_percent[0]) and columns.discount_rate_percent[1] == 12
+    assert columns.has_schedules.tolist() == [False, False, True]
+    assert storage.columnar.rebuilds == 1
+
+    ## Новый экземпляр хранилища открывает снимок с диска через mmap
+    reopened = JsonScenarioStorage(path)
+    loaded = reopened.scenario_columns()
+    assert isinstance(loaded.rows, np.memmap)
+    assert loaded.ids == columns.ids and reopened.columnar.rebuilds == 0
+
+    ## Свои сохранения применяются к колонкам без пересборки
+    storage.save_scenario(ScenarioDetail(id="c1", name="C1", created_at=created, input=inputs[0]))
+    storage.save_scenario(ScenarioDetail(id="c3", name="C3", created_at=created, input=inputs[1]))
+    columns = storage.scenario_columns()
+    assert columns.ids == ["c0", "c1", "c2", "c3"]
+    assert columns.capex.tolist() == [100_000, 100_000, 100_000, 50_000]
+    assert (storage.columnar.rebuilds, storage.columnar.updates) == (1, 1)
+    ## ...и без перезаписи снимка на диске: новое поколение пишет уплотнение журнала
+    assert storage.columnar.writes == 1
+    storage.journal.compact()
+    assert storage.columnar.writes == 2
+    compacted = JsonScenarioStorage(path)
+    assert compacted.scenario_columns().capex.tolist() == [100_000, 100_000, 100_000, 50_000]
+    assert (compacted.columnar.loads, compacted.columnar.rebuilds) == (1, 0)
+
+    ## Изменения другого экземпляра (процесса) видны по подписи файлов — колонки пересобираются
+    reopened.save_scenario(ScenarioDetail(id="c4", name="C4", created_at=created, input=inputs[0]))
+    assert storage.scenario_columns().ids[-1] == "c4"
+    assert storage.columnar.rebuilds == 2
+    assert len(list(tmp_path.glob("scenarios.columns.*.npy"))) <= 4
+
+    sqlite = SqliteScenarioStorage(tmp_path / "scenarios.sqlite3")
+    sqlite.save_scenarios([storage.get_scenario(scenario_id) for scenario_id in columns.ids])
+    from_sqlite = sqlite.scenario_columns()
+    assert from_sqlite.ids == columns.ids
+    assert np.array_equal(from_sqlite.rows[["capex", "period_months"]], columns.rows[["capex", "period_months"]])
+    assert from_sqlite.has_schedules.tolist() == columns.has_schedules.tolist()
+    sqlite.close()
+
+
+def test_portfolio_analytics_is_cached_until_store_changes(storage):
+    """Сводная аналитика: совпадает с calculate_metrics по сценариям, таблица пересобирается только после сохранения."""
+    schedule = [0.0] * 6 + [10_000.0] * 18
+    inputs = [
+        InvestInput(capex=100_000, opex=20_000, effects=180_000, period_months=24),
+        InvestInput(capex=50_000, opex=60_000, effects=10_000, period_months=12, discount_rate_percent=12),
+        InvestInput(capex=100_000, opex=24_000, effects=180_000, period_months=24, effects_schedule=schedule),
+        InvestInput(capex=10_000, opex=1_000, effects=40_000, period_months=36, discount_rate_percent=8),
+    ]
+    created = datetime(2025, 1, 1)
+    storage.save_scenarios(
+        [ScenarioDetail(id=f"a{i}", name=f"A{i}", created_at=created, input=data) for i, data in enumerate(inputs)]
+    )
+    results = [invest_service.calculate_metrics(data) for data in inputs]
+
+    service = InvestService(storage=storage)
+    builds = invest_service.scenarios_frame_cache.builds
+    report = service.portfolio_analytics()
+    assert (report.count, report.with_schedules) == (4, 1)
+    assert report.total_capex == 260_000
+    assert report.never_pay_back == sum(r.payback_months is None for r in results)
+    roi = np.array([r.roi_percent for r in results])
+    assert report.roi_percent.percentiles[2] == pytest.approx(np.percentile(roi, 50), abs=0.01)
+    assert report.npv.max == max(r.npv for r in results if r.npv is not None)
+    assert sum(report.payback_histogram.counts) == sum(r.payback_months is not None for r in results)
+
+    service.portfolio_analytics()
+    assert invest_service.scenarios_frame_cache.builds == builds + 1
+
+    storage.save_scenario(ScenarioDetail(id="a4", name="A4", created_at=created, input=inputs[0]))
+    assert service.portfolio_analytics().count == 5
+    assert invest_service.scenarios_frame_cache.builds == builds + 2
@@ -1,7 +1,21 @@
 """Тесты анализа чувствительности (sensitivity analysis)."""
 
-from src.models.invest import InvestInput, SensitivityRequest
-from src.services.invest_service import run_sensitivity, InvestService
+import pytest
+from pydantic import ValidationError
+
+from src.models.invest import (
+    InvestInput,
+    InvestResult,
+    SensitivityGridRequest,
+    SensitivityRequest,
+    SensitivitySweepResult,
+)
+from src.services.invest_service import (
+    calculate_metrics,
+    run_sensitivity,
+    run_sensitivity_grid,
+    InvestService,
+)
 
 
 def _make_base_input() -> InvestInput:
@@ -53,3 +67,107 @@ def test_invest_service_run_sensitivity():
     assert item.parameter == "capex"
     assert item.minus_delta_result is not None
     assert item.plus_delta_result is not None
+
+
+def _legacy_point(base: InvestInput, param: str, multiplier: float) -> InvestResult:
+    """Эталон: прежний пересчёт точки через новый InvestInput и calculate_metrics()."""
+    data = base.model_dump()
+    data[param] = float(round(float(data[param]) * multiplier, 2))
+    return calculate_metrics(InvestInput(**data))
+
+
+def test_run_sensitivity_matches_scalar_recalculation():
+    """Векторный анализ чувствительности совпадает с поточечным пересчётом."""
+    bases = [
+        _make_base_input(),
+        InvestInput(capex=12_345.67, opex=8_910.11, effects=23_456.78, period_months=37),
+        InvestInput(capex=0, opex=0, effects=1_000, period_months=12),
+        InvestInput(capex=50_000, opex=60_000, effects=40_000, period_months=6),
+    ]
+    for base in bases:
+        for delta in (1.5, 20, 33.33, 100):
+            req = SensitivityRequest(base_input=base, delta_percent=delta)
+            result = run_sensitivity(req)
+
+            assert result.base_result == calculate_metrics(base)
+            for item in result.items:
+                factor = delta / 100.0
+                assert item.minus_delta_result == _legacy_point(base, item.parameter, 1.0 - factor)
+                assert item.plus_delta_result == _legacy_point(base, item.parameter, 1.0 + factor)
+
+
+def test_run_sensitivity_sweep_grid():
+    """Sweep по диапазону возвращает колонки, совпадающие с поточечным пересчётом."""
+    base = _make_base_input()
+    req = SensitivityRequest(
+        base_input=base,
+        delta_range={"start": -50, "stop": 50, "step": 0.1},
+    )
+
+    result = run_sensitivity(req)
+
+    assert isinstance(result, SensitivitySweepResult)
+    assert len(result.deltas) == 1001
+    assert result.deltas[0] == -50.0 and result.deltas[-1] == 50.0
+    assert result.base_result == calculate_metrics(base)
+    assert [s.parameter for s in result.series] == ["capex", "opex", "effects"]
+
+    for series in result.series:
+        assert len(series.roi_percent) == len(result.deltas)
+        for i in (0, 123, 500, 1000):
+            expected = _legacy_point(base, series.parameter, 1.0 + result.deltas[i] / 100.0)
+            assert series.tco[i] == expected.tco
+            assert series.roi_percent[i] == expected.roi_percent
+            assert series.payback_months[i] == expected.payback_months
+
+
+def test_sensitivity_sweep_validation():
+    """deltas и delta_range взаимоисключающие, изменения ограничены ±100%."""
+    base = _make_base_input()
+    with pytest.raises(ValidationError):
+        SensitivityRequest(base_input=base, deltas=[10], delta_range={"start": -10, "stop": 10})
+    with pytest.raises(ValidationError):
+        SensitivityRequest(base_input=base, deltas=[-150])
+
+
+def test_run_sensitivity_grid_matches_calculate_metrics():
+    """Каждая ячейка таблицы совпадает с calculate_metrics() для той же пары значений."""
+    base = _make_base_input()
+    capex_values = [0.0, 50_000.0, 123_456.78, 300_000.0]
+    period_values = [1, 12, 24, 37, 600]
+    req = SensitivityGridRequest(
+        base_input=base,
+        rows={"parameter": "capex", "values": capex_values},
+        columns={"parameter": "period_months", "values": period_values},
+        metric="payback_months",
+    )
+
+    result = run_sensitivity_grid(req)
+
+    assert result.shape == [4, 5]
+    assert len(result.values) == 20
+    for i, capex in enumerate(capex_values):
+        for j, months in enumerate(period_values):
+            data = base.model_dump()
+            data.update(capex=capex, period_months=months)
+            expected = calculate_metrics(InvestInput(**data))
+            assert result.values[i * 5 + j] == expected.payback_months
+
+
+def test_run_sensitivity_grid_validation():
+    """Дробный период и одинаковые оси отклоняются."""
+    base = _make_base_input()
+    req = SensitivityGridRequest(
+        base_input=base,
+        rows={"parameter": "effects", "values": [1.0, 2.0]},
+        columns={"parameter": "period_months", "values": [12.5]},
+    )
+    with pytest.raises(ValueError):
+        run_sensitivity_grid(req)
+
+    with pytest.raises(ValidationError):
+        SensitivityGridRequest(
+            base_input=base,
+            rows={"parameter": "capex", "values": [1.0]},
+            columns={"parameter": "capex", "values": [2.0]},
+        )
@@ -1,10 +1,16 @@
 """Тесты бизнес-логики InvestCalc (уровень сервисного слоя)."""
 
+import base64
+import random
+import warnings
+import zlib
+
+import numpy as np
 import pytest
 from pydantic import ValidationError
 
-from src.models.invest import InvestInput
-from src.services.invest_service import calculate_metrics, InvestService
+from src.models.invest import MAX_PERIOD_MONTHS, BatchCalcRequest, InvestInput, pack_schedule, unpack_schedule
+from src.services.invest_service import _round2, calculate_metrics, calculate_metrics_batch, InvestService
 
 
 def test_calculate_metrics_basic():
@@ -61,3 +67,177 @@ def test_invest_service_calculate():
     assert isinstance(result.roi_percent, float)
     assert result.payback_months is not None
     assert result.payback_years is not None
+
+
+def test_calculate_metrics_batch_matches_scalar():
+    """Пакетный расчёт должен совпадать с calculate_metrics() построчно."""
+    rng = random.Random(42)
+    rows = [
+        (100_000, 20_000, 180_000, 24),
+        (0, 0, 50_000, 12),          ## TCO = 0, эффекты > 0 → ROI = 999.99
+        (0, 0, 0, 12),               ## TCO = 0, эффекты = 0 → ROI = 0
+        (50_000, 60_000, 40_000, 6),  ## денежный поток ≤ 0 → не окупается
+        (1.005, 0, 2.01, 1),         ## граничный случай округления
+    ]
+    for _ in range(500):
+        rows.append(
+            (
+                round(rng.uniform(0, 1e6), rng.choice([0, 2, 3])),
+                round(rng.uniform(0, 5e5), rng.choice([0, 2, 3])),
+                round(rng.uniform(0, 2e6), rng.choice([0, 2, 3])),
+                rng.randint(1, 600),
+            )
+        )
+
+    request = BatchCalcRequest(
+        capex=[r[0] for r in rows],
+        opex=[r[1] for r in rows],
+        effects=[r[2] for r in rows],
+        period_months=[r[3] for r in rows],
+    )
+    batch = calculate_metrics_batch(request)
+
+    assert batch.count == len(rows)
+    for i, (capex, opex, effects, months) in enumerate(rows):
+        expected = calculate_metrics(
+            InvestInput(capex=capex, opex=opex, effects=effects, period_months=months)
+        )
+        assert batch.tco[i] == expected.tco
+        assert batch.roi_percent[i] == expected.roi_percent
+        assert batch.payback_months[i] == expected.payback_months
+        assert batch.payback_years[i] == expected.payback_years
+        assert batch.note[i] == expected.note
+
+
+def test_round2_non_finite_and_overflow():
+    """_round2 пропускает NaN/inf без изменений и без RuntimeWarning (в том числе при переполнении x * 100)."""
+    values = np.array([1.005, np.nan, np.inf, -np.inf, 1e307, -1.7e308])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = _round2(values)
+    assert result[0] == round(1.005, 2)
+    assert np.isnan(result[1])
+    assert result[2] == np.inf and result[3] == -np.inf
+    assert result[4] == round(1e307, 2) and result[5] == round(-1.7e308, 2)
+
+
+def test_calculate_metrics_batch_validation():
+    """Колонки разной длины и отрицательные значения отклоняются."""
+    with pytest.raises(ValidationError):
+        BatchCalcRequest(capex=[1, 2], opex=[1], effects=[1, 2], period_months=[12, 12])
+
+    request = BatchCalcRequest(capex=[-1], opex=[0], effects=[0], period_months=[12])
+    with pytest.raises(ValueError):
+        calculate_metrics_batch(request)
+
+
+def test_calculate_metrics_dcf():
+    """При заданной ставке считаются NPV, IRR и дисконтированная окупаемость."""
+    input_data = InvestInput(
+        project_name="DCF",
+        capex=100_000,
+        opex=20_000,
+        effects=180_000,
+        period_months=24,
+        discount_rate_percent=10,
+    )
+
+    result = calculate_metrics(input_data)
+
+    monthly_rate = 1.1 ** (1 / 12) - 1
+    cash_flow = (180_000 - 20_000) / 24
+    npv = -100_000 + sum(cash_flow / (1 + monthly_rate) ** t for t in range(1, 25))
+    assert result.npv == round(npv, 2)
+    assert result.discounted_payback_months > result.payback_months
+    assert result.irr_percent > 10
+
+    ## При ставке, равной IRR, NPV ≈ 0
+    irr_monthly = (1 + result.irr_percent / 100) ** (1 / 12) - 1
+    npv_at_irr = -100_000 + sum(cash_flow / (1 + irr_monthly) ** t for t in range(1, 25))
+    assert abs(npv_at_irr) < 100
+
+    ## Без ставки DCF-показатели не заполняются
+    plain = calculate_metrics(input_data.model_copy(update={"discount_rate_percent": None}))
+    assert plain.npv is None and plain.irr_percent is None
+
+
+def test_calculate_metrics_batch_dcf_matches_scalar():
+    """DCF-колонки пакетного расчёта совпадают с calculate_metrics()."""
+    rows = [
+        (100_000, 20_000, 180_000, 24, 10.0),
+        (150_000, 30_000, 190_000, 36, 12.0),
+        (100_000, 0, 50_000, 12, 0.0),       ## отрицательная IRR
+        (50_000, 60_000, 40_000, 6, 5.0),    ## денежный поток ≤ 0 → IRR нет
+        (0, 1_000, 5_000, 12, 10.0),         ## CAPEX = 0 → окупается сразу
+        (80_000, 10_000, 120_000, 36, None),  ## строка без ставки
+    ]
+    request = BatchCalcRequest(
+        capex=[r[0] for r in rows],
+        opex=[r[1] for r in rows],
+        effects=[r[2] for r in rows],
+        period_months=[r[3] for r in rows],
+        discount_rate_percent=[r[4] for r in rows],
+    )
+    batch = calculate_metrics_batch(request)
+
+    for i, (capex, opex, effects, months, rate) in enumerate(rows):
+        expected = calculate_metrics(
+            InvestInput(
+                capex=capex,
+                opex=opex,
+                effects=effects,
+                period_months=months,
+                discount_rate_percent=rate,
+            )
+        )
+        assert batch.npv[i] == expected.npv
+        assert batch.irr_percent[i] == expected.irr_percent
+        assert batch.discounted_payback_months[i] == expected.discounted_payback_months
+
+
+def test_calculate_metrics_with_schedules():
+    """Равномерный график даёт тот же результат, а поздний старт эффектов — более долгую окупаемость."""
+    base = dict(capex=100_000, opex=24_000, effects=180_000, period_months=24, discount_rate_percent=10)
+
+    uniform = calculate_metrics(InvestInput(**base))
+    scheduled_uniform = calculate_metrics(InvestInput(**base, effects_schedule=[7_500] * 24))
+    assert scheduled_uniform == uniform
+
+    ramp_up = [0.0] * 6 + [10_000.0] * 18
+    ramped = calculate_metrics(InvestInput(**base, effects_schedule=ramp_up))
+    assert ramped.tco == uniform.tco
+    assert ramped.roi_percent == uniform.roi_percent
+    assert ramped.payback_months > uniform.payback_months
+    assert ramped.npv < uniform.npv
+
+    ## Эффекты только в последний месяц: за период проект не окупается
+    late = calculate_metrics(
+        InvestInput(**{**base, "effects": 100_000}, effects_schedule=[0.0] * 23 + [100_000.0])
+    )
+    assert late.payback_months is None
+    assert late.note
+
+
+def test_schedule_validation():
+    """Длина графика равна period_months, сумма — итоговому значению."""
+    with pytest.raises(ValidationError):
+        InvestInput(capex=100, opex=0, effects=0, period_months=3, capex_schedule=[50, 50])
+    with pytest.raises(ValidationError):
+        InvestInput(capex=100, opex=0, effects=0, period_months=2, capex_schedule=[50, 40])
+
+
+def test_packed_schedule_limits():
+    """Упакованный график распаковывается не больше MAX_PERIOD_MONTHS значений (защита от zip-бомбы)."""
+    schedule = [50.0, 50.0]
+    packed = pack_schedule(schedule)
+    assert unpack_schedule(packed) == schedule
+    assert InvestInput(capex=100, opex=0, effects=0, period_months=2, capex_schedule=packed).capex_schedule == schedule
+
+    bomb = base64.b64encode(zlib.compress(b"\0" * 1_000_000)).decode("ascii")
+    too_long = pack_schedule([1.0] * (MAX_PERIOD_MONTHS + 1))
+    truncated = base64.b64encode(zlib.compress(b"\0" * 12)).decode("ascii")
+    for value in (bomb, too_long, truncated, packed[:-4]):
+        with pytest.raises(ValueError):
+            unpack_schedule(value)
+    with pytest.raises(ValidationError):
+        InvestInput(capex=0, opex=0, effects=0, period_months=2, capex_schedule=bomb)